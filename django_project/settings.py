@@ -131,6 +131,86 @@ MEDIA_URL = '/media/'
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
+# api.weather.gov client, see weather_app/client.py
+# Point WEATHER_API_URL and the Nominatim domain / scheme at `python manage.py weather_stub_server` for
+# load and benchmark runs without the network
+WEATHER_API_URL = os.environ.get('WEATHER_API_URL', 'https://api.weather.gov')
+WEATHER_NOMINATIM_DOMAIN = os.environ.get('WEATHER_NOMINATIM_DOMAIN', 'nominatim.openstreetmap.org')
+WEATHER_NOMINATIM_SCHEME = os.environ.get('WEATHER_NOMINATIM_SCHEME', 'https')
+WEATHER_API_TIMEOUT = 8 # seconds per attempt
+WEATHER_API_POOL_SIZE = 10 # keep-alive connections shared by the worker threads
+WEATHER_API_ASYNC_POOL_SIZE = 100 # connections per event loop for the async views
+
+# Failed calls are retried with jittered backoff within the deadline, a call slower than HEDGE_AFTER gets a
+# second parallel attempt (None turns it off), and after BREAKER_THRESHOLD failed calls in a row calls fail
+# fast for BREAKER_RESET seconds (see weather_app/resilience.py)
+WEATHER_API_ATTEMPTS = 3
+WEATHER_API_BACKOFF = 0.2 # seconds, doubled on each retry
+WEATHER_API_DEADLINE = 20 # seconds for all attempts of a call
+WEATHER_API_HEDGE_AFTER = None # seconds
+WEATHER_API_BREAKER_THRESHOLD = 5
+WEATHER_API_BREAKER_RESET = 30 # seconds
+
+# Forecasts older than the soft TTL are served while being refreshed in the background,
+# older than the hard TTL they are refetched first (see weather_app/forecast_cache.py)
+WEATHER_FORECAST_SOFT_TTL = 1800 # seconds
+WEATHER_FORECAST_HARD_TTL = 10800 # seconds
+
+# https://docs.djangoproject.com/en/5.0/topics/cache/
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    }
+}
+
+# Where forecasts and geocoded locations are cached: 'locmem' (per process), 'file' (a SQLite
+# file shared by the workers on a host, at PATH) or 'django' (the CACHES entry named CACHE, under KEY_PREFIX).
+# MAX_ENTRIES bounds locmem / file, TIMEOUT is the default per-entry TTL in seconds. The file is also bounded
+# by MAX_BYTES and compacted every COMPACT_INTERVAL seconds (see weather_app/cache_backends.py)
+WEATHER_FORECAST_CACHE = {
+    'BACKEND': os.environ.get('WEATHER_FORECAST_CACHE', 'locmem'),
+    'MAX_ENTRIES': 1024,
+    'PATH': os.path.join(BASE_DIR, 'cache', 'forecasts.sqlite'),
+    'KEY_PREFIX': 'forecasts',
+    'MAX_BYTES': 50 * 1024 * 1024,
+    'COMPACT_INTERVAL': 3600, # seconds
+}
+WEATHER_GEOCODE_CACHE = {
+    'BACKEND': os.environ.get('WEATHER_GEOCODE_CACHE', 'locmem'),
+    'MAX_ENTRIES': 1024,
+    'PATH': os.path.join(BASE_DIR, 'cache', 'geocode.sqlite'),
+    'KEY_PREFIX': 'geocodes',
+    'MAX_BYTES': 5 * 1024 * 1024,
+    'COMPACT_INTERVAL': 3600, # seconds
+}
+
+# Nominatim allows about 1 request per second. Lookups wait for their turn up to MAX_WAIT seconds and fail
+# with "try again" past that. Set the lock file to share the budget between worker processes (see weather_app/ratelimit.py)
+WEATHER_NOMINATIM_RATE = 1.0 # requests per second
+WEATHER_NOMINATIM_BURST = 1
+WEATHER_NOMINATIM_MAX_WAIT = 5 # seconds
+WEATHER_NOMINATIM_LOCK_FILE = os.environ.get('WEATHER_NOMINATIM_LOCK_FILE')
+
+# How a wind speed range like "10 to 15 mph" is read: "min", "max" or "mean"
+WEATHER_WIND_RANGE_POLICY = 'max'
+
+# Coordinates are snapped to this many decimals (4 at most), and a coordinate within the match radius of
+# one already resolved shares its forecast instead of calling /points. A larger radius saves more /points
+# calls but more matches are in the neighbouring 2.5 km grid cell (see weather_app/gridcells.py)
+WEATHER_COORDINATE_DECIMALS = 4
+WEATHER_GRID_MATCH_RADIUS = 300 # meters, about 10% of matches in the neighbouring cell, 0 to turn it off
+
+# Outfit lookups use an in-memory index of the clothes inventory, rebuilt when clothes are saved or deleted
+# in this process, and after this many seconds for changes made by other processes (see weather_app/inventory_index.py)
+WEATHER_INVENTORY_INDEX_MAX_AGE = 300 # seconds
+
+# Set to a directory to also coalesce identical forecast calls across worker processes (see weather_app/singleflight.py).
+# The processes find each other's forecasts in the forecast cache, so give it a shared (file or django) backend.
+WEATHER_SINGLE_FLIGHT_LOCK_DIR = os.environ.get('WEATHER_SINGLE_FLIGHT_LOCK_DIR')
+
+# Serve / and /recommendation/ with the async views (run under ASGI, e.g. uvicorn django_project.asgi:application)
+WEATHER_ASYNC_VIEWS = os.environ.get('WEATHER_ASYNC_VIEWS', '') == '1'
+
 # Change this to configure the logger. 
 LOGGING = {
     'version': 1,
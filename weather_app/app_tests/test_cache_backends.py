@@ -0,0 +1,310 @@
+"""
+Tests for cache_backends.py, the storage behind the forecast and geocode caches.
+"""
+
+import tempfile
+from pathlib import Path
+from django.core.cache import caches
+from django.test import TestCase, override_settings
+from ..cache_backends import DjangoCacheBackend, LocMemBackend, SQLiteBackend, build_backend
+from ..forecast_cache import ForecastCache
+from .utils import FakeClock
+
+
+class TestLocMemBackendUnit(TestCase):
+  """
+  Tests LocMemBackend
+  """
+
+  def test_evicts_least_recently_used(self):
+    """
+    Tests LocMemBackend.set(key, value)
+    * The least recently used entry is dropped when full
+    """
+
+    # Arrange
+    cache = LocMemBackend(maxsize=2)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")
+
+    # Act
+    cache.set("c", 3)
+
+    # Assert
+    self.assertEqual(cache.get("a"), 1)
+    self.assertIs(cache.get("b"), LocMemBackend.MISSING)
+    self.assertEqual(cache.get("c"), 3)
+    self.assertEqual(len(cache), 2)
+
+  def test_expires_entries(self):
+    """
+    Tests LocMemBackend.get(key, default)
+    * An entry is gone after its ttl, the backend's ttl is the default
+    """
+
+    # Arrange
+    clock = FakeClock()
+    cache = LocMemBackend(ttl=10, clock=clock)
+    cache.set("short", 1, ttl=5)
+    cache.set("default", 2)
+
+    # Act
+    clock.now += 6
+    short = cache.get("short", None)
+    default = cache.get("default", None)
+    clock.now += 5
+
+    # Assert
+    self.assertEqual(short, None)
+    self.assertEqual(default, 2)
+    self.assertEqual(cache.get("default", None), None)
+
+
+class TestSQLiteBackendUnit(TestCase):
+  """
+  Tests SQLiteBackend
+  """
+
+  def setUp(self):
+    self.directory = tempfile.TemporaryDirectory()
+    self.path = Path(self.directory.name) / "cache.sqlite"
+    self.clock = FakeClock()
+
+  def tearDown(self):
+    self.directory.cleanup()
+
+  def test_shared_between_instances(self):
+    """
+    Tests SQLiteBackend.get(key, default)
+    * A value set through one instance is read through another on the same file
+    """
+
+    # Arrange
+    writer = SQLiteBackend(self.path, clock=self.clock)
+    reader = SQLiteBackend(self.path, clock=self.clock)
+
+    # Act
+    writer.set("url", {"periods": [1, 2]})
+
+    # Assert
+    self.assertEqual(reader.get("url"), {"periods": [1, 2]})
+    self.assertIs(reader.get("other"), SQLiteBackend.MISSING)
+
+  def test_evicts_and_expires(self):
+    """
+    Tests SQLiteBackend.set(key, value, ttl)
+    * The least recently used entries are dropped beyond maxsize
+    * Expired entries are not returned
+    """
+
+    # Arrange
+    cache = SQLiteBackend(self.path, maxsize=2, clock=self.clock)
+    cache.set("a", 1)
+    self.clock.now += 10
+    cache.set("b", 2, ttl=5)
+    self.clock.now += 10
+    cache.get("a")
+    self.clock.now += 10
+
+    # Act
+    cache.set("c", 3)
+    self.clock.now += 10
+
+    # Assert
+    self.assertEqual(len(cache), 2)
+    self.assertEqual(cache.get("a"), 1)
+    self.assertEqual(cache.get("b", None), None)
+    self.assertEqual(cache.get("c"), 3)
+
+  def test_get_touches_after_interval(self):
+    """
+    Tests SQLiteBackend.get(key, default)
+    * A hit only updates the used stamp once it is TOUCH_INTERVAL seconds old
+    """
+
+    # Arrange
+    cache = SQLiteBackend(self.path, clock=self.clock)
+    cache.set("a", 1)
+    used = lambda: cache._execute("SELECT used FROM cache WHERE key = ?", ("a",)).fetchone()[0]
+
+    # Act
+    self.clock.now += SQLiteBackend.TOUCH_INTERVAL - 1
+    cache.get("a")
+    untouched = used()
+    self.clock.now += 1
+    cache.get("a")
+
+    # Assert
+    self.assertEqual(untouched, 1000.0)
+    self.assertEqual(used(), 1000.0 + SQLiteBackend.TOUCH_INTERVAL)
+
+  def test_evicts_beyond_max_bytes(self):
+    """
+    Tests SQLiteBackend.set(key, value)
+    * The least recently used entries are dropped once the values are over max_bytes
+    """
+
+    # Arrange
+    cache = SQLiteBackend(self.path, max_bytes=2500, clock=self.clock)
+    for key in ["a", "b", "c"]:
+      cache.set(key, b"x" * 1000)
+      self.clock.now += 1
+
+    # Act
+    stats = cache.stats()
+
+    # Assert
+    self.assertIs(cache.get("a"), SQLiteBackend.MISSING)
+    self.assertEqual(cache.get("c"), b"x" * 1000)
+    self.assertEqual(stats["entries"], 2)
+    self.assertLessEqual(stats["bytes"], 2500)
+    self.assertEqual(stats["evictions"], 1)
+
+  def test_compact(self):
+    """
+    Tests SQLiteBackend.compact()
+    * Expired entries are dropped and the freed pages are given back
+    """
+
+    # Arrange
+    cache = SQLiteBackend(self.path, clock=self.clock)
+    for number in range(200):
+      cache.set(f"key {number}", b"x" * 1000, ttl=10)
+    cache.set("kept", 1)
+    file_bytes = cache.stats()["file_bytes"]
+    self.clock.now += 20
+
+    # Act
+    expired = cache.compact()
+    stats = cache.stats()
+
+    # Assert
+    self.assertEqual(expired, 200)
+    self.assertEqual(stats["entries"], 1)
+    self.assertEqual(stats["compactions"], 1)
+    self.assertLess(stats["file_bytes"], file_bytes)
+    self.assertEqual(cache.get("kept"), 1)
+
+  def test_stats_counts_hits_and_misses(self):
+    """
+    Tests SQLiteBackend.stats()
+    """
+
+    # Arrange
+    cache = SQLiteBackend(self.path, clock=self.clock)
+    cache.set("a", 1)
+
+    # Act
+    cache.get("a")
+    cache.get("b")
+
+    # Assert
+    stats = cache.stats()
+    self.assertEqual((stats["hits"], stats["misses"]), (1, 1))
+
+
+class TestDjangoCacheBackendUnit(TestCase):
+  """
+  Tests DjangoCacheBackend
+  """
+
+  @override_settings(CACHES={"forecasts": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}})
+  def test_round_trip(self):
+    """
+    Tests DjangoCacheBackend.get(key, default)
+    * Values go through the configured Django cache, keys with spaces are accepted
+    """
+
+    # Arrange
+    cache = DjangoCacheBackend(alias="forecasts")
+
+    # Act
+    cache.set("colorado springs", [1, 2])
+
+    # Assert
+    self.assertEqual(cache.get("colorado springs"), [1, 2])
+    cache.delete("colorado springs")
+    self.assertIs(cache.get("colorado springs"), DjangoCacheBackend.MISSING)
+
+  @override_settings(CACHES={"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}})
+  def test_clear_keeps_other_prefixes(self):
+    """
+    Tests DjangoCacheBackend.clear()
+    * Only the entries under the cache's own prefix are dropped
+    """
+
+    # Arrange
+    forecasts = DjangoCacheBackend(key_prefix="forecasts")
+    geocodes = DjangoCacheBackend(key_prefix="geocodes")
+    forecasts.set("key", "forecast")
+    geocodes.set("key", "location")
+    caches["default"].set("session", "kept")
+
+    # Act
+    forecasts.clear()
+
+    # Assert
+    self.assertIs(forecasts.get("key"), DjangoCacheBackend.MISSING)
+    self.assertEqual(geocodes.get("key"), "location")
+    self.assertEqual(caches["default"].get("session"), "kept")
+    forecasts.set("key", "refetched")
+    self.assertEqual(forecasts.get("key"), "refetched")
+
+
+class TestBuildBackendUnit(TestCase):
+  """
+  Tests build_backend(options)
+  """
+
+  def test_builds_each_backend(self):
+    """
+    Tests that settings dicts pick the backend and its limits
+    """
+
+    with tempfile.TemporaryDirectory() as directory:
+      locmem = build_backend({"BACKEND": "locmem", "MAX_ENTRIES": 5, "TIMEOUT": 60})
+      sqlite = build_backend({"BACKEND": "file"}, default_path=Path(directory) / "cache.sqlite")
+      django = build_backend({"BACKEND": "django", "KEY_PREFIX": "forecasts"})
+      default_prefix = build_backend({"BACKEND": "django"}, default_prefix="geocodes")
+
+    self.assertIsInstance(build_backend(None), LocMemBackend)
+    self.assertEqual((locmem.maxsize, locmem.ttl), (5, 60))
+    self.assertIsInstance(sqlite, SQLiteBackend)
+    self.assertEqual(django.key_prefix, "forecasts")
+    self.assertEqual(default_prefix.key_prefix, "geocodes")
+
+  def test_unknown_backend(self):
+    """
+    Tests that an unknown backend is rejected
+    * Sad Test
+    """
+
+    with self.assertRaises(ValueError):
+      build_backend({"BACKEND": "redis"})
+
+
+class TestForecastCacheBackendUnit(TestCase):
+  """
+  Tests ForecastCache on a shared backend
+  """
+
+  def test_shared_through_file(self):
+    """
+    Tests ForecastCache.get(key, loader)
+    * A forecast loaded by one worker's cache is a hit for another on the same file
+    """
+
+    with tempfile.TemporaryDirectory() as directory:
+      # Arrange
+      path = Path(directory) / "forecasts.sqlite"
+      first = ForecastCache(backend=SQLiteBackend(path))
+      second = ForecastCache(backend=SQLiteBackend(path))
+
+      # Act
+      first.get("url", lambda: ["period"])
+      value = second.get("url", lambda: ["other"])
+
+    # Assert
+    self.assertEqual(value, ["period"])
+    self.assertEqual(second.counters["hits"], 1)
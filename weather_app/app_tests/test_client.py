@@ -0,0 +1,103 @@
+"""
+Tests for the shared api.weather.gov client (client.py) and its transports.
+"""
+
+import threading
+from django.test import TestCase
+from requests import ConnectTimeout
+from ..client import ForecastClient
+from ..transports import LocalTransport
+from .. import client
+
+
+class TestForecastClientUnit(TestCase):
+  """
+  Tests the pooled, thread-safe ForecastClient.
+  """
+
+  def test_points_url(self):
+    """
+    Tests points_url(latitude, longitude)
+    * Builds the /points url from the configured base url, with 4 decimals
+    """
+
+    forecast_client = ForecastClient(base_url="http://localhost:8001/")
+
+    self.assertEqual(forecast_client.points_url(38.9, -104.8), "http://localhost:8001/points/38.9000,-104.8000")
+
+  def test_get_uses_transport(self):
+    """
+    Tests get(url)
+    * Requests go through the transport instead of the network
+    """
+
+    # Arrange
+    transport = LocalTransport({"https://api.weather.gov/test": {"properties": {}}})
+    forecast_client = ForecastClient(transport=transport)
+
+    # Act
+    response = forecast_client.get("https://api.weather.gov/test")
+
+    # Assert
+    self.assertEqual(response.status_code, 200)
+    self.assertEqual(response.json(), {"properties": {}})
+    self.assertEqual(transport.calls, ["https://api.weather.gov/test"])
+
+  def test_get_unknown_url(self):
+    """
+    Tests get(url)
+    * Unknown urls are answered with a 404
+    """
+
+    forecast_client = ForecastClient(transport=LocalTransport())
+
+    self.assertEqual(forecast_client.get("https://api.weather.gov/missing").status_code, 404)
+
+  def test_get_raises_transport_errors(self):
+    """
+    Tests get(url)
+    * Exceptions from the transport reach the caller
+    """
+
+    transport = LocalTransport({"https://api.weather.gov/test": ConnectTimeout()})
+    forecast_client = ForecastClient(transport=transport)
+
+    with self.assertRaises(ConnectTimeout):
+      forecast_client.get("https://api.weather.gov/test")
+
+  def test_sessions_are_per_thread(self):
+    """
+    Tests that each thread gets its own session, all mounted on the same pool.
+    """
+
+    # Arrange
+    forecast_client = ForecastClient(transport=LocalTransport())
+    sessions = []
+
+    # Act
+    threads = [threading.Thread(target=lambda: sessions.append(forecast_client._session())) for _ in range(3)]
+    for thread in threads:
+      thread.start()
+    for thread in threads:
+      thread.join()
+
+    # Assert
+    self.assertEqual(len({id(session) for session in sessions}), 3)
+    for session in sessions:
+      self.assertIs(session.get_adapter("https://api.weather.gov"), forecast_client._adapter)
+
+  def test_configure(self):
+    """
+    Tests configure(**kwargs) and get_client()
+    * configure replaces the shared client
+    """
+
+    previous = client._client
+
+    try:
+      configured = client.configure(timeout=5)
+
+      self.assertIs(client.get_client(), configured)
+      self.assertEqual(configured.timeout, 5)
+    finally:
+      client._client = previous
@@ -0,0 +1,70 @@
+"""
+Tests for decoders.py, reading windSpeed and startTime.
+"""
+
+from datetime import datetime, timedelta, timezone
+from django.test import TestCase
+from .. import decoders
+from ..decoders import parse_start_time, parse_wind_speed
+
+
+class TestDecodersUnit(TestCase):
+  """
+  Tests the period field decoders.
+  """
+
+  def tearDown(self):
+    decoders.configure(wind_range="max")
+
+  def test_parse_wind_speed(self):
+    """
+    Tests parse_wind_speed(text)
+    * Single speeds, calm and unit variants are converted to whole mph
+    """
+
+    self.assertEqual(parse_wind_speed("10 mph"), 10)
+    self.assertEqual(parse_wind_speed("0 mph"), 0)
+    self.assertEqual(parse_wind_speed("Calm"), 0)
+    self.assertEqual(parse_wind_speed("20 km/h"), 12)
+    self.assertEqual(parse_wind_speed("10 kt"), 12)
+    self.assertEqual(parse_wind_speed("5 m/s"), 11)
+    self.assertEqual(parse_wind_speed(7), 7)
+
+  def test_parse_wind_speed_range(self):
+    """
+    Tests parse_wind_speed(text, policy)
+    * Ranges are reduced with the policy, max by default
+    """
+
+    self.assertEqual(parse_wind_speed("10 to 15 mph"), 15)
+    self.assertEqual(parse_wind_speed("10 to 15 mph", policy="min"), 10)
+    self.assertEqual(parse_wind_speed("10-15 mph", policy="mean"), 12)
+
+    decoders.configure(wind_range="min")
+    self.assertEqual(parse_wind_speed("10 to 15 mph"), 10)
+
+  def test_parse_wind_speed_invalid(self):
+    """
+    Tests parse_wind_speed(text), configure(wind_range)
+    * Sad Test
+    """
+
+    with self.assertRaises(ValueError):
+      parse_wind_speed("gusty")
+    with self.assertRaises(ValueError):
+      decoders.configure(wind_range="median")
+
+  def test_parse_start_time(self):
+    """
+    Tests parse_start_time(text)
+    * Same as datetime.fromisoformat, the hour stays in the location's time zone
+    """
+
+    text = "2024-02-24T18:00:00-07:00"
+
+    self.assertEqual(parse_start_time(text), datetime.fromisoformat(text))
+    self.assertEqual(parse_start_time(text).utcoffset(), timedelta(hours=-7))
+    self.assertEqual(parse_start_time("2024-02-24T18:30Z"), datetime(2024, 2, 24, 18, 30, tzinfo=timezone.utc))
+    self.assertEqual(parse_start_time(text).hour, 18)
+    with self.assertRaises(ValueError):
+      parse_start_time("tomorrow")
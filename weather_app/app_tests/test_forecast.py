@@ -0,0 +1,106 @@
+"""
+Tests for forecast.py, the columnar forecast returned by get_weather_forecast.
+"""
+
+import pickle
+from django.test import TestCase
+from geopy.location import Location as GeoLocation
+from ..forecast import Forecast, ForecastLocation
+from ..utils import get_xth_hour_weather
+
+
+class TestForecastUnit(TestCase):
+  """
+  Tests Forecast and ForecastLocation.
+  """
+
+  def _forecast(self):
+    location = GeoLocation("Colorado Springs, CO 80918", (38.9127, -104.7729), {"lots": "of raw data"})
+    return Forecast(location, hours=[18, 19], temperature=[10, 20], precipitation=[90, 100],
+                    humidity=[30, 40], wind=[10, 25], starts=[1708822800, 1708826400])
+
+  def test_forecast_reads_like_a_dict(self):
+    """
+    Tests Forecast["column"]
+    * Columns, location and keys read like the old result dict
+    * get_xth_hour_weather works on it unchanged
+    """
+
+    # Arrange
+    forecast = self._forecast()
+
+    # Act
+    hour = get_xth_hour_weather(1, forecast)
+
+    # Assert
+    self.assertEqual(list(forecast), ["hours", "temperature", "precipitation", "humidity", "wind", "location"])
+    self.assertEqual(forecast["temperature"][1], 20)
+    self.assertEqual(str(forecast["location"]), "Colorado Springs, CO 80918")
+    self.assertEqual(hour, [20, 40, 25, 100])
+    with self.assertRaises(KeyError):
+      forecast["dewpoint"]
+
+  def test_forecast_location_is_slim(self):
+    """
+    Tests ForecastLocation.of(location)
+    * Only the address and coordinates of a geopy Location are kept
+    * Anything else is kept as is
+    """
+
+    # Act
+    location = self._forecast()["location"]
+
+    # Assert
+    self.assertIsInstance(location, ForecastLocation)
+    self.assertEqual((location.latitude, location.longitude), (38.9127, -104.7729))
+    self.assertFalse(hasattr(location, "raw"))
+    self.assertEqual(ForecastLocation.of("New York"), "New York")
+
+  def test_forecast_pickles(self):
+    """
+    Tests pickle.dumps(forecast)
+    * A forecast survives a round trip (e.g., through a cache)
+    """
+
+    # Arrange
+    forecast = self._forecast()
+
+    # Act
+    copy = pickle.loads(pickle.dumps(forecast))
+
+    # Assert
+    self.assertEqual(copy, forecast)
+    self.assertEqual(copy.as_lists(), forecast.as_lists())
+
+  def test_forecast_to_bytes(self):
+    """
+    Tests Forecast.to_bytes() and Forecast.from_bytes(data)
+    * Columns, start times and location survive, compressed or not
+    * Plain names and no location survive too
+    """
+
+    # Arrange
+    forecast = self._forecast()
+
+    # Act
+    packed = Forecast.from_bytes(forecast.to_bytes())
+    raw = Forecast.from_bytes(forecast.to_bytes(compress=False))
+    named = Forecast.from_bytes(forecast.located("New York").to_bytes())
+    unnamed = Forecast.from_bytes(forecast.located(None).to_bytes())
+
+    # Assert
+    self.assertEqual(packed, forecast)
+    self.assertEqual(packed.location, forecast.location)
+    self.assertEqual(packed.starts.tolist(), [1708822800, 1708826400])
+    self.assertEqual(raw, forecast)
+    self.assertEqual(named["location"], "New York")
+    self.assertEqual(unnamed["location"], None)
+
+  def test_forecast_from_bytes_invalid(self):
+    """
+    Tests Forecast.from_bytes(data)
+    * Sad Test
+    """
+
+    with self.assertRaises(ValueError):
+      Forecast.from_bytes(b"not a forecast, just some bytes long enough")
@@ -0,0 +1,180 @@
+"""
+Tests for forecast_cache.py, serving stale forecasts while they are refreshed.
+"""
+
+import asyncio
+import time
+from unittest.mock import MagicMock
+from django.test import TestCase
+from ..forecast_cache import ForecastCache, Loaded
+from .utils import FakeClock
+
+
+class TestForecastCacheUnit(TestCase):
+  """
+  Tests the soft / hard TTL behaviour of ForecastCache.
+  """
+
+  def setUp(self):
+    self.clock = FakeClock()
+    self.cache = ForecastCache(soft_ttl=10, hard_ttl=100, clock=self.clock)
+
+  def _wait_for_refresh(self):
+    """
+    Waits for the background refresh thread to finish.
+    """
+    deadline = time.monotonic() + 5
+    while self.cache._refreshing and time.monotonic() < deadline:
+      time.sleep(0.01)
+
+  def test_get_fresh_hit(self):
+    """
+    Tests ForecastCache.get(key, loader)
+    * A fresh entry is returned without calling the loader again
+    """
+
+    # Arrange
+    loader = MagicMock(return_value=["period"])
+
+    # Act
+    first = self.cache.get("url", loader)
+    self.clock.now += 5
+    second = self.cache.get("url", loader)
+
+    # Assert
+    self.assertEqual(first, ["period"])
+    self.assertEqual(second, ["period"])
+    loader.assert_called_once()
+    self.assertEqual(self.cache.counters["hits"], 1)
+    self.assertEqual(self.cache.counters["misses"], 1)
+
+  def test_get_stale_refreshes_in_background(self):
+    """
+    Tests ForecastCache.get(key, loader)
+    * A stale entry is returned right away and replaced by a background refresh
+    """
+
+    # Arrange
+    self.cache.get("url", lambda: ["old"])
+    self.clock.now += 50
+
+    # Act
+    stale = self.cache.get("url", lambda: ["new"])
+    self._wait_for_refresh()
+    refreshed = self.cache.get("url", lambda: ["newer"])
+
+    # Assert
+    self.assertEqual(stale, ["old"])
+    self.assertEqual(refreshed, ["new"])
+    self.assertEqual(self.cache.counters["stale"], 1)
+    self.assertEqual(self.cache.counters["refreshes"], 1)
+
+  def test_get_expired_loads_first(self):
+    """
+    Tests ForecastCache.get(key, loader)
+    * An entry older than the hard TTL is reloaded before returning
+    """
+
+    # Arrange
+    self.cache.get("url", lambda: ["old"])
+    self.clock.now += 150
+
+    # Act
+    value = self.cache.get("url", lambda: ["new"])
+
+    # Assert
+    self.assertEqual(value, ["new"])
+    self.assertEqual(self.cache.counters["misses"], 2)
+
+  def test_get_loaded_max_age(self):
+    """
+    Tests ForecastCache.get(key, loader)
+    * A Loaded value is fresh for its own max_age instead of the soft TTL
+    """
+
+    # Arrange
+    self.cache.get("url", lambda: Loaded(["old"], 2))
+    self.clock.now += 5
+
+    # Act
+    stale = self.cache.get("url", lambda: Loaded(["new"], 2))
+    self._wait_for_refresh()
+
+    # Assert
+    self.assertEqual(stale, ["old"])
+    self.assertEqual(self.cache.get("url", lambda: ["newer"]), ["new"])
+    self.assertEqual(self.cache.counters["stale"], 1)
+
+  def test_get_expired_falls_back_on_failed_load(self):
+    """
+    Tests ForecastCache.get(key, loader)
+    * An expired entry is served when the loader returns None or raises
+    """
+
+    # Arrange
+    self.cache.get("url", lambda: ["old"])
+    self.clock.now += 150
+
+    def failing_loader():
+      raise ConnectionError("weather.gov is down")
+
+    # Act
+    after_none = self.cache.get("url", lambda: None)
+    after_error = self.cache.get("url", failing_loader)
+
+    # Assert
+    self.assertEqual(after_none, ["old"])
+    self.assertEqual(after_error, ["old"])
+    self.assertEqual(self.cache.counters["errors"], 2)
+
+  def test_get_missing_failed_load(self):
+    """
+    Tests ForecastCache.get(key, loader)
+    * Without an entry a None load is returned (and not cached), errors are raised
+    """
+
+    # Arrange
+    def failing_loader():
+      raise ConnectionError("weather.gov is down")
+
+    # Act
+    value = self.cache.get("url", lambda: None)
+
+    # Assert
+    self.assertIsNone(value)
+    self.assertEqual(self.cache.get("url", lambda: ["new"]), ["new"])
+    with self.assertRaises(ConnectionError):
+      self.cache.get("other", failing_loader)
+
+  def test_aget_stale_refreshes_in_task(self):
+    """
+    Tests ForecastCache.aget(key, loader)
+    * A stale entry is returned right away and replaced by a refresh task
+    """
+
+    # Arrange
+    async def old():
+      return ["old"]
+
+    async def new():
+      return ["new"]
+
+    async def run():
+      await self.cache.aget("url", old)
+      self.clock.now += 50
+      stale = await self.cache.aget("url", new)
+      running = len(self.cache._tasks)
+      # let the refresh task run
+      await asyncio.sleep(0)
+      await asyncio.sleep(0)
+      return stale, running, await self.cache.aget("url", old)
+
+    # Act
+    stale, running, refreshed = asyncio.run(run())
+
+    # Assert
+    self.assertEqual(stale, ["old"])
+    self.assertEqual(refreshed, ["new"])
+    # the task is held until it is done
+    self.assertEqual(running, 1)
+    self.assertEqual(self.cache._tasks, set())
@@ -0,0 +1,228 @@
+"""
+Tests for geocoding.py and the geocoding cache on the Location model.
+"""
+
+import tempfile
+from pathlib import Path
+from unittest.mock import patch
+from asgiref.sync import sync_to_async
+from django.test import TestCase
+from geopy.location import Location as GeoLocation
+from ..geocoding import normalize_query, geocode_cache
+from ..gazetteer import Gazetteer, write_gazetteer
+from ..models import Location
+from .. import geocoding
+from .. import ratelimit
+
+
+class TestGeocodingUnit(TestCase):
+  """
+  Tests the query normalization.
+  """
+
+  def test_normalize_query(self):
+    """
+    Tests normalize_query(query)
+    * Tests whitespace, case and ZIP code combinations
+    """
+
+    # Arrange
+    expected_combos = [
+      ("  Colorado   Springs ", "colorado springs"),
+      ("NEW YORK, NY", "new york, ny"),
+      ("80918", "80918"),
+      (" 80918-1234", "80918"),
+      ("80918 1234", "80918"),
+      (80918, "80918"),
+      ("809181", "809181"),
+    ]
+
+    # Act
+    for query, expected in expected_combos:
+      result = normalize_query(query)
+
+      # Assert
+      self.assertEqual(result, expected)
+
+
+class TestGazetteerUnit(TestCase):
+  """
+  Tests the memory mapped offline gazetteer.
+  """
+
+  def setUp(self):
+    self.directory = tempfile.TemporaryDirectory()
+    self.path = Path(self.directory.name) / "gazetteer.bin"
+
+  def tearDown(self):
+    self.directory.cleanup()
+
+  def test_lookup(self):
+    """
+    Tests Gazetteer.lookup(query)
+    * Known keys return their coordinates and label, the first repeated key wins
+    """
+
+    # Arrange
+    write_gazetteer(self.path, [
+      ("80918", 38.9127, -104.7729, "Colorado Springs, CO 80918"),
+      ("denver", 39.7392, -104.9903, "Denver, CO"),
+      ("denver", 0, 0, "Not Denver"),
+      ("02108", 42.3576, -71.0637, "Boston, MA 02108"),
+    ])
+    gazetteer = Gazetteer(self.path)
+
+    # Act / Assert
+    self.assertEqual(len(gazetteer), 3)
+    self.assertEqual(gazetteer.lookup("80918"), (38.9127, -104.7729, "Colorado Springs, CO 80918"))
+    self.assertEqual(gazetteer.lookup("denver"), (39.7392, -104.9903, "Denver, CO"))
+    self.assertEqual(gazetteer.lookup("02108"), (42.3576, -71.0637, "Boston, MA 02108"))
+    self.assertEqual(gazetteer.lookup("8091"), None)
+    self.assertEqual(gazetteer.lookup("zzz"), None)
+
+  def test_lookup_missing_file(self):
+    """
+    Tests Gazetteer.lookup(query)
+    * A missing file behaves like an empty gazetteer
+    * Sad Test
+    """
+
+    gazetteer = Gazetteer(self.path)
+
+    self.assertEqual(len(gazetteer), 0)
+    self.assertEqual(gazetteer.lookup("80918"), None)
+
+
+class TestLocationGeocodeUnit(TestCase):
+  """
+  Tests Location.geocode(location_input)
+  """
+
+  def setUp(self):
+    geocode_cache.clear()
+    ratelimit_patch = patch.object(ratelimit, 'nominatim_bucket', ratelimit.TokenBucket(rate=1000, capacity=1000))
+    ratelimit_patch.start()
+    self.addCleanup(ratelimit_patch.stop)
+    self.nominatim_return = GeoLocation("Colorado Springs, CO 80918", (38.9, -104.8), {})
+
+  def test_geocode_uses_gazetteer(self):
+    """
+    Tests that bundled ZIP codes resolve without Nominatim
+    """
+
+    with patch('geopy.geocoders.Nominatim.geocode') as mock_geocode:
+      location = Location.geocode("80918")
+
+    mock_geocode.assert_not_called()
+    self.assertEqual(location.address, "Colorado Springs, CO 80918")
+    self.assertEqual((location.latitude, location.longitude), (38.9127, -104.7729))
+
+  def test_geocode_only_calls_nominatim_once(self):
+    """
+    Tests that repeated (differently spelled) queries are answered from the cache
+    """
+
+    with patch('geopy.geocoders.Nominatim.geocode') as mock_geocode:
+      mock_geocode.return_value = self.nominatim_return
+
+      first = Location.geocode("Near  UCCS")
+      second = Location.geocode(" near uccs ")
+
+    mock_geocode.assert_called_once_with("near uccs")
+    self.assertEqual(first, second)
+
+  def test_geocode_persists_location(self):
+    """
+    Tests that the Location table answers after the in-memory cache is gone (e.g., a restart)
+    """
+
+    # Arrange
+    with patch('geopy.geocoders.Nominatim.geocode') as mock_geocode:
+      mock_geocode.return_value = self.nominatim_return
+      Location.geocode("Austin Bluffs Pkwy")
+
+    geocode_cache.clear()
+
+    # Act
+    with patch('geopy.geocoders.Nominatim.geocode') as mock_geocode:
+      location = Location.geocode("austin bluffs pkwy")
+
+    # Assert
+    mock_geocode.assert_not_called()
+    self.assertEqual(location.address, "Colorado Springs, CO 80918")
+    self.assertEqual((location.latitude, location.longitude), (38.9, -104.8))
+    self.assertEqual(Location.objects.get(query="austin bluffs pkwy").name, "Austin Bluffs Pkwy")
+
+  async def test_ageocode_persists_location(self):
+    """
+    Tests Location.ageocode(location_input)
+    * Nominatim is called from a worker thread that isn't thread sensitive, the row is saved like geocode's
+    """
+
+    # Act
+    with (
+      patch('weather_app.models.sync_to_async', wraps=sync_to_async) as mock_sync_to_async,
+      patch('geopy.geocoders.Nominatim.geocode') as mock_geocode
+    ):
+      mock_geocode.return_value = self.nominatim_return
+      location = await Location.ageocode("Austin Bluffs Pkwy")
+
+    # Assert
+    mock_sync_to_async.assert_called_once_with(Location._nominatim, thread_sensitive=False)
+    self.assertEqual(location, self.nominatim_return)
+    self.assertEqual((await Location.objects.aget(query="austin bluffs pkwy")).name, "Austin Bluffs Pkwy")
+
+  def test_geocode_not_found(self):
+    """
+    Tests that locations Nominatim can't find return None and are not saved
+    * Sad Test
+    """
+
+    with patch('geopy.geocoders.Nominatim.geocode') as mock_geocode:
+      mock_geocode.return_value = None
+
+      self.assertEqual(Location.geocode("nowhere at all"), None)
+      self.assertEqual(Location.geocode("nowhere at all"), None)
+
+    mock_geocode.assert_called_once()
+    self.assertFalse(Location.objects.exists())
+
+  def test_geocode_not_found_expires(self):
+    """
+    Tests that a location Nominatim couldn't find is looked up again once MISS_TTL has passed
+    * Sad Test
+    """
+
+    with (
+      patch.object(geocoding, 'MISS_TTL', 0),
+      patch('geopy.geocoders.Nominatim.geocode') as mock_geocode
+    ):
+      mock_geocode.return_value = None
+
+      Location.geocode("nowhere at all")
+      Location.geocode("nowhere at all")
+
+    self.assertEqual(mock_geocode.call_count, 2)
+
+  def test_geocode_rate_limited(self):
+    """
+    Tests that Nominatim calls take a token, and a saturated queue fails with a clear timeout
+    * Sad Test
+    """
+
+    # Arrange
+    bucket = ratelimit.TokenBucket(rate=1, capacity=1, max_wait=0)
+
+    # Act
+    with (
+      patch.object(ratelimit, 'nominatim_bucket', bucket),
+      patch('geopy.geocoders.Nominatim.geocode') as mock_geocode
+    ):
+      mock_geocode.return_value = self.nominatim_return
+      Location.geocode("Austin Bluffs Pkwy")
+      with self.assertRaises(ratelimit.RateLimitTimeout):
+        Location.geocode("Garden of the Gods")
+
+    # Assert
+    mock_geocode.assert_called_once()
+    self.assertEqual(bucket.stats(), {"acquired": 1, "waited": 0, "rejected": 1})
@@ -0,0 +1,94 @@
+"""
+Tests for gridcells.py, snapping coordinates to the forecast grid.
+"""
+
+from django.test import TestCase
+from .. import gridcells
+
+
+class TestGridcellsUnit(TestCase):
+  """
+  Tests snap, bounding_box and nearest.
+  """
+
+  def tearDown(self):
+    gridcells.configure()
+
+  def test_snap(self):
+    """
+    Tests snap(latitude, longitude)
+    * Coordinates are rounded to the configured decimals
+    """
+
+    # Act
+    default = gridcells.snap("38.89671", "-104.80074")
+    gridcells.configure(decimals=2)
+    coarse = gridcells.snap(38.89671, -104.80074)
+
+    # Assert
+    self.assertEqual(default, (38.8967, -104.8007))
+    self.assertEqual(coarse, (38.9, -104.8))
+
+  def test_configure_invalid_decimals(self):
+    """
+    Tests configure(decimals, match_radius)
+    * Sad Test
+    """
+
+    with self.assertRaises(ValueError):
+      gridcells.configure(decimals=5)
+
+  def test_nearest(self):
+    """
+    Tests nearest(latitude, longitude, candidates)
+    * The closest candidate within the radius wins, none when all are too far
+    """
+
+    # Arrange
+    candidates = [
+      (38.9000, -104.8000, "far"),       # about 1.1 km
+      (38.8905, -104.8000, "closest"),   # about 55 m
+      (38.9500, -104.8000, "outside"),   # about 6.7 km
+    ]
+
+    # Act
+    closest = gridcells.nearest(38.8900, -104.8000, candidates)
+    outside = gridcells.nearest(38.8900, -104.8000, candidates[2:])
+
+    # Assert
+    self.assertEqual(closest, "closest")
+    self.assertEqual(outside, None)
+
+  def test_nearest_default_radius(self):
+    """
+    Tests nearest(latitude, longitude, candidates)
+    * The default radius only matches well inside half a grid cell
+    * Sad Test
+    """
+
+    # Arrange
+    candidates = [(38.8950, -104.8000, "about 560 m")]
+
+    # Act
+    default = gridcells.nearest(38.8900, -104.8000, candidates)
+    wider = gridcells.nearest(38.8900, -104.8000, candidates, radius=1250)
+
+    # Assert
+    self.assertLess(gridcells.grid_match_radius, 1250 / 2)
+    self.assertEqual(default, None)
+    self.assertEqual(wider, "about 560 m")
+
+  def test_bounding_box_contains_radius(self):
+    """
+    Tests bounding_box(latitude, longitude, radius)
+    * Points at the radius east and north of the coordinate are inside the box
+    """
+
+    # Act
+    min_latitude, max_latitude, min_longitude, max_longitude = gridcells.bounding_box(38.89, -104.8, 1000)
+
+    # Assert
+    self.assertAlmostEqual(gridcells.distance(38.89, -104.8, max_latitude, -104.8), 1000, delta=5)
+    self.assertAlmostEqual(gridcells.distance(38.89, -104.8, 38.89, max_longitude), 1000, delta=5)
+    self.assertLess(min_latitude, 38.89)
+    self.assertLess(min_longitude, -104.8)
@@ -0,0 +1,279 @@
+"""
+Tests for inventory_index.py, the in-memory index of the clothes inventory.
+"""
+
+import random
+from types import SimpleNamespace
+from django.test import TestCase, TransactionTestCase
+from ..models import GenericClothes
+from .. import inventory_index
+
+
+def clothes(pk, low, high, waterproof, clothing_type="HAT"):
+  return SimpleNamespace(pk=pk, clothing_type=clothing_type, comfort_low=low,
+                         comfort_high=high, waterproof_rating=waterproof)
+
+
+class TestInventoryIndexUnit(TestCase):
+  """
+  Tests TypeIndex and InventoryIndex on plain objects.
+  """
+
+  def test_lookup(self):
+    """
+    Tests TypeIndex.lookup(comfort)
+    * The most waterproof covering item is found on endpoints, in gaps and nothing outside the ranges
+    """
+
+    # Arrange
+    dry, wet, warm = clothes(1, 0, 50, 10), clothes(2, 20, 30, 90), clothes(3, 50, 80, 40)
+    index = inventory_index.TypeIndex([dry, wet, warm])
+
+    # Act / Assert
+    self.assertIs(index.lookup(0), dry)
+    self.assertIs(index.lookup(19.9), dry)
+    self.assertIs(index.lookup(20), wet)
+    self.assertIs(index.lookup(30), wet)
+    self.assertIs(index.lookup(30.5), dry)
+    self.assertIs(index.lookup(50), warm)
+    self.assertIs(index.lookup(80), warm)
+    self.assertIsNone(index.lookup(-0.5))
+    self.assertIsNone(index.lookup(81))
+
+  def test_ties_go_to_lowest_pk(self):
+    """
+    Tests TypeIndex.lookup(comfort)
+    * Items with the same waterproof rating are picked by pk
+    """
+
+    # Arrange
+    index = inventory_index.TypeIndex([clothes(7, 0, 50, 30), clothes(3, 10, 60, 30)])
+
+    # Act / Assert
+    self.assertEqual(index.lookup(5).pk, 7)
+    self.assertEqual(index.lookup(20).pk, 3)
+
+  def test_best_missing_type(self):
+    """
+    Tests InventoryIndex.best(clothing_type, comfort)
+    * Sad Test
+    """
+
+    # Arrange
+    index = inventory_index.InventoryIndex([clothes(1, 0, 50, 10)])
+
+    # Act / Assert
+    with self.assertRaises(LookupError):
+      index.best("SHO", 10)
+    with self.assertRaises(LookupError):
+      index.best("HAT", 60)
+
+  def test_outfit_table(self):
+    """
+    Tests OutfitTable.lookup(comfort)
+    * Integers and the gaps between them get their own outfit, negative fractions the one of their ceiling
+    * Comforts where a type has nothing, or outside the populated range, have none
+    """
+
+    # Arrange
+    items = [
+      clothes(1, -5, 10, 20, "HAT"), clothes(2, 10, 20, 60, "HAT"),
+      clothes(3, -5, 20, 10, "SHR"), clothes(4, -5, 20, 10, "PNT"), clothes(5, -5, 15, 30, "SHO"),
+    ]
+    table = inventory_index.InventoryIndex(items, dense=True).table
+
+    # Act / Assert
+    self.assertEqual(table.lookup(9.5), ([items[0], items[2], items[3], items[4]], 17.5))
+    self.assertEqual(table.lookup(10), ([items[1], items[2], items[3], items[4]], 27.5))
+    self.assertEqual(table.lookup(-4.5), table.lookup(-4))
+    self.assertIsNone(table.lookup(15.5))
+    self.assertIsNone(table.lookup(-6))
+    self.assertIsNone(table.lookup(21))
+
+  def test_outfit_without_type(self):
+    """
+    Tests InventoryIndex.outfit(comfort)
+    * Sad Test
+    """
+
+    # Arrange
+    index = inventory_index.InventoryIndex([clothes(1, 0, 50, 10)], dense=True)
+
+    # Act / Assert
+    with self.assertRaises(LookupError):
+      index.outfit(10)
+
+  def test_alias_sampler(self):
+    """
+    Tests AliasSampler.sample(rng)
+    * Indexes are picked in proportion to their weights, zero weights never
+    """
+
+    # Arrange
+    sampler = inventory_index.AliasSampler([1, 0, 3, 6])
+    rng = random.Random(0)
+
+    # Act
+    picks = [sampler.sample(rng) for _ in range(20000)]
+
+    # Assert
+    self.assertEqual(picks.count(1), 0)
+    for i, share in [(0, 0.1), (2, 0.3), (3, 0.6)]:
+      self.assertAlmostEqual(picks.count(i) / len(picks), share, delta=0.02)
+
+  def test_alias_sampler_zero_weights(self):
+    """
+    Tests AliasSampler.sample(rng)
+    * All zero weights are picked uniformly
+    """
+
+    # Arrange
+    sampler = inventory_index.AliasSampler([0, 0])
+
+    # Act
+    picks = [sampler.sample(random.Random(seed)) for seed in range(200)]
+
+    # Assert
+    self.assertEqual(set(picks), {0, 1})
+
+  def test_pick(self):
+    """
+    Tests InventoryIndex.pick(clothing_type, comfort, weighted, rng)
+    * Only covering items are picked, None when there are none
+    """
+
+    # Arrange
+    items = [clothes(1, 0, 10, 50), clothes(2, 5, 20, 50), clothes(3, 30, 40, 50)]
+    index = inventory_index.InventoryIndex(items)
+
+    # Act
+    picked = {index.pick("HAT", 7, rng=random.Random(seed)).pk for seed in range(100)}
+    weighted = {index.pick("HAT", 7, weighted=True, rng=random.Random(seed)).pk for seed in range(100)}
+
+    # Assert
+    self.assertEqual(picked, {1, 2})
+    self.assertEqual(weighted, {1, 2})
+    self.assertEqual(index.covering("HAT", 7), (items[0], items[1]))
+    self.assertIsNone(index.pick("HAT", 25))
+    self.assertIsNone(index.pick("SHO", 7, weighted=True))
+
+
+class TestInventoryIndexFixture(TestCase):
+  """
+  Tests the index against the database on the generic clothes fixture.
+  """
+
+  fixtures = ['fixture_generic_clothes.json']
+
+  def test_matches_database(self):
+    """
+    Tests InventoryIndex.best(clothing_type, comfort)
+    * Every lookup picks what the equivalent query does
+    """
+
+    # Arrange
+    index = inventory_index.InventoryIndex(list(GenericClothes.objects.all()))
+
+    for comfort in [value / 2 for value in range(-140, 280)]:
+      for clothing_type in ["HAT", "SHR", "PNT", "SHO", "MIS"]:
+        # Act
+        expected = GenericClothes.objects.filter(
+          clothing_type=clothing_type, comfort_low__lte=comfort, comfort_high__gte=comfort
+        ).order_by('-waterproof_rating', 'pk').first()
+
+        try:
+          found = index.best(clothing_type, comfort)
+        except LookupError:
+          found = None
+
+        # Assert
+        self.assertEqual(found, expected, (clothing_type, comfort))
+
+  def test_table_matches_index(self):
+    """
+    Tests InventoryIndex.outfit(comfort)
+    * The precomputed table gives the outfits the per type lookups do
+    """
+
+    # Arrange
+    items = list(GenericClothes.objects.all())
+    dense, sparse = inventory_index.InventoryIndex(items, dense=True), inventory_index.InventoryIndex(items)
+
+    def outfit(index, comfort):
+      try:
+        return index.outfit(comfort)
+      except LookupError:
+        return None
+
+    for comfort in [value / 4 for value in range(-2000, 26000, 3)]:
+      # Act / Assert
+      self.assertEqual(outfit(dense, comfort), outfit(sparse, comfort), comfort)
+
+
+class TestInventoryIndexIntegration(TransactionTestCase):
+  """
+  Tests GenericClothes._get_clothes_in_temp with the index, outside of a transaction.
+  """
+
+  fixtures = ['fixture_generic_clothes.json']
+
+  def setUp(self):
+    inventory_index.invalidate()
+
+  def tearDown(self):
+    inventory_index.invalidate()
+
+  def test_no_queries(self):
+    """
+    Tests function _get_clothes_in_temp(cls, comfort)
+    * Once the index is built, outfits are found without queries
+    """
+
+    # Arrange
+    GenericClothes._get_clothes_in_temp(11)
+
+    # Act
+    with self.assertNumQueries(0):
+      outfit, water_avg = GenericClothes._get_clothes_in_temp(60)
+
+    # Assert
+    self.assertEqual([clothes.name for clothes in outfit], [
+        "Breathable Sun Hat", "Breathable Long Sleeve",
+        "Convertible Cargo Pants", "Breathable Trail Running Shoes"
+    ])
+    self.assertEqual(water_avg, 21.25)
+
+  def test_invalidated_on_save_and_delete(self):
+    """
+    Tests that saving or deleting clothes rebuilds the index
+    """
+
+    # Arrange
+    GenericClothes._get_clothes_in_temp(60)
+
+    # Act
+    hat = GenericClothes.objects.create(name="Rain Hat", clothing_type="HAT", comfort_low=50,
+                                        comfort_high=70, waterproof_rating=100)
+    with_hat, _ = GenericClothes._get_clothes_in_temp(60)
+    hat.delete()
+    without_hat, _ = GenericClothes._get_clothes_in_temp(60)
+
+    # Assert
+    self.assertEqual(with_hat[0].name, "Rain Hat")
+    self.assertEqual(without_hat[0].name, "Breathable Sun Hat")
+
+  def test_rebuilt_when_old(self):
+    """
+    Tests that an index older than max_age is rebuilt
+    """
+
+    # Arrange
+    index = inventory_index.current(GenericClothes)
+    index.built_at -= inventory_index.max_age
+
+    # Act
+    rebuilt = inventory_index.current(GenericClothes)
+
+    # Assert
+    self.assertIsNot(rebuilt, index)
+    self.assertIs(inventory_index.current(GenericClothes), rebuilt)
@@ -0,0 +1,100 @@
+"""
+Tests for periods.py, slimming the forecastHourly body down to the fields we use.
+"""
+
+import json
+from django.test import TestCase
+from ..periods import parse_periods, slim_period
+
+
+def forecast_body(periods):
+  """
+  Builds a forecastHourly body like api.weather.gov's.
+  """
+  return json.dumps({
+    "@context": ["https://geojson.org/geojson-ld/geojson-context.jsonld"],
+    "type": "Feature",
+    "properties": {
+      "units": "us",
+      "generatedAt": "2024-02-24T17:40:00+00:00",
+      "periods": periods,
+    },
+  }, indent=4).encode()
+
+
+PERIOD = {
+  "number": 1,
+  "name": "",
+  "startTime": "2024-02-24T18:00:00-07:00",
+  "endTime": "2024-02-24T19:00:00-07:00",
+  "isDaytime": False,
+  "temperature": 54,
+  "temperatureUnit": "F",
+  "temperatureTrend": None,
+  "probabilityOfPrecipitation": {"unitCode": "wmoUnit:percent", "value": 0},
+  "dewpoint": {"unitCode": "wmoUnit:degC", "value": -11.666666666666666},
+  "relativeHumidity": {"unitCode": "wmoUnit:percent", "value": 18},
+  "windSpeed": "10 mph",
+  "windDirection": "WNW",
+  "icon": "https://api.weather.gov/icons/land/night/bkn,0?size=small",
+  "shortForecast": "Mostly \"Cloudy\"",
+  "detailedForecast": ""
+}
+
+
+class TestPeriodsUnit(TestCase):
+  """
+  Tests parse_periods(body)
+  """
+
+  def test_parse_periods(self):
+    """
+    Tests parse_periods(body)
+    * Same values as the full periods
+    """
+
+    # Arrange
+    periods = [PERIOD, dict(PERIOD, startTime="2024-02-24T19:00:00-07:00", temperature=-3,
+                            probabilityOfPrecipitation={"unitCode": "wmoUnit:percent", "value": None})]
+    body = forecast_body(periods)
+
+    # Act
+    output = parse_periods(body)
+
+    # Assert
+    self.assertEqual(output, [slim_period(period) for period in periods])
+    self.assertEqual(output[1]["temperature"], -3)
+    self.assertEqual(output[0]["shortForecast"], 'Mostly "Cloudy"')
+
+  def test_parse_periods_drops_unused_fields(self):
+    """
+    Tests parse_periods(body)
+    * Only the fields the app reads are kept
+    """
+
+    output = parse_periods(forecast_body([PERIOD]))
+
+    self.assertEqual(list(output[0]), ["startTime", "temperature", "probabilityOfPrecipitation",
+                                       "relativeHumidity", "windSpeed", "shortForecast"])
+    self.assertEqual(output[0]["relativeHumidity"], {"value": 18})
+
+  def test_parse_periods_missing_fields(self):
+    """
+    Tests parse_periods(body)
+    * Optional fields that are missing are filled in
+    * A body that isn't a forecast raises
+    * Sad Test
+    """
+
+    # Arrange
+    no_summary = {key: value for key, value in PERIOD.items() if key not in ("shortForecast", "relativeHumidity")}
+    body = forecast_body([PERIOD, no_summary])
+
+    # Act
+    output = parse_periods(body)
+
+    # Assert
+    self.assertEqual([period["shortForecast"] for period in output], ['Mostly "Cloudy"', ""])
+    self.assertEqual(output[1]["relativeHumidity"], {"value": None})
+    with self.assertRaises(KeyError):
+      parse_periods(b'{"status": 503}')
@@ -0,0 +1,93 @@
+"""
+Tests for ratelimit.py, the token bucket in front of Nominatim.
+"""
+
+import tempfile
+from pathlib import Path
+from django.test import TestCase
+from ..ratelimit import FileTokenBucket, RateLimitTimeout, TokenBucket
+from .utils import FakeClock
+
+
+class TestTokenBucketUnit(TestCase):
+  """
+  Tests TokenBucket.acquire()
+  """
+
+  def test_queues_a_burst(self):
+    """
+    Tests that a burst beyond capacity waits for its turn, one token per 1 / rate seconds
+    """
+
+    # Arrange
+    clock = FakeClock()
+    bucket = TokenBucket(rate=1, capacity=2, max_wait=5, clock=clock, sleep=clock.sleep)
+
+    # Act
+    waits = [bucket.acquire() for _ in range(4)]
+
+    # Assert
+    self.assertEqual(waits, [0.0, 0.0, 1.0, 2.0])
+    self.assertEqual(clock.sleeps, [1.0, 2.0])
+    self.assertEqual(bucket.stats(), {"acquired": 4, "waited": 2, "rejected": 0})
+
+  def test_refills(self):
+    """
+    Tests that tokens come back over time, up to capacity
+    """
+
+    # Arrange
+    clock = FakeClock()
+    bucket = TokenBucket(rate=1, capacity=1, max_wait=5, clock=clock, sleep=clock.sleep)
+    bucket.acquire()
+
+    # Act
+    clock.now += 10
+    first = bucket.acquire()
+    second = bucket.acquire()
+
+    # Assert
+    self.assertEqual((first, second), (0.0, 1.0))
+
+  def test_saturated_queue_times_out(self):
+    """
+    Tests that a caller that would wait longer than max_wait gets RateLimitTimeout right away
+    * Sad Test
+    """
+
+    # Arrange
+    clock = FakeClock()
+    bucket = TokenBucket(rate=1, capacity=1, max_wait=2, clock=clock, sleep=clock.sleep)
+    for _ in range(3):
+      bucket.acquire()
+
+    # Act / Assert
+    with self.assertRaises(RateLimitTimeout):
+      bucket.acquire()
+    self.assertEqual(bucket.stats()["rejected"], 1)
+
+
+class TestFileTokenBucketUnit(TestCase):
+  """
+  Tests FileTokenBucket.acquire()
+  """
+
+  def test_shared_between_buckets(self):
+    """
+    Tests that two buckets on the same file (e.g. two worker processes) share one budget
+    """
+
+    with tempfile.TemporaryDirectory() as directory:
+      # Arrange
+      path = Path(directory) / "nominatim.bucket"
+      sleeps = []
+      first = FileTokenBucket(path, rate=0.01, capacity=1, max_wait=1000, sleep=sleeps.append)
+      second = FileTokenBucket(path, rate=0.01, capacity=1, max_wait=1000, sleep=sleeps.append)
+
+      # Act
+      first_wait = first.acquire()
+      second_wait = second.acquire()
+
+    # Assert
+    self.assertEqual(first_wait, 0.0)
+    self.assertGreater(second_wait, 90)
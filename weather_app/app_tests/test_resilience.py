@@ -0,0 +1,264 @@
+"""
+Tests for resilience.py, retries, hedging and circuit breaking around api.weather.gov.
+"""
+
+import asyncio
+import threading
+import requests
+from unittest.mock import MagicMock
+from django.test import TestCase
+from ..client import ForecastClient
+from ..resilience import CircuitBreaker, CircuitOpenError, Resilience
+from ..transports import LocalTransport
+from .utils import FakeClock
+
+
+def response(status_code, headers=None):
+  return MagicMock(status_code=status_code, headers=headers or {})
+
+
+class TestResilienceUnit(TestCase):
+  """
+  Tests Resilience.call(send)
+  """
+
+  def setUp(self):
+    self.sleeps = []
+    self.clock = FakeClock()
+
+  def _resilience(self, **kwargs):
+    def sleep(seconds):
+      self.sleeps.append(seconds)
+      self.clock.now += seconds
+
+    return Resilience(clock=self.clock, sleep=sleep, **kwargs)
+
+  def test_retries_transient_errors(self):
+    """
+    Tests that a 503 and a connection error are retried until the call answers
+    * Backoff is jittered below the exponential bound
+    """
+
+    # Arrange
+    send = MagicMock(side_effect=[response(503), requests.ConnectionError("reset"), response(200)])
+    resilience = self._resilience(attempts=3, backoff=0.2)
+
+    # Act
+    result = resilience.call(send)
+
+    # Assert
+    self.assertEqual(result.status_code, 200)
+    self.assertEqual(send.call_count, 3)
+    self.assertEqual(len(self.sleeps), 2)
+    self.assertLessEqual(self.sleeps[0], 0.2)
+    self.assertLessEqual(self.sleeps[1], 0.4)
+
+  def test_does_not_retry_answers(self):
+    """
+    Tests that a 404 is an answer, not a failure
+    """
+
+    # Arrange
+    send = MagicMock(return_value=response(404))
+
+    # Act
+    result = self._resilience().call(send)
+
+    # Assert
+    self.assertEqual(result.status_code, 404)
+    send.assert_called_once()
+
+  def test_gives_up_at_deadline(self):
+    """
+    Tests that no retry starts past the deadline, the last response is returned
+    * Sad Test
+    """
+
+    # Arrange
+    def slow_failure():
+      self.clock.now += 10
+      return response(500)
+
+    resilience = self._resilience(attempts=5, deadline=15)
+
+    # Act
+    result = resilience.call(slow_failure)
+
+    # Assert
+    self.assertEqual(result.status_code, 500)
+    self.assertEqual(resilience.counters["retries"], 1)
+
+  def test_honors_retry_after(self):
+    """
+    Tests that a Retry-After header sets the backoff (capped at max_backoff)
+    """
+
+    # Arrange
+    send = MagicMock(side_effect=[response(429, {"Retry-After": "1"}), response(200)])
+
+    # Act
+    self._resilience(max_backoff=2.0).call(send)
+
+    # Assert
+    self.assertEqual(self.sleeps, [1.0])
+
+  def test_hedges_slow_calls(self):
+    """
+    Tests that a call slower than hedge_after gets a second attempt, and the fast one wins
+    """
+
+    # Arrange
+    release = threading.Event()
+    calls = []
+
+    def send():
+      calls.append(1)
+      if len(calls) == 1:
+        release.wait(5)
+        return response(200, {"attempt": "first"})
+      return response(200, {"attempt": "second"})
+
+    resilience = Resilience(attempts=1, hedge_after=0.05)
+
+    # Act
+    result = resilience.call(send)
+    release.set()
+
+    # Assert
+    self.assertEqual(result.headers["attempt"], "second")
+    self.assertEqual(resilience.counters["hedges"], 1)
+
+  def test_acall_retries(self):
+    """
+    Tests Resilience.acall(send)
+    * Same retries as call, for coroutines
+    """
+
+    # Arrange
+    responses = iter([response(502), response(200)])
+
+    async def send():
+      return next(responses)
+
+    resilience = Resilience(attempts=2, backoff=0.001)
+
+    # Act
+    result = asyncio.run(resilience.acall(send))
+
+    # Assert
+    self.assertEqual(result.status_code, 200)
+    self.assertEqual(resilience.counters["retries"], 1)
+
+
+class TestCircuitBreakerUnit(TestCase):
+  """
+  Tests CircuitBreaker through Resilience.call(send)
+  """
+
+  def test_opens_and_recovers(self):
+    """
+    Tests that the breaker opens after repeated failures, fails fast while open and closes
+    after a successful trial call
+    """
+
+    # Arrange
+    clock = FakeClock()
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=30, clock=clock)
+    resilience = Resilience(attempts=1, breaker=breaker)
+    failing = MagicMock(side_effect=requests.ConnectTimeout("timed out"))
+    working = MagicMock(return_value=response(200))
+
+    # Act
+    for _ in range(2):
+      with self.assertRaises(requests.ConnectTimeout):
+        resilience.call(failing)
+    with self.assertRaises(CircuitOpenError):
+      resilience.call(working)
+    clock.now += 30
+    result = resilience.call(working)
+
+    # Assert
+    self.assertEqual(failing.call_count, 2)
+    self.assertEqual(result.status_code, 200)
+    working.assert_called_once()
+    self.assertEqual(breaker.state, CircuitBreaker.CLOSED)
+    self.assertEqual(resilience.counters["short_circuits"], 1)
+
+  def test_failed_trial_reopens(self):
+    """
+    Tests that a failed trial call opens the breaker again
+    * Sad Test
+    """
+
+    # Arrange
+    clock = FakeClock()
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=30, clock=clock)
+    breaker.record_failure()
+    clock.now += 30
+
+    # Act
+    allowed = breaker.allow()
+    second_allowed = breaker.allow()
+    breaker.record_failure()
+
+    # Assert
+    self.assertTrue(allowed)
+    self.assertFalse(second_allowed)
+    self.assertEqual(breaker.state, CircuitBreaker.OPEN)
+
+
+  def test_cancelled_trial_reopens(self):
+    """
+    Tests that a cancelled trial call opens the breaker again instead of leaving it half open
+    * Sad Test
+    """
+
+    # Arrange
+    clock = FakeClock()
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=30, clock=clock)
+    resilience = Resilience(attempts=1, breaker=breaker)
+    breaker.record_failure()
+    clock.now += 30
+
+    async def hang():
+      await asyncio.sleep(10)
+
+    async def cancel_trial():
+      trial = asyncio.ensure_future(resilience.acall(hang))
+      await asyncio.sleep(0)
+      trial.cancel()
+      with self.assertRaises(asyncio.CancelledError):
+        await trial
+
+    # Act
+    asyncio.run(cancel_trial())
+    reopened = breaker.state
+    clock.now += 30
+    allowed = breaker.allow()
+
+    # Assert
+    self.assertEqual(reopened, CircuitBreaker.OPEN)
+    self.assertTrue(allowed)
+
+
+class TestForecastClientResilienceUnit(TestCase):
+  """
+  Tests ForecastClient.get(url) with a Resilience
+  """
+
+  def test_client_retries(self):
+    """
+    Tests that the client's calls go through the resilience layer
+    """
+
+    # Arrange
+    replies = iter([(503, {}), {"properties": {}}])
+    transport = LocalTransport({"https://api.weather.gov/test_url": lambda request: next(replies)})
+    forecast_client = ForecastClient(transport=transport, resilience=Resilience(sleep=lambda seconds: None))
+
+    # Act
+    result = forecast_client.get("https://api.weather.gov/test_url")
+
+    # Assert
+    self.assertEqual(result.status_code, 200)
+    self.assertEqual(len(transport.calls), 2)
@@ -0,0 +1,59 @@
+"""
+Tests for revalidation.py, reading api.weather.gov's caching headers.
+"""
+
+from django.test import TestCase
+from .. import revalidation
+from ..revalidation import conditional_headers, freshness_lifetime, not_modified, remember
+
+
+class TestRevalidationUnit(TestCase):
+  """
+  Tests freshness lifetimes and conditional request headers.
+  """
+
+  def setUp(self):
+    revalidation.validators.clear()
+
+  def test_freshness_lifetime(self):
+    """
+    Tests freshness_lifetime(headers)
+    * s-maxage wins over max-age, which wins over Expires
+    """
+
+    self.assertEqual(freshness_lifetime({"Cache-Control": "public, max-age=600"}), 600)
+    self.assertEqual(freshness_lifetime({"Cache-Control": "public, max-age=600, s-maxage=120"}), 120)
+    self.assertEqual(freshness_lifetime({
+      "Expires": "Sat, 24 Feb 2024 18:10:00 GMT",
+      "Date": "Sat, 24 Feb 2024 18:00:00 GMT",
+    }), 600)
+
+  def test_freshness_lifetime_unknown(self):
+    """
+    Tests freshness_lifetime(headers)
+    * no-cache means revalidate every time, no usable headers means None
+    * Sad Test
+    """
+
+    self.assertEqual(freshness_lifetime({"Cache-Control": "no-cache"}), 0)
+    self.assertIsNone(freshness_lifetime({}))
+    self.assertIsNone(freshness_lifetime({"Expires": "0"}))
+
+  def test_conditional_headers(self):
+    """
+    Tests conditional_headers(url), remember(url, headers, value), not_modified(url)
+    * Only urls with validators get conditional headers
+    """
+
+    # Arrange
+    remember("https://api.weather.gov/a", {"ETag": '"v1"', "Last-Modified": "Sat, 24 Feb 2024 18:00:00 GMT"}, ["a"])
+    remember("https://api.weather.gov/b", {}, ["b"])
+
+    # Act
+    headers = conditional_headers("https://api.weather.gov/a")
+
+    # Assert
+    self.assertEqual(headers, {"If-None-Match": '"v1"', "If-Modified-Since": "Sat, 24 Feb 2024 18:00:00 GMT"})
+    self.assertEqual(conditional_headers("https://api.weather.gov/b"), {})
+    self.assertEqual(not_modified("https://api.weather.gov/a"), ["a"])
+    self.assertIsNone(not_modified("https://api.weather.gov/b"))
@@ -0,0 +1,247 @@
+"""
+Tests for singleflight.py, coalescing concurrent forecast calls.
+"""
+
+import asyncio
+import multiprocessing
+import os
+import tempfile
+import threading
+import time
+from pathlib import Path
+from unittest.mock import patch
+from django.test import TestCase
+from ..cache_backends import SQLiteBackend
+from ..forecast_cache import ForecastCache, Loaded
+from ..models import Weather
+from ..singleflight import SingleFlight, FileLockSingleFlight, AsyncSingleFlight
+from .. import forecast_cache, singleflight
+
+
+class TestSingleFlightUnit(TestCase):
+  """
+  Tests the in-process and cross-process single-flight layers.
+  """
+
+  def _run_concurrently(self, flight, fn, callers=5, **kwargs):
+    """
+    Calls flight.do("key", fn) from several threads at once, returns the results (or errors).
+    """
+    results = []
+
+    def caller():
+      try:
+        results.append(flight.do("key", fn, **kwargs))
+      except Exception as e:
+        results.append(e)
+
+    threads = [threading.Thread(target=caller) for _ in range(callers)]
+    for thread in threads:
+      thread.start()
+    return threads, results
+
+  def test_do_coalesces_concurrent_calls(self):
+    """
+    Tests SingleFlight.do(key, fn)
+    * Concurrent callers share one call and its result
+    """
+
+    # Arrange
+    flight = SingleFlight()
+    release = threading.Event()
+    calls = []
+
+    def fetch():
+      calls.append(1)
+      release.wait(5)
+      return "forecast"
+
+    # Act
+    threads, results = self._run_concurrently(flight, fetch)
+    # let every caller join the in-flight call before it finishes
+    while flight.stats()["coalesced"] < 4:
+      time.sleep(0.001)
+    release.set()
+    for thread in threads:
+      thread.join()
+
+    # Assert
+    self.assertEqual(len(calls), 1)
+    self.assertEqual(results, ["forecast"] * 5)
+    self.assertEqual(flight.stats(), {"executed": 1, "coalesced": 4, "in_flight": 0})
+
+  def test_do_shares_errors(self):
+    """
+    Tests SingleFlight.do(key, fn)
+    * Every coalesced caller gets the error
+    * Sad Test
+    """
+
+    # Arrange
+    flight = SingleFlight()
+    release = threading.Event()
+
+    def fetch():
+      release.wait(5)
+      raise ConnectionError("upstream down")
+
+    # Act
+    threads, results = self._run_concurrently(flight, fetch, callers=3)
+    while flight.stats()["coalesced"] < 2:
+      time.sleep(0.001)
+    release.set()
+    for thread in threads:
+      thread.join()
+
+    # Assert
+    self.assertEqual(len(results), 3)
+    self.assertTrue(all(isinstance(result, ConnectionError) for result in results))
+
+  def test_do_runs_again_after_completion(self):
+    """
+    Tests SingleFlight.do(key, fn)
+    * Only in-flight calls are shared, later calls run again
+    """
+
+    flight = SingleFlight()
+
+    flight.do("key", lambda: 1)
+    result = flight.do("key", lambda: 2)
+
+    self.assertEqual(result, 2)
+    self.assertEqual(flight.stats()["executed"], 2)
+
+  def test_file_lock_rechecks_after_waiting(self):
+    """
+    Tests FileLockSingleFlight.do(key, fn, recheck)
+    * A second process (here a second instance) waiting on the lock uses recheck instead of calling fn
+    """
+
+    with tempfile.TemporaryDirectory() as directory:
+      # Arrange
+      first, second = FileLockSingleFlight(directory), FileLockSingleFlight(directory)
+      shared_cache = {}
+      locked = threading.Event()
+      release = threading.Event()
+
+      def slow_fetch():
+        locked.set()
+        release.wait(5)
+        shared_cache["key"] = "forecast"
+        return "forecast"
+
+      # Act
+      thread = threading.Thread(target=lambda: first.do("key", slow_fetch))
+      thread.start()
+      locked.wait(5)
+      timer = threading.Timer(0.2, release.set)
+      timer.start()
+      result = second.do("key", lambda: "second fetch", recheck=lambda: shared_cache.get("key"))
+      thread.join()
+      timer.join()
+
+      # Assert
+      self.assertEqual(result, "forecast")
+      self.assertEqual(second.stats()["coalesced"], 1)
+
+  def test_file_lock_stores_before_unlocking(self):
+    """
+    Tests FileLockSingleFlight.do(key, fn, recheck, store)
+    * store runs while the lock is held, and a caller that gets the lock without waiting still rechecks
+    """
+
+    with tempfile.TemporaryDirectory() as directory:
+      # Arrange
+      first, second = FileLockSingleFlight(directory), FileLockSingleFlight(directory)
+      shared_cache = {}
+      locked_while_storing = []
+
+      def store(result):
+        lock_path = next(Path(directory).glob("*.lock"))
+        with open(lock_path, "a") as lock_file:
+          locked_while_storing.append(not second._try_lock(lock_file))
+        shared_cache["key"] = result
+
+      # Act
+      first.do("key", lambda: "forecast", recheck=lambda: shared_cache.get("key"), store=store)
+      result = second.do("key", lambda: "second fetch", recheck=lambda: shared_cache.get("key"), store=store)
+
+      # Assert
+      self.assertEqual(locked_while_storing, [True])
+      self.assertEqual(result, "forecast")
+      self.assertEqual(second.stats()["coalesced"], 1)
+
+  def test_two_processes_fetch_once(self):
+    """
+    Tests Weather._load_periods with FileLockSingleFlight and a forecast cache in a shared file
+    * Two worker processes missing the same forecast at once call api.weather.gov once,
+    however slowly the forecast is written to the shared cache
+    """
+
+    with tempfile.TemporaryDirectory() as directory:
+      # Arrange
+      fetches = Path(directory) / "fetches"
+      context = multiprocessing.get_context("fork")
+      barrier = context.Barrier(2)
+
+      def fetch(forecast_url):
+        with open(fetches, "a") as fetch_log:
+          fetch_log.write(f"{os.getpid()}\n")
+        return 200, Loaded("forecast", 900)
+
+      set_forecast = ForecastCache.set
+
+      def slow_set(cache, *args, **kwargs):
+        time.sleep(0.2)
+        set_forecast(cache, *args, **kwargs)
+
+      def worker():
+        # each process builds its own cache and flight over the shared files, like a gunicorn worker
+        forecast_cache.forecast_cache = ForecastCache(backend=SQLiteBackend(Path(directory) / "forecasts.sqlite"))
+        singleflight.forecast_flight = FileLockSingleFlight(Path(directory) / "locks")
+        with patch.object(Weather, "_fetch_forecast", fetch), patch.object(ForecastCache, "set", slow_set):
+          # only makes the two misses likely to overlap, one fetch is expected in any order
+          try:
+            barrier.wait(5)
+          except threading.BrokenBarrierError:
+            pass
+          value = forecast_cache.forecast_cache.get(
+            "url", lambda: Weather._load_periods(38.8, -104.8, "url"))
+        os._exit(0 if value == "forecast" else 1)
+
+      # Act
+      processes = [context.Process(target=worker) for _ in range(2)]
+      for process in processes:
+        process.start()
+      for process in processes:
+        process.join(10)
+
+      # Assert
+      self.assertEqual([process.exitcode for process in processes], [0, 0])
+      self.assertEqual(len(fetches.read_text().splitlines()), 1)
+
+  def test_async_do_coalesces(self):
+    """
+    Tests AsyncSingleFlight.do(key, fn)
+    * Concurrent coroutines share one call
+    """
+
+    # Arrange
+    flight = AsyncSingleFlight()
+    calls = []
+
+    async def fetch():
+      calls.append(1)
+      await asyncio.sleep(0.01)
+      return "forecast"
+
+    async def main():
+      return await asyncio.gather(*[flight.do("key", fetch) for _ in range(4)])
+
+    # Act
+    results = asyncio.run(main())
+
+    # Assert
+    self.assertEqual(results, ["forecast"] * 4)
+    self.assertEqual(len(calls), 1)
+    self.assertEqual(flight.stats(), {"executed": 1, "coalesced": 3, "in_flight": 0})
@@ -0,0 +1,99 @@
+"""
+Tests for stubs.py, the api.weather.gov and Nominatim stand-in for load runs.
+"""
+
+import json
+import tempfile
+import threading
+from pathlib import Path
+from unittest.mock import patch
+from django.test import TestCase
+from geopy.geocoders import Nominatim
+from ..client import ForecastClient
+from ..models import Weather
+from ..stubs import StubUpstream, make_server
+from .. import client, forecast_cache, geocoding, revalidation
+
+
+class TestStubUpstreamUnit(TestCase):
+  """
+  Tests StubUpstream.answer(path)
+  """
+
+  def test_made_up_answers(self):
+    """
+    Tests that /points leads to a forecast on the stub, and /search answers like Nominatim
+    """
+
+    # Arrange
+    upstream = StubUpstream("http://stub", periods=3)
+
+    # Act
+    points_status, points_body, _ = upstream.answer("/points/38.8967,-104.8007")
+    forecast_url = json.loads(points_body)["properties"]["forecastHourly"]
+    forecast_status, forecast_body, forecast_headers = upstream.answer(forecast_url[len("http://stub"):])
+    search_status, search_body, _ = upstream.answer("/search?q=colorado+springs&format=json&limit=1")
+
+    # Assert
+    self.assertEqual((points_status, forecast_status, search_status), (200, 200, 200))
+    self.assertTrue(forecast_url.startswith("http://stub/gridpoints/STB/"))
+    self.assertEqual(len(json.loads(forecast_body)["properties"]["periods"]), 3)
+    self.assertIn("max-age", forecast_headers["Cache-Control"])
+    self.assertEqual(json.loads(search_body)[0]["display_name"], "Colorado Springs, United States")
+    self.assertEqual(upstream.answer("/unknown")[0], 404)
+
+  def test_fixtures_and_errors(self):
+    """
+    Tests that fixtures win over made up answers, and error_rate fails answers with 503
+    """
+
+    with tempfile.TemporaryDirectory() as directory:
+      # Arrange
+      path = Path(directory) / "fixtures.json"
+      path.write_text(json.dumps({"/points/0.0,0.0": {"status": 404, "body": {"status": 404}}}))
+
+      # Act
+      recorded = StubUpstream("http://stub", fixtures_path=path).answer("/points/0.0,0.0")
+      failing = StubUpstream("http://stub", error_rate=1.0).answer("/points/38.8967,-104.8007")
+
+    # Assert
+    self.assertEqual(recorded[0], 404)
+    self.assertEqual(failing[0], 503)
+
+
+class TestStubServerIntegration(TestCase):
+  """
+  Tests the full forecast pipeline against the stub server.
+  """
+
+  def setUp(self):
+    geocoding.geocode_cache.clear()
+    forecast_cache.forecast_cache.clear()
+    revalidation.validators.clear()
+
+    upstream = StubUpstream("http://127.0.0.1", periods=30)
+    self.server = make_server(upstream, port=0)
+    host, port = self.server.server_address
+    upstream.base_url = self.base_url = f"http://{host}:{port}"
+    threading.Thread(target=self.server.serve_forever, daemon=True).start()
+    self.addCleanup(self.server.server_close)
+    self.addCleanup(self.server.shutdown)
+
+  def test_get_weather_forecast(self):
+    """
+    Tests that get_weather_forecast works end to end with the clients pointed at the stub
+    """
+
+    # Arrange
+    stub_nominatim = Nominatim(user_agent="Weather App", domain=self.base_url[len("http://"):], scheme="http")
+
+    # Act
+    with (
+      patch.object(client, '_client', ForecastClient(base_url=self.base_url)),
+      patch.object(geocoding, 'nominatim', stub_nominatim)
+    ):
+      forecast = Weather.get_weather_forecast("Some Town Nowhere")
+
+    # Assert
+    self.assertEqual(len(forecast["temperature"]), 30)
+    self.assertEqual(str(forecast["location"]), "Some Town Nowhere, United States")
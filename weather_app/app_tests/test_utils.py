@@ -2,6 +2,7 @@
 Tests the utils.py function in the application. This is not test utilities.
 """
 
+from array import array
 from django.test import TestCase
 from .. import utils
 
@@ -76,6 +77,52 @@ class TestUtilsUnit(TestCase):
     with self.assertRaises(ValueError):
       utils.calculate_windchill(temperature, wind_speed)
 
+  def test_calculate_heat_indexes_and_windchills(self):
+    """
+    Tests functions calculate_heat_indexes(temperatures, humidities) and calculate_windchills(temperatures, wind_speeds)
+    * Every value is exactly the scalar function's
+    """
+
+    # Arrange
+    temperatures = array('h', [41, 51, 76, 80, 95])
+    humidities = [60, 65, 0, 60, 33.3]
+    wind_speeds = array('d', [10, 10, 0, 2.5, 10])
+
+    # Act
+    heat_indexes = utils.calculate_heat_indexes(temperatures, humidities)
+    windchills = utils.calculate_windchills(temperatures, wind_speeds)
+
+    # Assert
+    self.assertEqual(list(heat_indexes), [utils.calculate_heat_index(t, h) for t, h in zip(temperatures, humidities)])
+    self.assertEqual(list(windchills), [utils.calculate_windchill(t, w) for t, w in zip(temperatures, wind_speeds)])
+
+  def test_calculate_feels_like(self):
+    """
+    Tests function calculate_feels_like(temperatures, humidities, wind_speeds)
+    * Hours above 75 get the heat index, the others the wind chill
+    """
+
+    # Act
+    feels_like = utils.calculate_feels_like([75, 76, 40], [60, 65, 50], [10, 10, 20])
+
+    # Assert
+    self.assertEqual(list(feels_like), [
+      utils.calculate_windchill(75, 10), utils.calculate_heat_index(76, 65), utils.calculate_windchill(40, 20)
+    ])
+
+  def test_calculate_feels_like_invalid_inputs(self):
+    """
+    Tests function calculate_feels_like(temperatures, humidities, wind_speeds)
+    * Tests that columns of different lengths and negative inputs throw errors
+    """
+
+    with self.assertRaises(ValueError):
+      utils.calculate_feels_like([80, 80], [60], [10, 10])
+    with self.assertRaises(ValueError):
+      utils.calculate_feels_like([80], [-1], [10])
+    with self.assertRaises(ValueError):
+      utils.calculate_feels_like([70], [60], [-1])
+
   def test_get_xth_hour_weather(self):
     """
     Tests function get_xth_hour_weather(hour, weather_data)
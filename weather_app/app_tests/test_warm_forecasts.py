@@ -0,0 +1,59 @@
+"""
+Tests for the warm_forecasts management command.
+"""
+
+import tempfile
+from datetime import timedelta
+from io import StringIO
+from unittest.mock import patch
+from django.core.management import call_command
+from django.test import TestCase
+from django.utils import timezone
+from ..models import Location
+
+
+class TestWarmForecastsCommand(TestCase):
+  """
+  Tests python manage.py warm_forecasts
+  """
+
+  def test_warm_forecasts_file(self):
+    """
+    Tests warm_forecasts --file
+    * Every location in the file goes through get_weather_forecast
+    * Failures are reported without stopping the others
+    """
+
+    # Arrange
+    with tempfile.NamedTemporaryFile("w", suffix=".txt", delete=False) as locations_file:
+      locations_file.write("# campus\n80918\n\nCanada\n")
+    output = StringIO()
+
+    # Act
+    with patch('weather_app.models.Weather.get_weather_forecast') as mock_get_weather_forecast:
+      mock_get_weather_forecast.side_effect = lambda location: {"hours": [1]} if location == "80918" else None
+      call_command("warm_forecasts", file=locations_file.name, rate=0, stdout=output)
+
+    # Assert
+    self.assertEqual(sorted(call.args[0] for call in mock_get_weather_forecast.call_args_list), ["80918", "Canada"])
+    self.assertIn("80918: ok", output.getvalue())
+    self.assertIn("Canada: no forecast", output.getvalue())
+    self.assertIn("Warmed 1/2 locations", output.getvalue())
+
+  def test_warm_forecasts_recent(self):
+    """
+    Tests warm_forecasts --recent
+    * Without a file the most recently used locations are warmed
+    """
+
+    # Arrange
+    Location.objects.create(name="Denver", query="denver", last_used=timezone.now() - timedelta(days=1))
+    Location.objects.create(name="Boulder", query="boulder")
+
+    # Act
+    with patch('weather_app.management.commands.warm_forecasts.warm') as mock_warm:
+      mock_warm.side_effect = lambda location, pacer: (location, "ok", 0.01)
+      call_command("warm_forecasts", recent=1, stdout=StringIO())
+
+    # Assert
+    self.assertEqual([call.args[0] for call in mock_warm.call_args_list], ["boulder"])
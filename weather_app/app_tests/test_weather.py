@@ -3,19 +3,40 @@ Tests for the Weather model, View, and API calls.
 """
 
 from unittest.mock import patch, call
-from django.test import TestCase
+from django.test import TestCase, RequestFactory
 from django.urls import reverse
-from requests import ConnectTimeout, Response
+from requests import ConnectTimeout
 import json
-from ..models import Weather
-from ..views import WeatherView
+from datetime import timedelta, timezone as dt_timezone
+from django.utils import timezone
+from ..models import Weather, Gridpoint, Location
+from ..views import WeatherView, AsyncWeatherView
+from ..client import ForecastClient, AsyncForecastClient
+from ..transports import LocalTransport
+from ..geocoding import geocode_cache
+from .. import client
+from .. import forecast_cache
+from ..forecast_cache import Loaded
+from .. import revalidation
+from .. import ratelimit
 from .. import models
+from ..resilience import CircuitBreaker, Resilience
 
 class TestWeatherUnitTest(TestCase):
   """
   Tests epics Weather #31  
   """
 
+  def setUp(self):
+    # geocoded locations and forecasts are cached in memory between requests (and so between tests)
+    geocode_cache.clear()
+    forecast_cache.forecast_cache.clear()
+    revalidation.validators.clear()
+    # Nominatim is mocked, so its rate limit only slows the tests down
+    ratelimit_patch = patch.object(ratelimit, 'nominatim_bucket', ratelimit.TokenBucket(rate=1000, capacity=1000))
+    ratelimit_patch.start()
+    self.addCleanup(ratelimit_patch.stop)
+
   # --------------------------- _get_weather ---------------------------
 
   def test__get_weather(self):
@@ -30,28 +51,23 @@ class TestWeatherUnitTest(TestCase):
     latitude = "40.7128"
     longitude = "-74.0060"
 
-    example_response = {
-      "properties": {"forecastHourly": "test_url", "periods": "test_weather_data"}
-    }
-    
-    mock_get_return = Response()
-    mock_get_return.status_code = 200
-    mock_get_return.json = lambda : example_response
+    transport = LocalTransport({
+      "https://api.weather.gov/points/40.7128,-74.0060": {"properties": {"forecastHourly": "https://api.weather.gov/test_url"}},
+      "https://api.weather.gov/test_url": {"properties": {"periods": "test_weather_data"}},
+    })
 
-    # url, timeout
     expected_weather_calls = [
-      call('https://api.weather.gov/points/40.7128,-74.0060', timeout=20),
-      call('test_url', timeout=20),
+      "https://api.weather.gov/points/40.7128,-74.0060",
+      "https://api.weather.gov/test_url",
     ]
   
     # Act
-    with patch('requests.get') as mock_get:
-      mock_get.return_value = mock_get_return
+    with patch.object(client, '_client', ForecastClient(transport=transport)):
       weather_data = Weather._get_weather(latitude, longitude)
       
-      # Assert
-      self.assertEqual(weather_data, "test_weather_data")
-      mock_get.assert_has_calls(expected_weather_calls, any_order=False)
+    # Assert
+    self.assertEqual(weather_data, "test_weather_data")
+    self.assertEqual(transport.calls, expected_weather_calls)
   
   def test__get_weather_failed_api(self):
     """
@@ -64,23 +80,36 @@ class TestWeatherUnitTest(TestCase):
     latitude = "40.7128"
     longitude = "-74.0060"
 
-    example_response = {
-      "properties": {"forecastHourly": "test_url", "periods": "test_weather_data"},
-      "status": "failed"
-    }
-
-    mock_get_return = Response()
-    mock_get_return.status_code = 500
-    mock_get_return.json = lambda : example_response
+    transport = LocalTransport({
+      "https://api.weather.gov/points/40.7128,-74.0060": (500, {"properties": {"forecastHourly": "test_url"}, "status": "failed"}),
+    })
 
     # Act
-    with patch('requests.get') as mock_get:
-      mock_get.return_value = mock_get_return
+    with patch.object(client, '_client', ForecastClient(transport=transport)):
       weather_data = Weather._get_weather(latitude, longitude)
 
-      # Assert
-      self.assertEqual(weather_data, None)
+    # Assert
+    self.assertEqual(weather_data, None)
+
+  def test__get_weather_failed_forecast(self):
+    """
+    Tests function _get_weather(latitude, longitute).
+    * Tests that _get_weather returns none if the forecast server fails after the location is found
+    * Sad Test
+    """
+
+    # Arrange
+    transport = LocalTransport({
+      "https://api.weather.gov/points/40.7128,-74.0060": {"properties": {"forecastHourly": "https://api.weather.gov/test_url"}},
+      "https://api.weather.gov/test_url": (500, {"status": 500}),
+    })
 
+    # Act
+    with patch.object(client, '_client', ForecastClient(transport=transport)):
+      weather_data = Weather._get_weather("40.7128", "-74.0060")
+
+    # Assert
+    self.assertEqual(weather_data, None)
   
   def test__get_weather_bad_inputs(self):
     """
@@ -93,25 +122,123 @@ class TestWeatherUnitTest(TestCase):
     # Arrange
     latitude = "40.7128"
     longitude = "-74.0060"
-    
-    example_response = {
-      "properties": {"forecastHourly": "test_url", "periods": "test_weather_data"}
-    }
-    
-    mock_get_return = Response()
-    mock_get_return.status_code = 200
-    # https://stackoverflow.com/questions/8294618/define-a-lambda-expression-that-raises-an-exception
-    # lambda expressions do not allow raise statements
-    mock_get_return.json = lambda : exec('raise ConnectTimeout') # requests.get throws error when times out
+
+    # requests.get throws error when times out
+    transport = LocalTransport({
+      "https://api.weather.gov/points/40.7128,-74.0060": ConnectTimeout(),
+    })
     
     # Act
-    with patch('requests.get') as mock_get:
-      mock_get.return_value = mock_get_return
+    with patch.object(client, '_client', ForecastClient(transport=transport)):
 
       # Assert
       with self.assertRaises(ConnectTimeout):
         weather_data = Weather._get_weather(latitude, longitude)    
       
+  def test__get_weather_reuses_gridpoint(self):
+    """
+    Tests function _get_weather(latitude, longitute).
+    * Tests that the /points lookup only happens the first time a coordinate is seen
+    """
+
+    # Arrange
+    transport = LocalTransport({
+      "https://api.weather.gov/points/40.7128,-74.0060": {"properties": {"forecastHourly": "https://api.weather.gov/test_url", "gridId": "OKX", "gridX": 33, "gridY": 35}},
+      "https://api.weather.gov/test_url": {"properties": {"periods": "test_weather_data"}},
+    })
+
+    # Act
+    with patch.object(client, '_client', ForecastClient(transport=transport)):
+      Weather._get_weather(40.7128, -74.0060)
+      # so the forecast itself is fetched again
+      forecast_cache.forecast_cache.clear()
+      weather_data = Weather._get_weather(40.7128, -74.0060)
+
+    # Assert
+    self.assertEqual(weather_data, "test_weather_data")
+    self.assertEqual(transport.calls, [
+      "https://api.weather.gov/points/40.7128,-74.0060",
+      "https://api.weather.gov/test_url",
+      "https://api.weather.gov/test_url",
+    ])
+    self.assertEqual(str(Gridpoint.objects.get()), "OKX 33,35")
+
+  def test__get_weather_reuses_nearby_gridpoint(self):
+    """
+    Tests function _get_weather(latitude, longitute).
+    * A coordinate about 150 meters from one already resolved reuses its forecast without /points
+    """
+
+    # Arrange
+    Gridpoint.objects.create(latitude=40.7128, longitude=-74.0060, grid_id="OKX", grid_x=33, grid_y=35,
+                             forecast_hourly_url="https://api.weather.gov/test_url")
+    transport = LocalTransport({
+      "https://api.weather.gov/test_url": {"properties": {"periods": "test_weather_data"}},
+    })
+
+    # Act
+    with patch.object(client, '_client', ForecastClient(transport=transport)):
+      weather_data = Weather._get_weather(40.7140, -74.0070)
+
+    # Assert
+    self.assertEqual(weather_data, "test_weather_data")
+    self.assertEqual(transport.calls, ["https://api.weather.gov/test_url"])
+
+  def test__get_weather_forgets_moved_gridpoint(self):
+    """
+    Tests function _get_weather(latitude, longitute).
+    * Tests that a stored forecast url that no longer exists is dropped
+    * Sad Test
+    """
+
+    # Arrange
+    Gridpoint.objects.create(latitude=40.7128, longitude=-74.0060, grid_id="OKX", grid_x=1, grid_y=1,
+                             forecast_hourly_url="https://api.weather.gov/old_url")
+    transport = LocalTransport()
+
+    # Act
+    with patch.object(client, '_client', ForecastClient(transport=transport)):
+      weather_data = Weather._get_weather(40.7128, -74.0060)
+
+    # Assert
+    self.assertEqual(weather_data, None)
+    self.assertEqual(transport.calls, ["https://api.weather.gov/old_url"])
+    self.assertFalse(Gridpoint.objects.exists())
+
+  def test__get_weather_revalidates(self):
+    """
+    Tests function _get_weather(latitude, longitute).
+    * A forecast fetched again is revalidated with its ETag
+    * A 304 reuses the periods from the first response
+    """
+
+    # Arrange
+    periods = [{"startTime": "2024-02-24T18:00:00-07:00", "temperature": 54, "windSpeed": "10 mph"}]
+    statuses = []
+
+    def forecast(request):
+      if request.headers.get("If-None-Match") == '"v1"':
+        statuses.append(304)
+        return (304, b"", {"Cache-Control": "max-age=60"})
+      statuses.append(200)
+      return (200, {"properties": {"periods": periods}}, {"ETag": '"v1"', "Cache-Control": "max-age=60"})
+
+    transport = LocalTransport({
+      "https://api.weather.gov/points/40.7128,-74.0060": {"properties": {"forecastHourly": "https://api.weather.gov/test_url"}},
+      "https://api.weather.gov/test_url": forecast,
+    })
+
+    # Act
+    with patch.object(client, '_client', ForecastClient(transport=transport)):
+      weather_data = Weather._get_weather(40.7128, -74.0060)
+      forecast_cache.forecast_cache.clear()
+      revalidated_weather_data = Weather._get_weather(40.7128, -74.0060)
+
+    # Assert
+    self.assertEqual(statuses, [200, 304])
+    self.assertEqual(weather_data.temperature[0], 54)
+    self.assertIs(revalidated_weather_data, weather_data)
+
   # ---------------------------------------------------------------------------------
 
   # --------------------------- _format_response ---------------------------
@@ -185,7 +312,7 @@ class TestWeatherUnitTest(TestCase):
     }
 
     output = Weather._format_response(input_data, "New York")
-    self.assertEqual(output, expected_output)
+    self.assertEqual(output.as_lists(), expected_output)
   
   def test__format_response_bad_inputs(self):
     """
@@ -207,7 +334,8 @@ class TestWeatherUnitTest(TestCase):
     * _get_weather and _format_response
     """
 
-    location = "New York"
+    # not in the offline gazetteer, so it goes to Nominatim
+    location = "Nueva York"
 
     mock_get_weather_return = [
       {
@@ -289,11 +417,11 @@ class TestWeatherUnitTest(TestCase):
     ]
     
     with (
-      patch('weather_app.models.Weather._get_weather') as mock_get_weather,
+      patch('weather_app.models.Weather._get_weather_with_url') as mock_get_weather,
       patch('weather_app.models.Weather._format_response') as mock_format_response,
       patch('geopy.geocoders.Nominatim.geocode') as mock_geocode
     ):
-      mock_get_weather.return_value = mock_get_weather_return
+      mock_get_weather.return_value = (mock_get_weather_return, "https://api.weather.gov/test_url")
       mock_format_response.return_value = mock_format_response
       mock_geocode.return_value = mock_geocode_return
 
@@ -317,6 +445,7 @@ class TestWeatherUnitTest(TestCase):
     """
     Tests get_weather_forecast(location)
     * Ensures it uses default location if none provided
+    * The default location is in the offline gazetteer, so Nominatim is never called
     """
   
     location = ""
@@ -383,41 +512,276 @@ class TestWeatherUnitTest(TestCase):
       "location": "80918"
     }
 
-    class MockLocation():
-      def __init__(self, address, coords, raw):
-        self.address = address
-        self.latitude = coords[0]
-        self.longitude = coords[1]
-        self.raw = raw
-
-    mock_geocode_return = MockLocation("80918", (40.7127281, -74.0060152), "raw")
-
     expected_get_weather_calls = [
-      call(40.7127281, -74.0060152)
-    ]
-
-    expected_get_format_response_calls = [
-      call(mock_get_weather_return, mock_geocode_return)
+      call(38.9127, -104.7729)
     ]
 
     with (
-      patch('weather_app.models.Weather._get_weather') as mock_get_weather,
+      patch('weather_app.models.Weather._get_weather_with_url') as mock_get_weather,
       patch('weather_app.models.Weather._format_response') as mock_format_response,
       patch('geopy.geocoders.Nominatim.geocode') as mock_geocode
     ):
-      mock_get_weather.return_value = mock_get_weather_return
+      mock_get_weather.return_value = (mock_get_weather_return, "https://api.weather.gov/test_url")
       mock_format_response.return_value = mock_format_response
-      mock_geocode.return_value = mock_geocode_return
 
       forecast = Weather.get_weather_forecast(location)
 
+      mock_geocode.assert_not_called()
       mock_get_weather.assert_has_calls(expected_get_weather_calls)
-      mock_format_response.assert_has_calls(expected_get_format_response_calls)
+      self.assertEqual(mock_format_response.call_args.args[0], mock_get_weather_return)
+      self.assertEqual(str(mock_format_response.call_args.args[1]), "Colorado Springs, CO 80918")
       self.assertEqual(forecast, mock_format_response.return_value)
 
+  # ---------------------------------------------------------------------------------
+
+  # --------------------------- forecast store ---------------------------
+
+  def _upcoming_periods(self, temperatures):
+    """
+    Builds api.weather.gov periods starting at the current hour (in Mountain time).
+    """
+    mountain = dt_timezone(timedelta(hours=-7))
+    start = timezone.now().astimezone(mountain).replace(minute=0, second=0, microsecond=0)
+
+    return [{
+      "startTime": (start + timedelta(hours=hour)).isoformat(),
+      "temperature": temperature,
+      "probabilityOfPrecipitation": {"unitCode": "wmoUnit:percent", "value": 20},
+      "relativeHumidity": {"unitCode": "wmoUnit:percent", "value": 30},
+      "windSpeed": "10 mph",
+      "shortForecast": "Sunny",
+    } for hour, temperature in enumerate(temperatures)]
+
+  def test_get_weather_forecast_stores_periods(self):
+    """
+    Tests get_weather_forecast(location)
+    * The fetched hours are stored, one row per hour
+    * The next request is answered from the table with the same result
+    """
+
+    # Arrange
+    periods = self._upcoming_periods([50, 51, 52])
+
+    # Act
+    with patch('weather_app.models.Weather._get_weather_with_url') as mock_get_weather:
+      mock_get_weather.return_value = (periods, "https://api.weather.gov/test_url")
+      forecast = Weather.get_weather_forecast("80918")
+      stored_forecast = Weather.get_weather_forecast("80918")
+
+    # Assert
+    mock_get_weather.assert_called_once()
+    self.assertEqual(Weather.objects.count(), 3)
+    self.assertEqual(stored_forecast, forecast)
+    self.assertEqual(stored_forecast["temperature"].tolist(), [50, 51, 52])
+
+  def test_get_weather_forecast_stale_rows(self):
+    """
+    Tests get_weather_forecast(location)
+    * Rows past their fresh_until are fetched again and updated in place
+    """
+
+    # Arrange
+    periods = self._upcoming_periods([50, 51])
+    with patch('weather_app.models.Weather._get_weather_with_url') as mock_get_weather:
+      mock_get_weather.return_value = (periods, "https://api.weather.gov/test_url")
+      Weather.get_weather_forecast("80918")
+    Weather.objects.update(fresh_until=timezone.now() - timedelta(seconds=1))
+
+    # Act
+    with patch('weather_app.models.Weather._get_weather_with_url') as mock_get_weather:
+      mock_get_weather.return_value = (self._upcoming_periods([60, 61]), "https://api.weather.gov/test_url")
+      forecast = Weather.get_weather_forecast("80918")
+
+    # Assert
+    mock_get_weather.assert_called_once()
+    self.assertEqual(forecast["temperature"].tolist(), [60, 61])
+    self.assertEqual(list(Weather.objects.order_by("date").values_list("temperature", flat=True)), [60, 61])
+
+  def test__format_rows(self):
+    """
+    Tests function _format_rows(rows, location)
+    * Hours are shown in the location's time zone, like _format_response
+    """
+
+    # Arrange
+    periods = self._upcoming_periods([50])
+    location = Location.objects.create(name="80918", query="80918")
+    Weather._store_periods(location, periods, *Weather._freshness(None))
+
+    # Act
+    result = Weather._format_rows(list(Weather._stored_rows(location)), "80918")
+
+    # Assert
+    self.assertEqual(result, Weather._format_response(periods, "80918"))
+
+  def test__store_periods_packed(self):
+    """
+    Tests function _store_periods(saved_location, weather_data, fetched_at, fresh_until)
+    * A Forecast packed from the periods (as the forecast cache keeps them) stores the same hours
+    """
+
+    # Arrange
+    periods = self._upcoming_periods([50, 51])
+    location = Location.objects.create(name="80918", query="80918")
+    Weather._store_periods(location, periods, *Weather._freshness(None))
+    expected = list(Weather._stored_rows(location))
+    Weather.objects.all().delete()
+
+    # Act
+    Weather._store_periods(location, Weather._pack(periods), *Weather._freshness(None))
+
+    # Assert
+    self.assertEqual(list(Weather._stored_rows(location)), expected)
+
+  def test_get_weather_forecast_one_gridpoint_lookup(self):
+    """
+    Tests get_weather_forecast(location)
+    * The forecast url found while fetching is used to store the hours, the gridpoint isn't looked up again
+    """
+
+    # Arrange
+    transport = LocalTransport({
+      "https://api.weather.gov/points/38.9127,-104.7729": {"properties": {"forecastHourly": "https://api.weather.gov/test_url"}},
+      "https://api.weather.gov/test_url": {"properties": {"periods": self._upcoming_periods([50, 51])}},
+    })
+
+    # Act
+    with (
+      patch.object(client, '_client', ForecastClient(transport=transport)),
+      patch.object(Gridpoint, 'get_stored_url', wraps=Gridpoint.get_stored_url) as mock_get_stored_url
+    ):
+      forecast = Weather.get_weather_forecast("80918")
+
+    # Assert
+    self.assertEqual(forecast["temperature"].tolist(), [50, 51])
+    self.assertEqual(Weather.objects.count(), 2)
+    mock_get_stored_url.assert_called_once()
+
+  def test_get_weather_forecast_max_age(self):
+    """
+    Tests get_weather_forecast(location)
+    * Stored hours are only served for the max-age api.weather.gov sent, not the soft TTL
+    """
+
+    # Arrange
+    periods = self._upcoming_periods([50, 51])
+    forecast_cache.forecast_cache.set("https://api.weather.gov/test_url", Loaded(periods, 60))
+
+    with patch('weather_app.models.Weather._get_weather_with_url') as mock_get_weather:
+      mock_get_weather.return_value = (periods, "https://api.weather.gov/test_url")
+      Weather.get_weather_forecast("80918")
+      fresh_until = Weather.objects.values_list("fresh_until", flat=True).first()
+
+      # Act
+      Weather.get_weather_forecast("80918")
+      with patch('django.utils.timezone.now', return_value=timezone.now() + timedelta(seconds=61)):
+        Weather.get_weather_forecast("80918")
+
+    # Assert
+    self.assertLess(fresh_until, timezone.now() + timedelta(seconds=61))
+    self.assertEqual(mock_get_weather.call_count, 2)
 
   # ---------------------------------------------------------------------------------
 
+class TestWeatherAsyncUnitTest(TestCase):
+  """
+  Tests the async forecast pipeline used by the ASGI views.
+  """
+
+  def setUp(self):
+    geocode_cache.clear()
+    forecast_cache.forecast_cache.clear()
+    revalidation.validators.clear()
+    # Nominatim is mocked, so its rate limit only slows the tests down
+    ratelimit_patch = patch.object(ratelimit, 'nominatim_bucket', ratelimit.TokenBucket(rate=1000, capacity=1000))
+    ratelimit_patch.start()
+    self.addCleanup(ratelimit_patch.stop)
+
+  async def test__aget_weather(self):
+    """
+    Tests function _aget_weather(latitude, longitute).
+    * Same calls and return value as _get_weather, through the async client
+    """
+
+    # Arrange
+    transport = LocalTransport({
+      "https://api.weather.gov/points/40.7128,-74.0060": {"properties": {"forecastHourly": "https://api.weather.gov/test_url"}},
+      "https://api.weather.gov/test_url": {"properties": {"periods": "test_weather_data"}},
+    })
+
+    # Act
+    with patch.object(client, '_async_client', AsyncForecastClient(transport=transport.as_httpx())):
+      weather_data = await Weather._aget_weather(40.7128, -74.0060)
+      forecast_cache.forecast_cache.clear()
+      cached_weather_data = await Weather._aget_weather(40.7128, -74.0060)
+
+    # Assert
+    self.assertEqual(weather_data, "test_weather_data")
+    self.assertEqual(cached_weather_data, "test_weather_data")
+    self.assertEqual(transport.calls, [
+      "https://api.weather.gov/points/40.7128,-74.0060",
+      "https://api.weather.gov/test_url",
+      "https://api.weather.gov/test_url",
+    ])
+
+  async def test__aget_weather_failed_api(self):
+    """
+    Tests function _aget_weather(latitude, longitute).
+    * Returns None when api.weather.gov does not know the location
+    * Sad Test
+    """
+
+    transport = LocalTransport({
+      "https://api.weather.gov/points/40.7128,-74.0060": (404, {"status": 404}),
+    })
+
+    with patch.object(client, '_async_client', AsyncForecastClient(transport=transport.as_httpx())):
+      weather_data = await Weather._aget_weather(40.7128, -74.0060)
+
+    self.assertEqual(weather_data, None)
+
+  async def test_aget_weather_forecast(self):
+    """
+    Tests aget_weather_forecast(location)
+    * Geocodes, then formats the async forecast
+    """
+
+    with (
+      patch('weather_app.models.Weather._aget_weather_with_url') as mock_aget_weather,
+      patch('weather_app.models.Weather._format_response') as mock_format_response
+    ):
+      mock_aget_weather.return_value = (["periods"], "https://api.weather.gov/test_url")
+      mock_format_response.return_value = {"temperature": [10]}
+
+      forecast = await Weather.aget_weather_forecast("")
+
+    mock_aget_weather.assert_awaited_once_with(38.9127, -104.7729)
+    self.assertEqual(forecast, {"temperature": [10]})
+
+  async def test_async_weather_view(self):
+    """
+    Tests AsyncWeatherView.get(self, request)
+    * Renders the same context as WeatherView
+    """
+
+    mock_weather_data = {
+      "temperature": [10],
+      "precipitation": [11],
+      "humidity": [12],
+      "wind": [13],
+      "hours": [1],
+      "location": "Nueva York"
+    }
+
+    with patch('weather_app.models.Weather.aget_weather_forecast') as mock_aget_weather_forecast:
+      mock_aget_weather_forecast.return_value = mock_weather_data
+      response = await AsyncWeatherView.as_view()(RequestFactory().get('/', {"location": "Nueva York"}))
+
+    mock_aget_weather_forecast.assert_awaited_once_with("Nueva York")
+    self.assertEqual(response.status_code, 200)
+    self.assertIn(b"Nueva York", response.content)
+
+
 class TestWeatherViewUnitTest(TestCase):
   """
   Tests epics Weather #31 for the WeatherView class
@@ -501,11 +865,110 @@ class TestWeatherViewUnitTest(TestCase):
     self.assertEqual(expected_response['error_message'], response_context['error_message'])
 
 
+  def test_get_rate_limited(self):
+    """
+    Tests function get(self, request).
+    * Tests that get shows an error when Nominatim lookups are rate limited, instead of failing
+    * Sad Test
+    """
+
+    error = "Too many location lookups right now, please try again in 9 seconds."
+
+    with patch('weather_app.models.Weather.get_weather_forecast') as mock_get_weather_forecast:
+      mock_get_weather_forecast.side_effect = ratelimit.RateLimitTimeout(error)
+
+      response = self.client.get(reverse('home'), {"location": "Nueva York"})
+
+    self.assertEqual(response.status_code, 503)
+    self.assertEqual(response.context['error_message'], error)
+
+  async def test_async_get_rate_limited(self):
+    """
+    Tests AsyncWeatherView.get(self, request)
+    * Same error as WeatherView when Nominatim lookups are rate limited
+    * Sad Test
+    """
+
+    error = "Too many location lookups right now, please try again in 9 seconds."
+
+    with patch('weather_app.models.Weather.aget_weather_forecast') as mock_aget_weather_forecast:
+      mock_aget_weather_forecast.side_effect = ratelimit.RateLimitTimeout(error)
+      response = await AsyncWeatherView.as_view()(RequestFactory().get('/', {"location": "Nueva York"}))
+
+    self.assertEqual(response.status_code, 503)
+    self.assertIn(error.encode(), response.content)
+
+  def _open_breaker(self):
+    """
+    Returns a Resilience whose circuit breaker is open, as after api.weather.gov kept failing.
+    """
+    breaker = CircuitBreaker(failure_threshold=1)
+    breaker.record_failure()
+    return Resilience(breaker=breaker)
+
+  def test_get_circuit_open(self):
+    """
+    Tests function get(self, request).
+    * Tests that get shows an error when the circuit breaker is open and nothing is cached, instead of failing
+    * Sad Test
+    """
+
+    transport = LocalTransport()
+
+    with patch.object(client, '_client', ForecastClient(transport=transport, resilience=self._open_breaker())):
+      response = self.client.get(reverse('home'), {"location": "80918"})
+
+    self.assertEqual(response.status_code, 503)
+    self.assertEqual(response.context['error_message'], "api.weather.gov is failing, not calling it for now.")
+    self.assertEqual(transport.calls, [])
+
+  async def test_async_get_circuit_open(self):
+    """
+    Tests AsyncWeatherView.get(self, request)
+    * Same error as WeatherView when the circuit breaker is open and nothing is cached
+    * Sad Test
+    """
+
+    transport = LocalTransport()
+    async_client = AsyncForecastClient(transport=transport.as_httpx(), resilience=self._open_breaker())
+
+    with patch.object(client, '_async_client', async_client):
+      response = await AsyncWeatherView.as_view()(RequestFactory().get('/', {"location": "80918"}))
+
+    self.assertEqual(response.status_code, 503)
+    self.assertIn(b"api.weather.gov is failing", response.content)
+    self.assertEqual(transport.calls, [])
+
+  def test_get_connection_error(self):
+    """
+    Tests function get(self, request).
+    * Tests that get shows an error when api.weather.gov can't be reached once the retries ran out
+    * Sad Test
+    """
+
+    with patch('weather_app.models.Weather.get_weather_forecast') as mock_get_weather_forecast:
+      mock_get_weather_forecast.side_effect = ConnectTimeout("Max retries exceeded with url: /points/38.9127,-104.7729")
+
+      response = self.client.get(reverse('home'), {"location": "80918"})
+
+    self.assertEqual(response.status_code, 503)
+    self.assertNotIn("Max retries", response.context['error_message'])
+
+
 class TestWeatherIntegration(TestCase):
   """
   Tests epics Weather #31 for the WeatherView class at the integration level.
   """
 
+  def setUp(self):
+    geocode_cache.clear()
+    forecast_cache.forecast_cache.clear()
+    revalidation.validators.clear()
+    # Nominatim is mocked, so its rate limit only slows the tests down
+    ratelimit_patch = patch.object(ratelimit, 'nominatim_bucket', ratelimit.TokenBucket(rate=1000, capacity=1000))
+    ratelimit_patch.start()
+    self.addCleanup(ratelimit_patch.stop)
+
   def test_integration_weather(self):
     """
     Tests that the user can access the weather when they provide location.
@@ -569,9 +1032,9 @@ class TestWeatherIntegration(TestCase):
     ]
 
     with (
-      patch('weather_app.models.Weather._get_weather') as mock__get_weather
+      patch('weather_app.models.Weather._get_weather_with_url') as mock__get_weather
     ):
-      mock__get_weather.return_value = mock_weather_api_response
+      mock__get_weather.return_value = (mock_weather_api_response, "https://api.weather.gov/test_url")
   
       response = self.client.get(reverse('home'), context)
       response_context = response.context  
@@ -598,9 +1061,9 @@ class TestWeatherIntegration(TestCase):
     mock_weather_api_response = []
     
     with (
-      patch('weather_app.models.Weather._get_weather') as mock__get_weather
+      patch('weather_app.models.Weather._get_weather_with_url') as mock__get_weather
     ):
-      mock__get_weather.return_value = mock_weather_api_response
+      mock__get_weather.return_value = (mock_weather_api_response, "https://api.weather.gov/test_url")
     
       response = self.client.get(reverse('home'), context)
       response_context = response.context  
@@ -1,7 +1,7 @@
 from django.test import TestCase
 from django.core.exceptions import ValidationError
 from django.urls import reverse
-from unittest.mock import patch, call
+from unittest.mock import MagicMock, patch, call
 import random
 import json
 from ..models import GenericClothes
@@ -499,7 +499,7 @@ class TestGenericClothesViewUnit(TestCase):
 
     with (
       patch('weather_app.models.Weather.get_weather_forecast') as mock_get_weather,
-      patch('weather_app.views.get_xth_hour_weather') as mock_get_xth_hour_weather,
+      patch('weather_app.models.get_xth_hour_weather') as mock_get_xth_hour_weather,
     ):
       mock_get_xth_hour_weather.return_value = [1, 2, 3, 4]
       response = self.client.get(reverse('recommendation'), {"working_offset": "0", "tolerance_offset": "0", "checkbox_colors": "on"})
@@ -538,7 +538,7 @@ class TestGenericClothesViewUnit(TestCase):
 
     with patch('weather_app.models.GenericClothes._calculate_comfort'
                ) as mock_calculate_comfort:
-      with patch('weather_app.views.GenericClothes.get_outfit_recommendation'
+      with patch('weather_app.views.GenericClothes.get_outfit_recommendations'
                  ) as mock_get_clothes_in_range:
         response = self.client.get(reverse('recommendation'), {})
 
@@ -551,7 +551,7 @@ class TestGenericClothesViewUnit(TestCase):
     Tests that the view returns 200 when correct user input is provided and calls the model methods with stubbed parameters from the get_weather_forcecast function. Also ensures the model has the correct location passed into it.
     """
 
-    with patch('weather_app.models.Weather.get_weather_forecast') as mock_get_weather_forecast, patch('weather_app.views.GenericClothes.get_outfit_recommendation') as mock_get_outfit_recommendation:
+    with patch('weather_app.models.Weather.get_weather_forecast') as mock_get_weather_forecast, patch('weather_app.views.GenericClothes.get_outfit_recommendations') as mock_get_outfit_recommendations:
       mwr = {
           'hours': [
               18, 19, 20, 21, 22, 23, 0, 1, 2, 3, 4, 5, 6, 7, 8, 9, 10, 11,
@@ -621,8 +621,9 @@ class TestGenericClothesViewUnit(TestCase):
       tolerance_offset = -10
       working_offset = 10
       
+      mock_get_outfit_recommendations.return_value = [MagicMock(), MagicMock(), MagicMock()]
       expected_recommendation_calls = [
-        call(mwr['temperature'][x], mwr['humidity'][x], mwr['wind'][x], mwr['precipitation'][x], tolerance_offset, working_offset) for x in range(0, 24, 48)
+        call(mwr, [0, 24, 48], tolerance_offset, working_offset)
       ]
       
       expected_weather_calls = [
@@ -638,7 +639,7 @@ class TestGenericClothesViewUnit(TestCase):
           })
       
       self.assertEqual(response.status_code, 200)
-      mock_get_outfit_recommendation.assert_has_calls(expected_recommendation_calls, any_order=False)
+      mock_get_outfit_recommendations.assert_has_calls(expected_recommendation_calls, any_order=False)
       mock_get_weather_forecast.assert_has_calls(expected_weather_calls, any_order=False)
 
   
@@ -724,6 +725,57 @@ class TestGenericClothesModelUnit(TestCase):
 
     with self.assertRaises(ValueError):
       rerolled_outfit = get_clothes_in_temp_reroll(comfort, type)
+
+  def test_get_clothes_in_temp_reroll_candidates(self):
+    """
+    Tests function get_clothes_in_temp_reroll(cls, comfort, type, weighted, seed)
+    * Every pick covers the comfort, every covering article gets picked
+    * The same seed picks the same article
+    """
+
+    # Arrange
+    covering = {clothes.name for clothes in GenericClothes.objects.filter(
+      clothing_type="SHR", comfort_low__lte=45.5, comfort_high__gte=45.5)}
+
+    # Act
+    picked = {GenericClothes.get_clothes_in_temp_reroll(45.5, "SHR", seed=seed)[0]["name"] for seed in range(50)}
+    first = GenericClothes.get_clothes_in_temp_reroll(45.5, "SHR", weighted=True, seed=7)
+    second = GenericClothes.get_clothes_in_temp_reroll(45.5, "SHR", weighted=True, seed=7)
+
+    # Assert
+    self.assertEqual(picked, covering)
+    self.assertEqual(first, second)
+
+  def test_get_clothes_in_temp_reroll_weighted(self):
+    """
+    Tests function get_clothes_in_temp_reroll(cls, comfort, type, weighted, seed)
+    * Weighted picks follow the waterproof ratings
+    """
+
+    # Arrange
+    GenericClothes.objects.filter(clothing_type="HAT").delete()
+    GenericClothes.objects.create(name="Dry Hat", clothing_type="HAT", comfort_low=0, comfort_high=10, waterproof_rating=10)
+    GenericClothes.objects.create(name="Rain Hat", clothing_type="HAT", comfort_low=0, comfort_high=10, waterproof_rating=90)
+
+    # Act
+    names = [GenericClothes.get_clothes_in_temp_reroll(5, "HAT", weighted=True, seed=seed)[0]["name"]
+             for seed in range(300)]
+
+    # Assert
+    self.assertAlmostEqual(names.count("Rain Hat") / len(names), 0.9, delta=0.07)
+
+  def test_get_clothes_in_temp_reroll_nothing_covers(self):
+    """
+    Tests function get_clothes_in_temp_reroll(cls, comfort, type, weighted, seed)
+    * Sad Test
+    """
+
+    # Arrange
+    GenericClothes.objects.filter(clothing_type="MIS").delete()
+
+    # Act / Assert
+    self.assertIsNone(GenericClothes.get_clothes_in_temp_reroll(50, "MIS"))
+    self.assertIsNone(GenericClothes.get_clothes_in_temp_reroll(50, "MIS", weighted=True))
   
   # ---------------------------------------------------------------------------------
   
@@ -820,6 +872,50 @@ class TestGenericClothesModelUnit(TestCase):
       mock_prec.assert_has_calls(mock_prec_calls, any_order=False)
       mock_color.assert_called()
   
+  # --------------------------- get_outfit_recommendations ---------------------------
+
+  def test_get_outfit_recommendations(self):
+    """
+    Tests function get_outfit_recommendations(cls, weather_data, hours, tolerance_offset, working_offset).
+    * Tests that every hour gets the same recommendation get_outfit_recommendation gives
+    * Tests that the inventory is read once, whatever the number of hours
+    * Happy Test
+    """
+
+    # Arrange
+    weather_data = {
+      "temperature": [10 + hour * 2 for hour in range(49)],
+      "humidity": [50 for _ in range(49)],
+      "wind": [hour % 15 for hour in range(49)],
+      "precipitation": [hour % 100 for hour in range(49)],
+    }
+    hours = [0, 12, 24, 36, 48]
+    expected = [
+      GenericClothes.get_outfit_recommendation(*utils.get_xth_hour_weather(hour, weather_data), -10, 10)
+      for hour in hours
+    ]
+
+    # Act
+    with self.assertNumQueries(1):
+      recommendations = GenericClothes.get_outfit_recommendations(weather_data, hours, -10, 10)
+
+    # Assert
+    self.assertEqual(recommendations, expected)
+
+  
+  def test_invalid_get_outfit_recommendations(self):
+    """
+    Tests function get_outfit_recommendations(cls, weather_data, hours, tolerance_offset, working_offset).
+    * Sad Test
+    """
+
+    # Arrange
+    weather_data = {x: [50] for x in ["temperature", "humidity", "wind", "precipitation"]}
+
+    # Act / Assert
+    with self.assertRaises(ValueError):
+      GenericClothes.get_outfit_recommendations(weather_data, [0], 0, -1)
+
   # ---------------------------------------------------------------------------------
 
   # --------------------------- _get_clothes_in_temp ---------------------------
@@ -1058,6 +1154,70 @@ class TestGenericClothesModelUnit(TestCase):
 
   # ---------------------------------------------------------------------------------
 
+  # --------------------------- _calculate_comforts ---------------------------
+
+  def test_calculate_comforts(self):
+    """
+    Tests function _calculate_comforts(cls, temperatures, humidities, wind_speeds, tolerance_offset, working_offset)
+    * Every hour's comfort is exactly _calculate_comfort's, on both sides of 75 degrees
+    * Happy Test
+    """
+
+    # Arrange
+    temperatures = [-20, 0, 40, 70, 75, 75.5, 76, 80, 104.3]
+    humidities = [0, 10, 35.5, 50, 60, 65, 70, 90, 100]
+    wind_speeds = [0, 3, 10, 12.5, 20, 40, 0, 5, 15]
+
+    # Act
+    comforts = GenericClothes._calculate_comforts(temperatures, humidities, wind_speeds, 5, 3)
+
+    # Assert
+    self.assertEqual(list(comforts), [
+      GenericClothes._calculate_comfort(temperature, humidity, wind_speed, 5, 3)
+      for temperature, humidity, wind_speed in zip(temperatures, humidities, wind_speeds)
+    ])
+
+  def test_calculate_comforts_invalid(self):
+    """
+    Tests function _calculate_comforts(cls, temperatures, humidities, wind_speeds, tolerance_offset, working_offset)
+    * Negative working offsets, humidities of hot hours and wind speeds of cold hours are rejected
+    * A negative humidity in a cold hour is ignored, like _calculate_comfort does
+    * Sad Test
+    """
+
+    with self.assertRaises(ValueError):
+      GenericClothes._calculate_comforts([70], [50], [10], 0, -1)
+    with self.assertRaises(ValueError):
+      GenericClothes._calculate_comforts([70, 80], [50, -1], [10, 10], 0, 0)
+    with self.assertRaises(ValueError):
+      GenericClothes._calculate_comforts([70, 80], [50, 50], [-10, 10], 0, 0)
+
+    comforts = GenericClothes._calculate_comforts([70, 80], [-1, 50], [10, -10], 0, 0)
+    self.assertEqual(len(comforts), 2)
+
+  def test_get_comfort_curve(self):
+    """
+    Tests function get_comfort_curve(cls, weather_data, tolerance_offset, working_offset)
+    * Every hour of the forecast gets a comfort
+    """
+
+    # Arrange
+    weather_data = {
+      "temperature": [60 + hour % 30 for hour in range(156)],
+      "humidity": [40 for _ in range(156)],
+      "wind": [hour % 20 for hour in range(156)],
+      "precipitation": [0 for _ in range(156)],
+    }
+
+    # Act
+    curve = GenericClothes.get_comfort_curve(weather_data, 0, 0)
+
+    # Assert
+    self.assertEqual(len(curve), 156)
+    self.assertEqual(curve[100], GenericClothes._calculate_comfort(*utils.get_xth_hour_weather(100, weather_data)[:3], 0, 0))
+
+  # ---------------------------------------------------------------------------------
+
   # --------------------------- clean ---------------------------
   
   def test_clean_range_low_less_high(self):
@@ -1,4 +1,4 @@
-"""Holds some mocking classes needed for a few of the color tests."""
+"""Holds some mocking classes needed for a few of the color, cache and rate limit tests."""
 
 import datetime
 
@@ -19,3 +19,16 @@ class NewDatetime(datetime.datetime):
     Ex time is [2022, 7, 22, 12, 0, 0, 0] for July 22, 2022 at 12:00:00
     """
     return cls(2022, 7, 22, 12, 0, 0, 0)
+
+class FakeClock:
+  """Clock the tests move forward by hand, sleep only records how long it was asked to wait"""
+
+  def __init__(self):
+    self.now = 1000.0
+    self.sleeps = []
+
+  def __call__(self):
+    return self.now
+
+  def sleep(self, seconds):
+    self.sleeps.append(seconds)
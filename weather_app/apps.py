@@ -1,6 +1,8 @@
 """Custom settings for weather_app project."""
 
 from django.apps import AppConfig
+from django.conf import settings
+from django.db.models.signals import post_delete, post_save
 
 
 class WeatherAppConfig(AppConfig):
@@ -9,3 +11,64 @@ class WeatherAppConfig(AppConfig):
   """
   default_auto_field = 'django.db.models.BigAutoField'
   name = 'weather_app'
+
+  def ready(self):
+    """
+    Configures the shared api.weather.gov clients (how their calls are coalesced and cached) once, when the app starts.
+    """
+    from . import client, decoders, forecast_cache, geocoding, gridcells, inventory_index, ratelimit, singleflight
+    from .models import GenericClothes
+    from .resilience import CircuitBreaker, Resilience
+
+    # both clients call the same upstream, so they share one breaker
+    breaker = CircuitBreaker(
+      failure_threshold=getattr(settings, 'WEATHER_API_BREAKER_THRESHOLD', 5),
+      reset_timeout=getattr(settings, 'WEATHER_API_BREAKER_RESET', 30),
+    )
+
+    def resilience():
+      return Resilience(
+        attempts=getattr(settings, 'WEATHER_API_ATTEMPTS', 3),
+        backoff=getattr(settings, 'WEATHER_API_BACKOFF', 0.2),
+        deadline=getattr(settings, 'WEATHER_API_DEADLINE', 20),
+        hedge_after=getattr(settings, 'WEATHER_API_HEDGE_AFTER', None),
+        breaker=breaker,
+      )
+
+    client.configure(
+      base_url=getattr(settings, 'WEATHER_API_URL', client.WEATHER_API_URL),
+      timeout=getattr(settings, 'WEATHER_API_TIMEOUT', 20),
+      pool_size=getattr(settings, 'WEATHER_API_POOL_SIZE', 10),
+      resilience=resilience(),
+    )
+    client.configure_async(
+      base_url=getattr(settings, 'WEATHER_API_URL', client.WEATHER_API_URL),
+      timeout=getattr(settings, 'WEATHER_API_TIMEOUT', 20),
+      pool_size=getattr(settings, 'WEATHER_API_ASYNC_POOL_SIZE', 100),
+      resilience=resilience(),
+    )
+    singleflight.configure(lock_directory=getattr(settings, 'WEATHER_SINGLE_FLIGHT_LOCK_DIR', None))
+    forecast_cache.configure(
+      soft_ttl=getattr(settings, 'WEATHER_FORECAST_SOFT_TTL', 1800),
+      hard_ttl=getattr(settings, 'WEATHER_FORECAST_HARD_TTL', 10800),
+      cache=getattr(settings, 'WEATHER_FORECAST_CACHE', None),
+    )
+    geocoding.configure(
+      cache=getattr(settings, 'WEATHER_GEOCODE_CACHE', None),
+      domain=getattr(settings, 'WEATHER_NOMINATIM_DOMAIN', 'nominatim.openstreetmap.org'),
+      scheme=getattr(settings, 'WEATHER_NOMINATIM_SCHEME', 'https'),
+    )
+    ratelimit.configure(
+      rate=getattr(settings, 'WEATHER_NOMINATIM_RATE', 1.0),
+      capacity=getattr(settings, 'WEATHER_NOMINATIM_BURST', 1),
+      max_wait=getattr(settings, 'WEATHER_NOMINATIM_MAX_WAIT', 5),
+      lock_file=getattr(settings, 'WEATHER_NOMINATIM_LOCK_FILE', None),
+    )
+    decoders.configure(wind_range=getattr(settings, 'WEATHER_WIND_RANGE_POLICY', 'max'))
+    gridcells.configure(
+      decimals=getattr(settings, 'WEATHER_COORDINATE_DECIMALS', 4),
+      match_radius=getattr(settings, 'WEATHER_GRID_MATCH_RADIUS', 300),
+    )
+    inventory_index.configure(max_age_seconds=getattr(settings, 'WEATHER_INVENTORY_INDEX_MAX_AGE', 300))
+    post_save.connect(inventory_index.invalidate, sender=GenericClothes, dispatch_uid='inventory_index_save')
+    post_delete.connect(inventory_index.invalidate, sender=GenericClothes, dispatch_uid='inventory_index_delete')
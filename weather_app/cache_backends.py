@@ -0,0 +1,373 @@
+"""
+Storage backends for the forecast and geocode caches, picked in settings.py
+(WEATHER_FORECAST_CACHE / WEATHER_GEOCODE_CACHE):
+
+* "locmem": in this process's memory, the fastest, but every worker has its own copy.
+* "file": a SQLite file shared by every worker on the host.
+* "django": any cache in settings.CACHES (e.g. Redis or Memcached), shared between hosts.
+
+Every backend has the same small interface: get(key, default), set(key, value, ttl), delete(key),
+clear(), len() and stats(), with per-entry TTLs (in seconds, None for the backend's default) and a
+bound on the number of entries. The file backend can also be bounded in bytes, and compacts
+itself in the background.
+"""
+
+import hashlib
+import pickle
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from django.core.cache import caches
+from django.core.cache.backends.base import DEFAULT_TIMEOUT
+
+MISSING = object()
+
+
+class LocMemBackend:
+  """
+  Thread-safe least recently used cache in this process's memory. Values are kept as is (not
+  copied), so they must not be modified after they are cached.
+  """
+
+  MISSING = MISSING
+
+  def __init__(self, maxsize=1024, ttl=None, clock=time.monotonic):
+    self.maxsize = maxsize
+    self.ttl = ttl
+    self.clock = clock
+    self._entries = OrderedDict()  # key -> (value, expires or None)
+    self._lock = threading.Lock()
+    self.counters = {"hits": 0, "misses": 0, "evictions": 0}
+
+  def get(self, key, default=MISSING):
+    """
+    Returns the value for key (marking it as recently used) or default.
+    """
+    with self._lock:
+      entry = self._entries.get(key)
+      if entry is None:
+        self.counters["misses"] += 1
+        return default
+
+      value, expires = entry
+      if expires is not None and expires <= self.clock():
+        del self._entries[key]
+        self.counters["misses"] += 1
+        return default
+
+      self._entries.move_to_end(key)
+      self.counters["hits"] += 1
+      return value
+
+  def set(self, key, value, ttl=None):
+    """
+    Stores value, dropping the least recently used entry when full.
+    """
+    ttl = self.ttl if ttl is None else ttl
+    expires = None if ttl is None else self.clock() + ttl
+
+    with self._lock:
+      self._entries[key] = (value, expires)
+      self._entries.move_to_end(key)
+      while len(self._entries) > self.maxsize:
+        self._entries.popitem(last=False)
+        self.counters["evictions"] += 1
+
+  def delete(self, key):
+    with self._lock:
+      self._entries.pop(key, None)
+
+  def clear(self):
+    """
+    Drops every entry.
+    """
+    with self._lock:
+      self._entries.clear()
+
+  def __len__(self):
+    return len(self._entries)
+
+  def stats(self):
+    """
+    Returns the entry count and this process's hit / miss / eviction counters.
+    Values aren't serialized, so their size isn't known.
+    """
+    return {"entries": len(self), "bytes": None, **self.counters}
+
+
+class SQLiteBackend:
+  """
+  Cache in a SQLite file, shared by the worker processes on a host. Values are pickled.
+  Each thread has its own connection, and the file is in WAL mode so readers don't wait on writers.
+
+  * Bounded by maxsize entries and, if max_bytes is set, by the total size of the pickled values.
+  The least recently used entries go first.
+  * Every compact_interval seconds (if set) a daemon thread drops expired entries and gives the
+  freed pages back to the file system, so the file doesn't keep growing on long-running hosts.
+  * Counters are per process (each worker has its own), the entry count and bytes are the file's.
+  * A hit only writes its used stamp back once the stamp is TOUCH_INTERVAL seconds old, so reads of
+  hot keys don't all turn into writes. Eviction order is only that precise.
+  """
+
+  MISSING = MISSING
+
+  # seconds
+  TOUCH_INTERVAL = 5
+
+  # VACUUM once this share of the file's pages are free
+  VACUUM_FREE_RATIO = 0.25
+
+  def __init__(self, path, maxsize=10000, ttl=None, clock=time.time, max_bytes=None, compact_interval=None):
+    self.path = Path(path)
+    self.path.parent.mkdir(parents=True, exist_ok=True)
+    self.maxsize = maxsize
+    self.max_bytes = max_bytes
+    self.ttl = ttl
+    self.clock = clock
+    self._local = threading.local()
+    self._lock = threading.Lock()
+    self.counters = {"hits": 0, "misses": 0, "evictions": 0, "expired": 0, "compactions": 0}
+    self._execute("""
+      CREATE TABLE IF NOT EXISTS cache (
+        key TEXT PRIMARY KEY,
+        value BLOB NOT NULL,
+        size INTEGER NOT NULL DEFAULT 0,
+        expires REAL,
+        used REAL NOT NULL
+      )""")
+    columns = [row[1] for row in self._execute("PRAGMA table_info(cache)")]
+    if "size" not in columns:
+      # files written before entries had sizes
+      self._execute("ALTER TABLE cache ADD COLUMN size INTEGER NOT NULL DEFAULT 0")
+    self._execute("CREATE INDEX IF NOT EXISTS cache_used ON cache (used)")
+    self._execute("CREATE INDEX IF NOT EXISTS cache_expires ON cache (expires)")
+
+    self._stopped = threading.Event()
+    self._compactor = None
+    if compact_interval:
+      self._compactor = threading.Thread(target=self._compact_every, args=(compact_interval,), daemon=True)
+      self._compactor.start()
+
+  def _count(self, counter, amount=1):
+    with self._lock:
+      self.counters[counter] += amount
+
+  def _connection(self):
+    connection = getattr(self._local, "connection", None)
+
+    if connection is None:
+      # autocommit, every statement is its own transaction
+      connection = sqlite3.connect(self.path, timeout=10, isolation_level=None, check_same_thread=False)
+      connection.execute("PRAGMA journal_mode=WAL")
+      connection.execute("PRAGMA synchronous=NORMAL")
+      self._local.connection = connection
+
+    return connection
+
+  def _execute(self, sql, parameters=()):
+    return self._connection().execute(sql, parameters)
+
+  def get(self, key, default=MISSING):
+    """
+    Returns the value for key (marking it as recently used) or default.
+    """
+    now = self.clock()
+    row = self._execute("SELECT value, expires, used FROM cache WHERE key = ?", (key,)).fetchone()
+
+    if row is None:
+      self._count("misses")
+      return default
+
+    value, expires, used = row
+    if expires is not None and expires <= now:
+      self._execute("DELETE FROM cache WHERE key = ? AND expires <= ?", (key, now))
+      self._count("misses")
+      return default
+
+    if now - used >= self.TOUCH_INTERVAL:
+      self._execute("UPDATE cache SET used = ? WHERE key = ?", (now, key))
+    self._count("hits")
+    return pickle.loads(value)
+
+  def set(self, key, value, ttl=None):
+    """
+    Stores value, dropping the least recently used entries when over maxsize or max_bytes.
+    """
+    now = self.clock()
+    ttl = self.ttl if ttl is None else ttl
+    expires = None if ttl is None else now + ttl
+    value = pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+
+    self._execute("INSERT OR REPLACE INTO cache (key, value, size, expires, used) VALUES (?, ?, ?, ?, ?)",
+                  (key, value, len(value), expires, now))
+    self._evict()
+
+  def _evict(self):
+    """
+    Drops the least recently used entries beyond maxsize, then beyond max_bytes.
+    """
+    evicted = self._execute("""
+      DELETE FROM cache WHERE key IN (
+        SELECT key FROM cache ORDER BY used DESC LIMIT -1 OFFSET ?
+      )""", (self.maxsize,)).rowcount
+
+    if self.max_bytes is not None:
+      # running total of the sizes from the most recently used, everything past max_bytes goes
+      evicted += self._execute("""
+        DELETE FROM cache WHERE key IN (
+          SELECT key FROM (
+            SELECT key, SUM(size) OVER (ORDER BY used DESC, key) AS total FROM cache
+          ) WHERE total > ?
+        )""", (self.max_bytes,)).rowcount
+
+    if evicted:
+      self._count("evictions", evicted)
+
+  def compact(self):
+    """
+    Drops expired entries and, once enough of the file is free pages, rewrites it (VACUUM).
+    Returns the number of expired entries dropped.
+    """
+    expired = self._execute("DELETE FROM cache WHERE expires <= ?", (self.clock(),)).rowcount
+    self._count("expired", expired)
+
+    page_count = self._execute("PRAGMA page_count").fetchone()[0]
+    free_pages = self._execute("PRAGMA freelist_count").fetchone()[0]
+    if page_count and free_pages / page_count >= self.VACUUM_FREE_RATIO:
+      self._execute("VACUUM")
+    # fold the write-ahead log back into the file and truncate it
+    self._execute("PRAGMA wal_checkpoint(TRUNCATE)")
+
+    self._count("compactions")
+    return expired
+
+  def _compact_every(self, interval):
+    while not self._stopped.wait(interval):
+      try:
+        self.compact()
+      except sqlite3.Error as e:
+        print(f"Error compacting cache {self.path}, {e}")
+
+  def close(self):
+    """
+    Stops the background compaction.
+    """
+    self._stopped.set()
+
+  def delete(self, key):
+    self._execute("DELETE FROM cache WHERE key = ?", (key,))
+
+  def clear(self):
+    """
+    Drops every entry.
+    """
+    self._execute("DELETE FROM cache")
+
+  def __len__(self):
+    return self._execute("SELECT COUNT(*) FROM cache").fetchone()[0]
+
+  def stats(self):
+    """
+    Returns the entry count, the size of the values and of the file in bytes, and this
+    process's hit / miss / eviction counters.
+    """
+    entries, size = self._execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM cache").fetchone()
+    page_size = self._execute("PRAGMA page_size").fetchone()[0]
+    page_count = self._execute("PRAGMA page_count").fetchone()[0]
+
+    with self._lock:
+      counters = dict(self.counters)
+
+    return {"entries": entries, "bytes": size, "file_bytes": page_size * page_count, **counters}
+
+
+class DjangoCacheBackend:
+  """
+  Any cache configured in settings.CACHES. Size limits are the cache's own (e.g. MAX_ENTRIES
+  in its OPTIONS). Keys are hashed, since Memcached doesn't accept spaces or long keys.
+
+  Several caches can share a CACHES entry under different key prefixes. Django caches can't
+  list their keys, so keys also carry a generation stored under the prefix, and clear() starts
+  a new one: only this cache's entries are dropped, left to expire. That costs one more cache
+  read per call.
+  """
+
+  MISSING = MISSING
+
+  def __init__(self, alias="default", key_prefix="weather", ttl=None):
+    self.alias = alias
+    self.key_prefix = key_prefix
+    self.ttl = ttl
+    self.counters = {"hits": 0, "misses": 0}
+
+  @property
+  def cache(self):
+    return caches[self.alias]
+
+  def _generation(self):
+    # nanoseconds, so a generation evicted from the cache isn't reused
+    return self.cache.get_or_set(f"{self.key_prefix}:generation", time.time_ns, timeout=None)
+
+  def _key(self, key):
+    return f"{self.key_prefix}:{self._generation()}:{hashlib.sha1(str(key).encode()).hexdigest()}"
+
+  def get(self, key, default=MISSING):
+    value = self.cache.get(self._key(key), MISSING)
+
+    if value is MISSING:
+      self.counters["misses"] += 1
+      return default
+
+    self.counters["hits"] += 1
+    return value
+
+  def set(self, key, value, ttl=None):
+    ttl = self.ttl if ttl is None else ttl
+    self.cache.set(self._key(key), value, timeout=DEFAULT_TIMEOUT if ttl is None else ttl)
+
+  def delete(self, key):
+    self.cache.delete(self._key(key))
+
+  def clear(self):
+    """
+    Drops this cache's entries, other caches sharing the CACHES entry keep theirs.
+    """
+    self.cache.set(f"{self.key_prefix}:generation", time.time_ns(), timeout=None)
+
+  def __len__(self):
+    # Django caches can't count their entries
+    return 0
+
+  def stats(self):
+    """
+    Returns this process's hit / miss counters, the cache's size isn't known.
+    """
+    return {"entries": None, "bytes": None, **self.counters}
+
+
+def build_backend(options=None, default_path=None, default_prefix="weather"):
+  """
+  Builds a backend from a settings dict (PATH and KEY_PREFIX default to default_path and default_prefix), e.g.
+    {"BACKEND": "locmem", "MAX_ENTRIES": 1024, "TIMEOUT": None}
+    {"BACKEND": "file", "PATH": "/var/cache/weather/forecasts.sqlite", "MAX_ENTRIES": 10000,
+     "MAX_BYTES": 50 * 1024 * 1024, "COMPACT_INTERVAL": 3600}
+    {"BACKEND": "django", "CACHE": "default", "KEY_PREFIX": "forecasts"}
+  """
+  options = dict(options or {})
+  backend = options.get("BACKEND", "locmem")
+  ttl = options.get("TIMEOUT")
+
+  if backend == "locmem":
+    return LocMemBackend(maxsize=options.get("MAX_ENTRIES", 1024), ttl=ttl)
+
+  if backend == "file":
+    return SQLiteBackend(options.get("PATH", default_path), maxsize=options.get("MAX_ENTRIES", 10000), ttl=ttl,
+                         max_bytes=options.get("MAX_BYTES"), compact_interval=options.get("COMPACT_INTERVAL"))
+
+  if backend == "django":
+    return DjangoCacheBackend(alias=options.get("CACHE", "default"),
+                              key_prefix=options.get("KEY_PREFIX", default_prefix), ttl=ttl)
+
+  raise ValueError(f"Unknown cache backend {backend!r}, use locmem, file or django.")
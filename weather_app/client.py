@@ -0,0 +1,193 @@
+"""
+HTTP client for api.weather.gov (https://www.weather.gov/documentation/services-web-api).
+
+A single ForecastClient is configured when the app starts (see apps.py) and shared by
+every request, so keep-alive connections are reused instead of paying a new TLS
+handshake on every call.
+"""
+
+import asyncio
+import threading
+import weakref
+import httpx
+import requests
+from requests.adapters import HTTPAdapter
+
+WEATHER_API_URL = "https://api.weather.gov"
+
+
+class ForecastClient:
+  """
+  Thread-safe client for api.weather.gov.
+
+  * One connection pool (HTTPAdapter) is shared between all threads.
+  * Each thread gets its own Session on top of that pool, since requests does not
+  promise that a Session is safe to share between threads.
+  * Nothing is cached here, forecasts are cached (and revalidated) by forecast_cache.py
+  and revalidation.py.
+  * transport can be any requests adapter (e.g. transports.LocalTransport) so tests
+  never touch the network.
+  * resilience (a resilience.Resilience) retries, hedges and short-circuits the calls.
+  """
+
+  def __init__(self, base_url=WEATHER_API_URL, timeout=20, pool_size=10, transport=None, resilience=None):
+    self.base_url = base_url.rstrip("/")
+    self.timeout = timeout
+    self.resilience = resilience
+    self._adapter = transport or HTTPAdapter(pool_connections=pool_size,
+                                             pool_maxsize=pool_size)
+    self._local = threading.local()
+
+  def _session(self):
+    """
+    Returns the session for the current thread, creating it on first use.
+    """
+    session = getattr(self._local, "session", None)
+
+    if session is None:
+      session = requests.Session()
+      # api.weather.gov rejects requests without a user agent
+      session.headers.update({"User-Agent": "Weather App"})
+      session.mount("https://", self._adapter)
+      session.mount("http://", self._adapter)
+      self._local.session = session
+
+    return session
+
+  def points_url(self, latitude, longitude):
+    """
+    Returns the /points url for a coordinate, which holds the forecast urls for it.
+    The api only accepts up to 4 decimals.
+    """
+    return f"{self.base_url}/points/{float(latitude):.4f},{float(longitude):.4f}"
+
+  def get(self, url, headers=None):
+    """
+    GETs a url through the shared pool, headers are added to the session's.
+    """
+    def send():
+      return self._session().get(url, headers=headers, timeout=self.timeout)
+
+    if self.resilience is None:
+      return send()
+    return self.resilience.call(send)
+
+  def close(self):
+    """
+    Closes the shared connection pool.
+    """
+    self._adapter.close()
+
+
+class AsyncForecastClient:
+  """
+  Async counterpart of ForecastClient for the ASGI views, built on httpx.AsyncClient.
+  One connection pool is kept per event loop (httpx pools can't be shared between loops).
+  """
+
+  def __init__(self, base_url=WEATHER_API_URL, timeout=20, pool_size=100, transport=None, resilience=None):
+    self.base_url = base_url.rstrip("/")
+    self.timeout = timeout
+    self.pool_size = pool_size
+    self.transport = transport
+    self.resilience = resilience
+    self._clients = weakref.WeakKeyDictionary()
+
+  def _client(self):
+    """
+    Returns the httpx client for the running event loop, creating it on first use.
+    """
+    loop = asyncio.get_running_loop()
+    http_client = self._clients.get(loop)
+
+    if http_client is None:
+      http_client = httpx.AsyncClient(
+        headers={"User-Agent": "Weather App"},
+        timeout=self.timeout,
+        limits=httpx.Limits(max_connections=self.pool_size,
+                            max_keepalive_connections=self.pool_size),
+        transport=self.transport,
+        follow_redirects=True,
+      )
+      self._clients[loop] = http_client
+
+    return http_client
+
+  def points_url(self, latitude, longitude):
+    """
+    Returns the /points url for a coordinate, see ForecastClient.points_url.
+    """
+    return f"{self.base_url}/points/{float(latitude):.4f},{float(longitude):.4f}"
+
+  async def get(self, url, headers=None):
+    """
+    GETs a url through the pool of the running event loop.
+    """
+    def send():
+      return self._client().get(url, headers=headers)
+
+    if self.resilience is None:
+      return await send()
+    return await self.resilience.acall(send)
+
+
+_client = None
+_async_client = None
+_client_lock = threading.Lock()
+
+
+def configure(**kwargs):
+  """
+  Replaces the shared client. Called once from WeatherAppConfig.ready, kwargs are passed
+  to ForecastClient.
+  """
+  global _client
+
+  with _client_lock:
+    previous = _client
+    _client = ForecastClient(**kwargs)
+
+  if previous is not None:
+    previous.close()
+
+  return _client
+
+
+def configure_async(**kwargs):
+  """
+  Replaces the shared async client, kwargs are passed to AsyncForecastClient.
+  """
+  global _async_client
+
+  with _client_lock:
+    _async_client = AsyncForecastClient(**kwargs)
+
+  return _async_client
+
+
+def get_client():
+  """
+  Returns the shared client, creating a default one if the app was never configured.
+  """
+  global _client
+
+  if _client is None:
+    with _client_lock:
+      if _client is None:
+        _client = ForecastClient()
+
+  return _client
+
+
+def get_async_client():
+  """
+  Returns the shared async client, creating a default one if the app was never configured.
+  """
+  global _async_client
+
+  if _async_client is None:
+    with _client_lock:
+      if _async_client is None:
+        _async_client = AsyncForecastClient()
+
+  return _async_client
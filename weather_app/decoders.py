@@ -0,0 +1,123 @@
+"""
+Decoders for the api.weather.gov period fields we read, with the patterns compiled once.
+
+* windSpeed comes as "10 mph", but also "10 to 15 mph", "5-10 mph", "Calm", "15 km/h" or "10 kt".
+  Ranges are reduced with the wind range policy (min, max or mean), units are converted to mph.
+* startTime is an ISO 8601 timestamp with the location's UTC offset, e.g. "2024-02-24T18:00:00-07:00".
+  A forecast repeats the same offset on every period, so offsets are memoized.
+
+The same few wind speeds and (for locations in one time zone) start times repeat across
+forecasts, so decoded values are memoized too.
+"""
+
+import re
+from functools import lru_cache
+from datetime import datetime, timedelta, timezone
+
+# "10 mph", "10 to 15 mph", "5-10 mph", "12.5 km/h", "10 kt"
+WIND_SPEED = re.compile(
+  r"^\s*(\d+(?:\.\d+)?)(?:\s*(?:to|-)\s*(\d+(?:\.\d+)?))?\s*(mph|km/h|kmh|kph|kt|kts|knots?|m/s)?\s*$",
+  re.IGNORECASE)
+CALM = re.compile(r"^\s*(calm)?\s*$", re.IGNORECASE)
+
+# unit -> mph
+WIND_UNITS = {
+  None: 1.0,
+  "mph": 1.0,
+  "km/h": 0.621371,
+  "kmh": 0.621371,
+  "kph": 0.621371,
+  "kt": 1.150779,
+  "kts": 1.150779,
+  "knot": 1.150779,
+  "knots": 1.150779,
+  "m/s": 2.236936,
+}
+
+WIND_RANGE_POLICIES = {
+  "min": min,
+  "max": max,
+  "mean": lambda low, high: (low + high) / 2,
+}
+
+# "2024-02-24T18:00:00-07:00", "2024-02-24T18:00Z", "2024-02-24T18:00:00.000+00:00"
+START_TIME = re.compile(
+  r"^(\d{4})-(\d{2})-(\d{2})T(\d{2}):(\d{2})(?::(\d{2})(?:\.\d+)?)?(Z|[+-]\d{2}:?\d{2})?$")
+
+# the higher speed of a range, a stronger wind feels colder so this errs on the side of warmer clothes
+wind_range_policy = "max"
+
+_offsets = {}
+
+
+def configure(wind_range="max"):
+  """
+  Sets how wind speed ranges are reduced, called from WeatherAppConfig.ready.
+  """
+  global wind_range_policy
+
+  if wind_range not in WIND_RANGE_POLICIES:
+    raise ValueError(f"Wind range policy must be one of {', '.join(WIND_RANGE_POLICIES)}.")
+  wind_range_policy = wind_range
+
+
+def parse_wind_speed(text, policy=None):
+  """
+  Returns the wind speed in whole mph.
+  Ex. "10 mph" -> 10, "10 to 15 mph" -> 15 (max policy), "20 km/h" -> 12, "Calm" -> 0
+  """
+  if isinstance(text, (int, float)):
+    return round(text)
+
+  return _wind_speed(text or "", policy or wind_range_policy)
+
+
+@lru_cache(maxsize=256)
+def _wind_speed(text, policy):
+  match = WIND_SPEED.match(text)
+
+  if match is None:
+    if CALM.match(text):
+      return 0
+    raise ValueError(f"Unknown wind speed {text!r}")
+
+  low, high, unit = match.groups()
+  speed = float(low)
+
+  if high is not None:
+    speed = WIND_RANGE_POLICIES[policy](speed, float(high))
+
+  return round(speed * WIND_UNITS[unit and unit.lower()])
+
+
+def _offset(text):
+  """
+  "-07:00" -> timezone(timedelta(hours=-7)), memoized.
+  """
+  tz = _offsets.get(text)
+
+  if tz is None:
+    if text in (None, "Z"):
+      tz = timezone.utc
+    else:
+      sign = -1 if text[0] == "-" else 1
+      digits = text[1:].replace(":", "")
+      tz = timezone(sign * timedelta(hours=int(digits[:2]), minutes=int(digits[2:])))
+    _offsets[text] = tz
+
+  return tz
+
+
+@lru_cache(maxsize=1024)
+def parse_start_time(text):
+  """
+  Returns the aware datetime for a period's startTime.
+  """
+  match = START_TIME.match(text)
+
+  if match is None:
+    raise ValueError(f"Unknown start time {text!r}")
+
+  year, month, day, hour, minute, second, offset = match.groups()
+  return datetime(int(year), int(month), int(day), int(hour), int(minute), int(second or 0),
+                  tzinfo=_offset(offset))
@@ -0,0 +1,197 @@
+"""
+Compact, columnar forecast returned by Weather.get_weather_forecast.
+
+Each column is a typed array (one machine int per hour instead of a boxed Python int per hour),
+and the location is a slim record instead of geopy's Location with its raw Nominatim response.
+A Forecast still reads like the dict the views and utils.get_xth_hour_weather expect:
+
+  forecast["temperature"][0], len(forecast["hours"]), forecast["location"]
+
+Forecasts are also what the forecast cache keeps, and they pickle to a compact binary form
+(to_bytes: a small header, the location and the raw column arrays, zlib-compressed) of about
+2 KB for a week of hours, so shared cache backends store and read that instead of the periods.
+"""
+
+import struct
+import sys
+import zlib
+from array import array
+from collections.abc import Mapping
+
+# column -> array typecode (see https://docs.python.org/3/library/array.html)
+COLUMNS = {
+  "hours": "b",          # 0-23, in the location's time zone
+  "temperature": "h",    # F
+  "precipitation": "b",  # chance in percent
+  "humidity": "b",       # percent
+  "wind": "h",           # mph
+}
+
+# start of each hour, seconds since the epoch (UTC), so the hours can be stored in the Weather table
+STARTS = "q"
+
+KEYS = tuple(COLUMNS) + ("location",)
+
+# magic, version, flags, hours, then the location's kind, latitude, longitude and address length
+HEADER = struct.Struct("<2sBBHBddH")
+MAGIC = b"WF"
+VERSION = 1
+COMPRESSED = 1
+
+# ForecastLocation.of keeps a location as a ForecastLocation, a plain name or nothing
+NO_LOCATION, NAMED_LOCATION, FORECAST_LOCATION = range(3)
+
+
+class ForecastLocation:
+  """
+  Where a forecast is for. Prints as the address, like geopy's Location.
+  """
+
+  __slots__ = ("address", "latitude", "longitude")
+
+  def __init__(self, address, latitude, longitude):
+    self.address = address
+    self.latitude = latitude
+    self.longitude = longitude
+
+  @classmethod
+  def of(cls, location):
+    """
+    Slims down a geopy Location, anything else (e.g., a plain name) is kept as is.
+    """
+    if hasattr(location, "latitude") and hasattr(location, "address"):
+      return cls(str(location.address), location.latitude, location.longitude)
+    return location
+
+  def __str__(self):
+    return self.address
+
+  def __repr__(self):
+    return f"ForecastLocation({self.address!r}, {self.latitude}, {self.longitude})"
+
+  def __eq__(self, other):
+    if not isinstance(other, ForecastLocation):
+      return NotImplemented
+    return (self.address, self.latitude, self.longitude) == (other.address, other.latitude, other.longitude)
+
+  def __getstate__(self):
+    return (self.address, self.latitude, self.longitude)
+
+  def __setstate__(self, state):
+    self.address, self.latitude, self.longitude = state
+
+
+class Forecast(Mapping):
+  """
+  Hourly forecast columns plus the location, read only.
+  starts (the UTC start of each hour) isn't one of the keys, it is only read to store the hours.
+  """
+
+  __slots__ = tuple(COLUMNS) + ("starts", "location")
+
+  def __init__(self, location, starts=(), **columns):
+    for column, typecode in COLUMNS.items():
+      setattr(self, column, array(typecode, columns.get(column, ())))
+    self.starts = array(STARTS, starts)
+    self.location = ForecastLocation.of(location)
+
+  def __getitem__(self, key):
+    if key not in KEYS:
+      raise KeyError(key)
+    return getattr(self, key)
+
+  def __iter__(self):
+    return iter(KEYS)
+
+  def __len__(self):
+    return len(KEYS)
+
+  def __repr__(self):
+    return f"Forecast({self.location!r}, {len(self.hours)} hours)"
+
+  def __reduce__(self):
+    return (Forecast.from_bytes, (self.to_bytes(),))
+
+  def located(self, location):
+    """
+    Returns the same forecast for another location (the columns are shared, not copied).
+    The forecast cache is keyed by gridpoint, so every location in it shares one forecast.
+    """
+    forecast = Forecast.__new__(Forecast)
+    for column in COLUMNS:
+      setattr(forecast, column, getattr(self, column))
+    forecast.starts = self.starts
+    forecast.location = ForecastLocation.of(location)
+    return forecast
+
+  def to_bytes(self, compress=True):
+    """
+    Packs the forecast: a header, the location's address and the columns as raw little
+    endian arrays, optionally zlib-compressed.
+    """
+    location = self.location
+    latitude = longitude = 0.0
+
+    if location is None:
+      kind, address = NO_LOCATION, b""
+    elif isinstance(location, ForecastLocation):
+      kind, address = FORECAST_LOCATION, location.address.encode()
+      latitude, longitude = location.latitude, location.longitude
+    else:
+      kind, address = NAMED_LOCATION, str(location).encode()
+
+    columns = [getattr(self, column) for column in COLUMNS] + [self.starts]
+    if sys.byteorder == "big":
+      columns = [array(column.typecode, column) for column in columns]
+      for column in columns:
+        column.byteswap()
+
+    body = address + b"".join(column.tobytes() for column in columns)
+    if compress:
+      body = zlib.compress(body)
+
+    header = HEADER.pack(MAGIC, VERSION, COMPRESSED if compress else 0, len(self.hours),
+                         kind, latitude, longitude, len(address))
+    return header + body
+
+  @classmethod
+  def from_bytes(cls, data):
+    """
+    Unpacks a forecast packed by to_bytes.
+    """
+    magic, version, flags, hours, kind, latitude, longitude, address_length = HEADER.unpack_from(data)
+
+    if magic != MAGIC or version != VERSION:
+      raise ValueError("Not a packed forecast.")
+
+    body = memoryview(data)[HEADER.size:]
+    if flags & COMPRESSED:
+      body = memoryview(zlib.decompress(body))
+
+    address = bytes(body[:address_length]).decode()
+    if kind == FORECAST_LOCATION:
+      location = ForecastLocation(address, latitude, longitude)
+    else:
+      location = address if kind == NAMED_LOCATION else None
+
+    forecast = cls.__new__(cls)
+    offset = address_length
+    for column, typecode in list(COLUMNS.items()) + [("starts", STARTS)]:
+      values = array(typecode)
+      size = values.itemsize * hours
+      values.frombytes(body[offset:offset + size])
+      if sys.byteorder == "big":
+        values.byteswap()
+      setattr(forecast, column, values)
+      offset += size
+
+    forecast.location = location
+    return forecast
+
+  def as_lists(self):
+    """
+    Returns a plain dict with lists for the columns, e.g. for json_script or JsonResponse.
+    """
+    result = {column: getattr(self, column).tolist() for column in COLUMNS}
+    result["location"] = self.location
+    return result
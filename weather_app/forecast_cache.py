@@ -0,0 +1,260 @@
+"""
+Stale-while-revalidate cache for forecasts (https://datatracker.ietf.org/doc/html/rfc5861).
+
+* Younger than soft_ttl: served as is.
+* Between soft_ttl and hard_ttl: served right away while a background thread refreshes it,
+so no user waits on api.weather.gov after the entry goes stale.
+* Older than hard_ttl (or missing): loaded before returning. If that load fails, the old entry
+is served anyway rather than telling the user their location is invalid.
+
+A loader can return Loaded(value, max_age) to give an entry its own soft TTL, e.g. the
+freshness lifetime api.weather.gov sent with it (see revalidation.py).
+
+Entries are kept in a backend from cache_backends.py (in memory by default), so the cache can
+be shared by every worker on a host (file) or between hosts (django).
+"""
+
+import asyncio
+import tempfile
+import threading
+import time
+from pathlib import Path
+from typing import NamedTuple
+from django.db import connections
+from .cache_backends import LocMemBackend, build_backend
+
+
+class Loaded(NamedTuple):
+  """
+  A loaded value with its own soft TTL (None for the cache's default).
+  """
+  value: object
+  max_age: float = None
+
+
+class ForecastCache:
+  """
+  Forecast cache, keyed by forecast url.
+  A loader returning None (e.g. weather.gov answered 500) counts as a failed load.
+  Entries are evicted from the backend after twice hard_ttl, so an entry is still there to
+  fall back on for a while after it is too old to serve on its own.
+  """
+
+  def __init__(self, soft_ttl=1800, hard_ttl=10800, clock=time.time, backend=None):
+    self.soft_ttl = soft_ttl
+    self.hard_ttl = hard_ttl
+    self.clock = clock
+    # key -> (value, stored_at, soft_ttl)
+    self.backend = LocMemBackend(maxsize=1024) if backend is None else backend
+    self._refreshing = set()
+    # refresh tasks, the event loop only keeps weak references to them
+    self._tasks = set()
+    self._lock = threading.Lock()
+    self.counters = {"hits": 0, "stale": 0, "misses": 0, "refreshes": 0, "errors": 0}
+
+  def _count(self, counter):
+    with self._lock:
+      self.counters[counter] += 1
+
+  def _lookup(self, key):
+    """
+    Returns (entry, age) or (None, None).
+    """
+    entry = self.backend.get(key, None)
+    if entry is None:
+      return None, None
+    return entry, self.clock() - entry[1]
+
+  def _is_fresh(self, entry, age):
+    return entry is not None and age < entry[2]
+
+  def _is_usable(self, entry, age):
+    """
+    Stale but young enough to serve while refreshing.
+    """
+    return entry is not None and age < self.hard_ttl
+
+  def freshness(self, key):
+    """
+    Returns (when the current value for key was loaded, until when it is fresh), per clock, or None.
+    """
+    entry = self.backend.get(key, None)
+    return None if entry is None else (entry[1], entry[1] + entry[2])
+
+  def fresh(self, key):
+    """
+    Returns (value, seconds it stays fresh) if key has a fresh entry, e.g. one another process just
+    stored in a shared backend, otherwise None.
+    """
+    entry, age = self._lookup(key)
+
+    if not self._is_fresh(entry, age):
+      return None
+
+    return entry[0], entry[2] - age
+
+  def set(self, key, value, max_age=None):
+    """
+    Stores a freshly loaded value, fresh for max_age seconds (default soft_ttl).
+    """
+    if isinstance(value, Loaded):
+      value, max_age = value
+
+    soft_ttl = self.soft_ttl if max_age is None else min(max_age, self.hard_ttl)
+
+    self.backend.set(key, (value, self.clock(), soft_ttl), ttl=2 * self.hard_ttl)
+
+  def clear(self):
+    """
+    Drops every entry.
+    """
+    self.backend.clear()
+
+  def stats(self):
+    """
+    Returns the cache's counters along with its backend's (prefixed with backend_).
+    """
+    with self._lock:
+      stats = dict(self.counters)
+
+    stats.update((f"backend_{name}", value) for name, value in self.backend.stats().items())
+    return stats
+
+  def get(self, key, loader):
+    """
+    Returns the cached value for key, calling loader() when it is missing or too old.
+    """
+
+    entry, age = self._lookup(key)
+
+    if self._is_fresh(entry, age):
+      self._count("hits")
+      return entry[0]
+
+    if self._is_usable(entry, age):
+      self._count("stale")
+      self._refresh_in_background(key, loader)
+      return entry[0]
+
+    self._count("misses")
+    return self._load(key, loader, entry)
+
+  async def aget(self, key, loader):
+    """
+    Async version of get, loader is a coroutine function and refreshes run as tasks.
+    """
+
+    entry, age = self._lookup(key)
+
+    if self._is_fresh(entry, age):
+      self._count("hits")
+      return entry[0]
+
+    if self._is_usable(entry, age):
+      self._count("stale")
+      if self._start_refresh(key):
+        task = asyncio.ensure_future(self._arefresh(key, loader))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+      return entry[0]
+
+    self._count("misses")
+
+    try:
+      value = await loader()
+    except Exception:
+      if entry is None:
+        raise
+      value = None
+
+    return self._store_or_fall_back(key, value, entry)
+
+  def _load(self, key, loader, entry):
+    """
+    Calls loader, falling back to the old entry (if any) when it fails.
+    """
+    try:
+      value = loader()
+    except Exception:
+      if entry is None:
+        raise
+      value = None
+
+    return self._store_or_fall_back(key, value, entry)
+
+  def _store_or_fall_back(self, key, value, entry):
+    """
+    Stores a successful load, or returns the old value (stale-if-error) for a failed one.
+    """
+    if isinstance(value, Loaded) and value.value is None:
+      value = None
+
+    if value is not None:
+      self.set(key, value)
+      return value.value if isinstance(value, Loaded) else value
+
+    if entry is not None:
+      self._count("errors")
+      return entry[0]
+
+    return None
+
+  def _start_refresh(self, key):
+    """
+    Marks key as refreshing, returns False if a refresh is already running.
+    """
+    with self._lock:
+      if key in self._refreshing:
+        return False
+      self._refreshing.add(key)
+      self.counters["refreshes"] += 1
+      return True
+
+  def _finish_refresh(self, key):
+    with self._lock:
+      self._refreshing.discard(key)
+
+  def _refresh_in_background(self, key, loader):
+    """
+    Refreshes key in a daemon thread, keeping the current entry if it fails.
+    """
+    if not self._start_refresh(key):
+      return
+
+    def refresh():
+      try:
+        self._store_or_fall_back(key, loader(), None)
+      except Exception as e:
+        print(f"Error refreshing forecast {key}, {e}")
+      finally:
+        self._finish_refresh(key)
+        # the loader may have used the database from this thread
+        connections.close_all()
+
+    threading.Thread(target=refresh, daemon=True).start()
+
+  async def _arefresh(self, key, loader):
+    """
+    Task version of _refresh_in_background.
+    """
+    try:
+      self._store_or_fall_back(key, await loader(), None)
+    except Exception as e:
+      print(f"Error refreshing forecast {key}, {e}")
+    finally:
+      self._finish_refresh(key)
+
+
+forecast_cache = ForecastCache()
+
+
+def configure(soft_ttl=1800, hard_ttl=10800, cache=None):
+  """
+  Replaces the shared cache, called from WeatherAppConfig.ready.
+  cache picks the backend, see cache_backends.build_backend.
+  """
+  global forecast_cache
+  backend = build_backend(cache, default_path=Path(tempfile.gettempdir()) / "weather_app" / "forecast_cache.sqlite",
+                          default_prefix="forecasts")
+  forecast_cache = ForecastCache(soft_ttl=soft_ttl, hard_ttl=hard_ttl, backend=backend)
+  return forecast_cache
@@ -0,0 +1,124 @@
+"""
+Offline gazetteer, resolves ZIP codes and major city names to coordinates without Nominatim.
+
+The data lives in data/gazetteer.bin (built by `python manage.py build_gazetteer`), a sorted
+array of fixed size records that is memory mapped and binary searched, so nothing is parsed
+or loaded into memory up front.
+
+File format (little endian):
+* header: b"GAZ1", record count (uint32)
+* records sorted by key: key (32 bytes), latitude (float32), longitude (float32), label (40 bytes)
+
+Keys are normalized like geocoding.normalize_query, e.g. "80918", "denver", "denver, co".
+"""
+
+import mmap
+import struct
+import threading
+from pathlib import Path
+
+GAZETTEER_PATH = Path(__file__).resolve().parent / "data" / "gazetteer.bin"
+
+MAGIC = b"GAZ1"
+HEADER = struct.Struct("<4sI")
+RECORD = struct.Struct("<32sff40s")
+KEY_SIZE = 32
+
+
+def _key(text):
+  """
+  Pads (or cuts) a normalized key to the fixed key size.
+  """
+  return text.encode("utf-8")[:KEY_SIZE].ljust(KEY_SIZE, b"\0")
+
+
+def write_gazetteer(path, entries):
+  """
+  Writes a gazetteer file from (key, latitude, longitude, label) entries.
+  The first entry wins when a key is repeated, so pass the most important places first.
+  """
+
+  records = {}
+  for key, latitude, longitude, label in entries:
+    records.setdefault(_key(key), (float(latitude), float(longitude), label))
+
+  path = Path(path)
+  path.parent.mkdir(parents=True, exist_ok=True)
+
+  with open(path, "wb") as output:
+    output.write(HEADER.pack(MAGIC, len(records)))
+    for key in sorted(records):
+      latitude, longitude, label = records[key]
+      output.write(RECORD.pack(key, latitude, longitude, label.encode("utf-8")[:40]))
+
+  return len(records)
+
+
+class Gazetteer:
+  """
+  Read only view of a gazetteer file. The file is opened and mapped on the first lookup.
+  """
+
+  def __init__(self, path=GAZETTEER_PATH):
+    self.path = Path(path)
+    self._map = None
+    self._count = 0
+    self._loaded = False
+    self._lock = threading.Lock()
+
+  def _load(self):
+    """
+    Maps the file into memory, a missing or invalid file leaves the gazetteer empty.
+    """
+    with self._lock:
+      if self._loaded:
+        return
+
+      try:
+        with open(self.path, "rb") as data:
+          gazetteer_map = mmap.mmap(data.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, count = HEADER.unpack_from(gazetteer_map, 0)
+        if magic == MAGIC and len(gazetteer_map) >= HEADER.size + count * RECORD.size:
+          self._map, self._count = gazetteer_map, count
+      except (OSError, ValueError, struct.error) as e:
+        print(f"Gazetteer not loaded, {e}")
+
+      self._loaded = True
+
+  def __len__(self):
+    self._load()
+    return self._count
+
+  def lookup(self, query):
+    """
+    Returns (latitude, longitude, label) for a normalized query, or None if it isn't known.
+    """
+    self._load()
+
+    if not self._count or not query:
+      return None
+
+    key = _key(query)
+    low, high = 0, self._count
+
+    # binary search for the first record >= key
+    while low < high:
+      middle = (low + high) // 2
+      offset = HEADER.size + middle * RECORD.size
+      if self._map[offset:offset + KEY_SIZE] < key:
+        low = middle + 1
+      else:
+        high = middle
+
+    if low == self._count:
+      return None
+
+    found, latitude, longitude, label = RECORD.unpack_from(self._map, HEADER.size + low * RECORD.size)
+    if found != key:
+      return None
+
+    # stored as float32, round off the noise (5 decimals is about a meter)
+    return round(latitude, 5), round(longitude, 5), label.rstrip(b"\0").decode("utf-8")
+
+
+gazetteer = Gazetteer()
@@ -0,0 +1,64 @@
+"""
+Helpers for turning what the user typed in the location box into coordinates.
+Nominatim (https://nominatim.org) is the slowest and most rate limited call we make, so
+lookups are cached here (in memory by default, see cache_backends.py) and in the Location
+table (see Location.geocode).
+"""
+
+import re
+import tempfile
+from pathlib import Path
+from geopy.geocoders import Nominatim
+from .cache_backends import LocMemBackend, build_backend
+
+# 80918, 80918-1234, 80918 1234
+ZIP_CODE = re.compile(r"^(\d{5})(?:[-\s]?\d{4})?$")
+WHITESPACE = re.compile(r"\s+")
+
+# Only one client is needed, geopy clients are stateless. Replaced by configure
+nominatim = Nominatim(user_agent="Weather App")
+
+
+def normalize_query(query):
+  """
+  Normalizes a location query so different spellings share a cache entry.
+  * Trims and collapses whitespace, case folds
+  * ZIP+4 codes become the 5 digit ZIP code
+
+  Ex. "  Colorado   Springs " -> "colorado springs", "80918-1234" -> "80918"
+  """
+  query = WHITESPACE.sub(" ", str(query)).strip().casefold()
+
+  zip_code = ZIP_CODE.match(query)
+  if zip_code:
+    return zip_code.group(1)
+
+  return query
+
+
+# normalized query -> geopy Location (or None when Nominatim has no match), replaced by configure
+geocode_cache = LocMemBackend(maxsize=1024)
+
+# seconds a query Nominatim has no match for is cached, it is looked up again after that
+MISS_TTL = 600
+
+
+def remember(query, location):
+  """
+  Caches what Nominatim answered for query. A miss (None) expires after MISS_TTL, so a place
+  Nominatim didn't know yet, or a lookup that failed, isn't remembered as not found for good.
+  """
+  geocode_cache.set(query, location, ttl=None if location else MISS_TTL)
+
+
+def configure(cache=None, domain="nominatim.openstreetmap.org", scheme="https"):
+  """
+  Picks where geocoded locations are cached (see cache_backends.build_backend) and which
+  Nominatim server is called (e.g. the weather_stub_server command), called from
+  WeatherAppConfig.ready.
+  """
+  global geocode_cache, nominatim
+  geocode_cache = build_backend(cache, default_path=Path(tempfile.gettempdir()) / "weather_app" / "geocode_cache.sqlite",
+                                default_prefix="geocodes")
+  nominatim = Nominatim(user_agent="Weather App", domain=domain, scheme=scheme)
+  return geocode_cache
@@ -0,0 +1,83 @@
+"""
+Coordinate snapping for the forecast grid.
+
+api.weather.gov forecasts are on a 2.5 km grid, but every spelling of a town geocodes to a
+slightly different coordinate, and each new coordinate would cost a /points call and get its own
+forecast cache entry. So (see Gridpoint):
+
+* Coordinates are snapped to coordinate_decimals decimals. 4 (about 11 meters) is the most the api
+takes, so by default this only drops the geocoder's extra digits, it merges hardly any coordinates.
+3 (about 110 meters) merges more, at the cost of moving each coordinate up to about 55 meters.
+* A coordinate within grid_match_radius meters of one already resolved reuses its forecast instead
+of calling /points. Which cell a new coordinate is in is only known from /points, so the match
+can't be made on the stored grid cell (Gridpoint.grid_x / grid_y), only on distance. The tradeoff
+is how often a match is in the neighbouring cell, a forecast 2.5 km off: for coordinates spread
+evenly, about 0.85 * radius / 2500 m of the matches. 10% at the default 300 m, 40% at half a
+cell (1250 m).
+"""
+
+import math
+
+# meters per degree of latitude
+METERS_PER_DEGREE = 111320
+
+coordinate_decimals = 4
+grid_match_radius = 300  # meters, 0 turns the lookup off
+
+
+def configure(decimals=4, match_radius=300):
+  """
+  Sets the snapping precision and match radius, called from WeatherAppConfig.ready.
+  """
+  global coordinate_decimals, grid_match_radius
+
+  if not 0 <= decimals <= 4:
+    raise ValueError("Coordinates can be snapped to 0 to 4 decimals.")
+  coordinate_decimals = decimals
+  grid_match_radius = match_radius
+
+
+def snap(latitude, longitude):
+  """
+  Rounds a coordinate to the configured decimals.
+  Ex. (38.89671, -104.80074) -> (38.8967, -104.8007) with 4 decimals, (38.9, -104.8) with 1
+  """
+  return round(float(latitude), coordinate_decimals), round(float(longitude), coordinate_decimals)
+
+
+def bounding_box(latitude, longitude, radius=None):
+  """
+  Returns (min latitude, max latitude, min longitude, max longitude) around a coordinate,
+  so the stored coordinates near it can be read with an indexed range query.
+  """
+  radius = grid_match_radius if radius is None else radius
+  latitude_delta = radius / METERS_PER_DEGREE
+  longitude_delta = radius / (METERS_PER_DEGREE * max(math.cos(math.radians(latitude)), 0.01))
+
+  return (latitude - latitude_delta, latitude + latitude_delta,
+          longitude - longitude_delta, longitude + longitude_delta)
+
+
+def distance(latitude, longitude, other_latitude, other_longitude):
+  """
+  Returns the distance in meters between two nearby coordinates (equirectangular approximation,
+  well within a meter at the distances compared here).
+  """
+  x = math.radians(other_longitude - longitude) * math.cos(math.radians((latitude + other_latitude) / 2))
+  y = math.radians(other_latitude - latitude)
+  return math.hypot(x, y) * 6371000
+
+
+def nearest(latitude, longitude, candidates, radius=None):
+  """
+  Returns the value of the closest (latitude, longitude, value) candidate within radius, or None.
+  """
+  radius = grid_match_radius if radius is None else radius
+  best, best_distance = None, radius
+
+  for other_latitude, other_longitude, value in candidates:
+    candidate_distance = distance(latitude, longitude, other_latitude, other_longitude)
+    if candidate_distance <= best_distance:
+      best, best_distance = value, candidate_distance
+
+  return best
@@ -0,0 +1,314 @@
+"""
+In-memory index of the clothes inventory for outfit lookups (see GenericClothes._get_clothes_in_temp).
+
+Every recommendation needs, for each clothing type, the most waterproof item whose comfort range
+covers the comfort, which used to be a query per type. The inventory is a small table that rarely
+changes, so each process keeps, per clothing type, the sorted comfort range endpoints and the best
+item at each endpoint and in each gap between two of them. A lookup is then a bisect, no queries.
+
+* The index is built on first use and dropped whenever a GenericClothes row is saved or deleted
+(post_save / post_delete, connected in WeatherAppConfig.ready).
+* Other processes don't get those signals, so an index is also rebuilt once it is max_age seconds old.
+* Inside a transaction GenericClothes builds a throwaway index from one query instead: the shared
+index only holds committed rows, and a rolled back save must not linger in it.
+* Ties on waterproof rating go to the lowest pk, like order_by('-waterproof_rating', 'pk').
+* The shared index also precomputes an OutfitTable, so a whole outfit is a single list index.
+* Rerolls pick from the items covering a comfort (also precomputed per endpoint / gap), uniformly or
+weighted by waterproof rating with an AliasSampler, so a pick takes constant time.
+"""
+
+import math
+import random
+import threading
+import time
+from bisect import bisect_left
+
+# the clothing types an outfit is made of, in order
+OUTFIT_TYPES = ["HAT", "SHR", "PNT", "SHO"]
+
+max_age = 300  # seconds
+
+_index = None
+_generation = 0
+_lock = threading.Lock()
+
+
+class AliasSampler:
+  """
+  Picks index i with probability weights[i] / sum(weights) in constant time, with Vose's alias method
+  (https://www.keithschwarz.com/darts-dice-coins/). All zero weights are picked uniformly.
+  """
+
+  def __init__(self, weights):
+    count = len(weights)
+    total = sum(weights)
+    scaled = [weight * count / total for weight in weights] if total else [1.0] * count
+
+    self.probability = [1.0] * count
+    self.alias = list(range(count))
+
+    small = [i for i, weight in enumerate(scaled) if weight < 1]
+    large = [i for i, weight in enumerate(scaled) if weight >= 1]
+
+    while small and large:
+      less, more = small.pop(), large.pop()
+      self.probability[less] = scaled[less]
+      self.alias[less] = more
+      scaled[more] = scaled[more] + scaled[less] - 1
+      (small if scaled[more] < 1 else large).append(more)
+
+  def sample(self, rng=random):
+    """
+    Returns a random index, rng is the random module or a random.Random.
+    """
+    i = rng.randrange(len(self.probability))
+    return i if rng.random() < self.probability[i] else self.alias[i]
+
+
+class TypeIndex:
+  """
+  Index over the comfort ranges of the items of one clothing type.
+  points are the distinct comfort_low / comfort_high values, sorted. Slot 2 * i is points[i], 
+  slot 2 * i + 1 the gap between points[i] and points[i + 1]. best[slot] is the best item covering 
+  the slot, covering[slot] every item covering it, by pk.
+  """
+
+  def __init__(self, items):
+    self.points = sorted({value for item in items for value in (item.comfort_low, item.comfort_high)})
+
+    # one comfort inside each point / gap, every item covers either all of it or none of it
+    probes = []
+    for i, point in enumerate(self.points):
+      probes.append(point)
+      if i + 1 < len(self.points):
+        probes.append((point + self.points[i + 1]) / 2)
+
+    by_pk = sorted(items, key=lambda item: item.pk)
+    self.covering = [
+      tuple(item for item in by_pk if item.comfort_low <= probe <= item.comfort_high) for probe in probes
+    ]
+    self.best = [min(covering, key=lambda item: -item.waterproof_rating, default=None) for covering in self.covering]
+    # AliasSampler per slot, built on first weighted pick
+    self.samplers = {}
+
+  def _slot(self, comfort):
+    """
+    Returns the slot comfort falls in, or None outside of every range.
+    """
+    i = bisect_left(self.points, comfort)
+
+    if i < len(self.points) and self.points[i] == comfort:
+      return 2 * i
+
+    if i == 0 or i == len(self.points):
+      return None
+
+    return 2 * i - 1
+
+  def lookup(self, comfort):
+    """
+    Returns the best item covering comfort, or None.
+    """
+    slot = self._slot(comfort)
+    return None if slot is None else self.best[slot]
+
+  def covering_items(self, comfort):
+    """
+    Returns a tuple of the items covering comfort, by pk.
+    """
+    slot = self._slot(comfort)
+    return () if slot is None else self.covering[slot]
+
+  def sampler(self, comfort):
+    """
+    Returns an AliasSampler over covering_items(comfort) weighted by waterproof rating, or None.
+    """
+    slot = self._slot(comfort)
+
+    if slot is None or not self.covering[slot]:
+      return None
+
+    if slot not in self.samplers:
+      self.samplers[slot] = AliasSampler([item.waterproof_rating for item in self.covering[slot]])
+
+    return self.samplers[slot]
+
+
+def _as_compared(comfort):
+  """
+  The comfort fields are integers, and Django compares comfort_low <= int(comfort) and
+  comfort_high >= ceil(comfort), so the same items match if a negative fraction is looked up as its ceiling.
+  """
+  return math.ceil(comfort) if comfort < 0 else comfort
+
+
+class OutfitTable:
+  """
+  The outfit (best item of each of OUTFIT_TYPES) and its waterproof average for every comfort in the
+  populated comfort range, from a TypeIndex per type. The comfort ranges have integer ends, so the outfit
+  only changes at integers: slots[2 * k] is for comfort low + k, slots[2 * k + 1] for the comforts between
+  low + k and low + k + 1. A slot is None where some type has nothing.
+  """
+
+  def __init__(self, type_indexes):
+    self.slots = []
+    self.low, self.high = 0, -1
+
+    if None in type_indexes:
+      return
+
+    # the outfit only changes at the ends of the comfort ranges, every slot between two ends gets the same one
+    points = sorted(set().union(*(index.points for index in type_indexes)))
+    self.low, self.high = points[0], points[-1]
+
+    for i, point in enumerate(points):
+      self.slots.append(self._slot(type_indexes, point))
+      if i + 1 < len(points):
+        gap = self._slot(type_indexes, (point + points[i + 1]) / 2)
+        self.slots.extend([gap] * (2 * (points[i + 1] - point) - 1))
+
+  @staticmethod
+  def _slot(type_indexes, comfort):
+    outfit = [index.lookup(comfort) for index in type_indexes]
+
+    if None in outfit:
+      return None
+
+    return outfit, sum([item.waterproof_rating for item in outfit]) / len(outfit)
+
+  def lookup(self, comfort):
+    """
+    Returns (outfit, waterproof average) for comfort, or None.
+    """
+    comfort = _as_compared(comfort)
+
+    if not self.low <= comfort <= self.high:
+      return None
+
+    bucket = math.floor(comfort)
+    return self.slots[2 * (bucket - self.low) + (comfort != bucket)]
+
+
+class InventoryIndex:
+  """
+  A TypeIndex per clothing type, built from a list of GenericClothes.
+  With dense=True, an OutfitTable of the outfits is precomputed too (what current() builds).
+  """
+
+  def __init__(self, items, built_at=None, dense=False):
+    by_type = {}
+    for item in items:
+      by_type.setdefault(item.clothing_type, []).append(item)
+
+    self.types = {clothing_type: TypeIndex(typed) for clothing_type, typed in by_type.items()}
+    self.items = {clothing_type: sorted(typed, key=lambda item: item.pk) for clothing_type, typed in by_type.items()}
+    self.size = len(items)
+    self.built_at = time.monotonic() if built_at is None else built_at
+    self.table = OutfitTable([self.types.get(clothing_type) for clothing_type in OUTFIT_TYPES]) if dense else None
+
+  def best(self, clothing_type, comfort):
+    """
+    Returns the most waterproof item of clothing_type covering comfort.
+    Raises LookupError if there is none.
+    """
+    comfort = _as_compared(comfort)
+
+    index = self.types.get(clothing_type)
+    item = index.lookup(comfort) if index is not None else None
+
+    if item is None:
+      raise LookupError(f"No {clothing_type} clothes cover a comfort of {comfort}.")
+
+    return item
+
+  def outfit(self, comfort):
+    """
+    Returns ([best item of each of OUTFIT_TYPES], their average waterproof rating) for comfort.
+    Raises LookupError if some type has nothing covering it.
+    """
+    if self.table is None:
+      outfit = [self.best(clothing_type, comfort) for clothing_type in OUTFIT_TYPES]
+      return outfit, sum([item.waterproof_rating for item in outfit]) / len(outfit)
+
+    found = self.table.lookup(comfort)
+
+    if found is None:
+      raise LookupError(f"No outfit covers a comfort of {comfort}.")
+
+    return list(found[0]), found[1]
+
+  def covering(self, clothing_type, comfort):
+    """
+    Returns a tuple of the items of clothing_type covering comfort, by pk.
+    """
+    index = self.types.get(clothing_type)
+    return index.covering_items(_as_compared(comfort)) if index is not None else ()
+
+  def pick(self, clothing_type, comfort, weighted=False, rng=random):
+    """
+    Returns a random item of clothing_type covering comfort, or None if there is none. 
+    Uniform, or weighted by waterproof rating. rng is the random module or a random.Random.
+    """
+    comfort = _as_compared(comfort)
+    index = self.types.get(clothing_type)
+    candidates = index.covering_items(comfort) if index is not None else ()
+
+    if not candidates:
+      return None
+
+    if weighted:
+      return candidates[index.sampler(comfort).sample(rng)]
+
+    return candidates[rng.randint(0, len(candidates) - 1)]
+
+  def of_type(self, clothing_type):
+    """
+    Returns every item of clothing_type, by pk.
+    """
+    return list(self.items.get(clothing_type, []))
+
+
+def current(model):
+  """
+  Returns the index of model (GenericClothes), building it if there is none or it is too old.
+  """
+  global _index
+
+  index = _index
+  if index is not None and time.monotonic() - index.built_at < max_age:
+    return index
+
+  with _lock:
+    if _index is not None and time.monotonic() - _index.built_at < max_age:
+      return _index
+    generation = _generation
+
+  index = InventoryIndex(list(model.objects.all()), dense=True)
+
+  with _lock:
+    # a save or delete while building may be missing from it, it is then only good for this call
+    if generation == _generation:
+      _index = index
+
+  return index
+
+
+def invalidate(sender=None, **kwargs):
+  """
+  Drops the index, it is rebuilt on next use. Receiver for GenericClothes' post_save / post_delete.
+  """
+  global _index, _generation
+
+  with _lock:
+    _index = None
+    _generation += 1
+
+
+def configure(max_age_seconds=300):
+  """
+  Sets how old an index may get before it is rebuilt, called from WeatherAppConfig.ready.
+  """
+  global max_age
+
+  max_age = max_age_seconds
+  invalidate()
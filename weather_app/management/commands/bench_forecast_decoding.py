@@ -0,0 +1,76 @@
+"""
+Microbenchmark for decoding a forecast, from the response body to the Forecast the views use,
+and for reading a forecast back from a shared cache.
+
+Usage:
+  python manage.py bench_forecast_decoding
+  python manage.py bench_forecast_decoding --periods 156 --repeat 500
+
+The forecast is synthetic (api.weather.gov's forecastHourly has 156 periods), so nothing is
+fetched and the numbers only measure our code.
+"""
+
+import pickle
+import time
+from django.core.management.base import BaseCommand
+from ...decoders import parse_start_time, parse_wind_speed
+from ...forecast import Forecast
+from ...models import Weather
+from ...periods import parse_periods
+from ...stubs import forecast_body
+
+
+def bench(fn, repeat):
+  """
+  Returns the best time per call in microseconds, over repeat calls.
+  """
+  best = float("inf")
+
+  for _ in range(repeat):
+    started = time.perf_counter()
+    fn()
+    best = min(best, time.perf_counter() - started)
+
+  return best * 1e6
+
+
+class Command(BaseCommand):
+  """
+  python manage.py bench_forecast_decoding
+  """
+
+  help = "Times decoding one forecast (parsing the body, the timestamps, the wind speeds and formatting)."
+
+  def add_arguments(self, parser):
+    parser.add_argument("--periods", type=int, default=156, help="periods in the forecast")
+    parser.add_argument("--repeat", type=int, default=200)
+
+  def handle(self, *args, **options):
+    body = forecast_body(options["periods"])
+    periods = parse_periods(body)
+    start_times = [period["startTime"] for period in periods]
+    wind_speeds = [period["windSpeed"] for period in periods]
+    repeat = options["repeat"]
+    forecast = Weather._pack(periods)
+    packed = forecast.to_bytes()
+    pickled_periods = pickle.dumps(periods, pickle.HIGHEST_PROTOCOL)
+
+    results = [
+      ("parse body", bench(lambda: parse_periods(body), repeat)),
+      ("start times", bench(lambda: [parse_start_time(text) for text in start_times], repeat)),
+      ("wind speeds", bench(lambda: [parse_wind_speed(text) for text in wind_speeds], repeat)),
+      ("format forecast", bench(lambda: Weather._format_response(periods, "Benchmark"), repeat)),
+      ("unpickle periods", bench(lambda: pickle.loads(pickled_periods), repeat)),
+      ("unpack forecast", bench(lambda: Forecast.from_bytes(packed), repeat)),
+    ]
+
+    self.stdout.write(f"{len(periods)} periods, {len(body) / 1024:.0f} KiB body, best of {repeat}")
+    for name, microseconds in results:
+      self.stdout.write(f"  {name:<16} {microseconds:8.0f} us per forecast")
+
+    self.stdout.write(f"Cached as periods {len(pickled_periods) / 1024:.1f} KiB, as a packed forecast "
+                      f"{len(packed) / 1024:.1f} KiB")
+
+    timings = dict(results)
+    total = timings["parse body"] + timings["format forecast"]
+    self.stdout.write(self.style.SUCCESS(f"Body to Forecast: {total / 1000:.2f} ms per forecast"))
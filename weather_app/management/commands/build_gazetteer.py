@@ -0,0 +1,79 @@
+"""
+Builds the offline gazetteer (data/gazetteer.bin) used by Location.geocode.
+See https://docs.djangoproject.com/en/5.0/howto/custom-management-commands/
+
+Usage:
+  python manage.py build_gazetteer
+  python manage.py build_gazetteer --zcta 2020_Gaz_zcta_national.txt
+
+The ZCTA file is the Census ZIP code gazetteer (https://www.census.gov/geographies/reference-files/time-series/geo/gazetteer-files.html),
+it adds every US ZIP code to the bundled ones.
+"""
+
+import csv
+from django.core.management.base import BaseCommand
+from ...gazetteer import GAZETTEER_PATH, write_gazetteer
+from ...geocoding import normalize_query
+
+DATA_DIR = GAZETTEER_PATH.parent
+
+
+def read_zip_codes(path):
+  """
+  Yields gazetteer entries from a zip,label,latitude,longitude csv.
+  """
+  with open(path, newline="", encoding="utf-8") as zip_file:
+    for row in csv.DictReader(zip_file):
+      yield normalize_query(row["zip"]), row["latitude"], row["longitude"], row["label"]
+
+
+def read_zcta(path):
+  """
+  Yields gazetteer entries from the Census ZCTA gazetteer (tab separated).
+  """
+  with open(path, newline="", encoding="utf-8") as zcta_file:
+    reader = csv.DictReader(zcta_file, delimiter="\t")
+    # the census pads the last column name with spaces
+    reader.fieldnames = [name.strip() for name in reader.fieldnames]
+    for row in reader:
+      zip_code = row["GEOID"].strip()
+      yield zip_code, row["INTPTLAT"], row["INTPTLONG"].strip(), f"ZIP {zip_code}"
+
+
+def read_places(path):
+  """
+  Yields gazetteer entries from a name,state,latitude,longitude csv ordered by importance.
+  Each place can be found as "name, state" and, for the first place with that name, "name".
+  """
+  with open(path, newline="", encoding="utf-8") as places_file:
+    for row in csv.DictReader(places_file):
+      label = f"{row['name']}, {row['state']}"
+      yield normalize_query(label), row["latitude"], row["longitude"], label
+      yield normalize_query(row["name"]), row["latitude"], row["longitude"], label
+
+
+class Command(BaseCommand):
+  """
+  python manage.py build_gazetteer
+  """
+
+  help = "Builds the offline ZIP code / city gazetteer used before falling back to Nominatim."
+
+  def add_arguments(self, parser):
+    parser.add_argument("--zip-codes", default=DATA_DIR / "zip_codes.csv",
+                        help="csv of zip,label,latitude,longitude")
+    parser.add_argument("--places", default=DATA_DIR / "places.csv",
+                        help="csv of name,state,latitude,longitude, most important first")
+    parser.add_argument("--zcta", help="Census ZCTA gazetteer file with every US ZIP code")
+    parser.add_argument("--output", default=GAZETTEER_PATH)
+
+  def handle(self, *args, **options):
+    entries = []
+    entries.extend(read_zip_codes(options["zip_codes"]))
+    entries.extend(read_places(options["places"]))
+
+    if options["zcta"]:
+      entries.extend(read_zcta(options["zcta"]))
+
+    count = write_gazetteer(options["output"], entries)
+    self.stdout.write(self.style.SUCCESS(f"Wrote {count} entries to {options['output']}"))
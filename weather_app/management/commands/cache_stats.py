@@ -0,0 +1,41 @@
+"""
+Prints the size and counters of the forecast and geocode caches (see cache_backends.py).
+
+Usage:
+  python manage.py cache_stats
+  python manage.py cache_stats --compact   # also drop expired entries and shrink the files
+
+The hit / miss counters are this process's, so for the file backend they only count what
+this command did. The entry counts and sizes are the backend's.
+"""
+
+from django.core.management.base import BaseCommand
+from ... import forecast_cache, geocoding
+
+
+class Command(BaseCommand):
+  """
+  python manage.py cache_stats
+  """
+
+  help = "Prints the entry count, bytes and hit / miss / eviction counters of the forecast and geocode caches."
+
+  def add_arguments(self, parser):
+    parser.add_argument("--compact", action="store_true",
+                        help="drop expired entries and VACUUM file caches first")
+
+  def handle(self, *args, **options):
+    caches = [
+      ("forecasts", forecast_cache.forecast_cache.backend),
+      ("geocoding", geocoding.geocode_cache),
+    ]
+
+    for name, backend in caches:
+      if options["compact"] and hasattr(backend, "compact"):
+        expired = backend.compact()
+        self.stdout.write(f"{name}: dropped {expired} expired entries")
+
+      stats = backend.stats()
+      self.stdout.write(self.style.SUCCESS(f"{name} ({type(backend).__name__})"))
+      for stat, value in stats.items():
+        self.stdout.write(f"  {stat:<12} {'-' if value is None else value}")
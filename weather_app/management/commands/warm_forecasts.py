@@ -0,0 +1,119 @@
+"""
+Warms the geocoding and forecast caches, so the first visitors after a deploy or a cache
+flush don't wait on Nominatim and api.weather.gov.
+
+Usage:
+  python manage.py warm_forecasts                       # the 50 most recently used locations
+  python manage.py warm_forecasts --recent 200 --workers 8
+  python manage.py warm_forecasts --file locations.txt  # one location per line
+
+Locations go through Weather.get_weather_forecast, so they end up in the same caches (the
+Location, Gridpoint and Weather tables, and this process's memory) as a real request.
+"""
+
+import statistics
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from django.core.management.base import BaseCommand
+from django.db import connections
+from ...models import Location, Weather
+
+
+def read_locations(path):
+  """
+  Returns the locations in a file, one per line, skipping blank lines and # comments.
+  """
+  with open(path, encoding="utf-8") as locations_file:
+    lines = (line.strip() for line in locations_file)
+    return [line for line in lines if line and not line.startswith("#")]
+
+
+def recent_locations(limit):
+  """
+  Returns the queries of the most recently used locations.
+  """
+  return list(Location.objects.exclude(query=None).order_by("-last_used").values_list(
+    "query", flat=True)[:limit])
+
+
+class Pacer:
+  """
+  Spaces out calls to at most rate per second across threads, so warming doesn't trip the
+  upstream rate limits (Nominatim allows one request per second).
+  """
+
+  def __init__(self, rate):
+    self.interval = 1 / rate if rate else 0
+    self._next = time.monotonic()
+    self._lock = threading.Lock()
+
+  def wait(self):
+    with self._lock:
+      now = time.monotonic()
+      start = max(now, self._next)
+      self._next = start + self.interval
+    time.sleep(start - now)
+
+
+def warm(location, pacer):
+  """
+  Warms one location, returns (location, status, seconds).
+  """
+  pacer.wait()
+  started = time.perf_counter()
+
+  try:
+    status = "ok" if Weather.get_weather_forecast(location) else "no forecast"
+  except Exception as e:
+    status = f"error: {e}"
+  finally:
+    # each worker thread has its own database connection
+    connections.close_all()
+
+  return location, status, time.perf_counter() - started
+
+
+class Command(BaseCommand):
+  """
+  python manage.py warm_forecasts
+  """
+
+  help = "Geocodes and fetches forecasts for a list of locations to warm the caches."
+
+  def add_arguments(self, parser):
+    parser.add_argument("--file", help="file with one location per line")
+    parser.add_argument("--recent", type=int, default=50,
+                        help="number of recently used locations to warm when no file is given")
+    parser.add_argument("--workers", type=int, default=4, help="locations warmed at the same time")
+    parser.add_argument("--rate", type=float, default=1.0,
+                        help="locations started per second, 0 for no limit")
+
+  def handle(self, *args, **options):
+    if options["file"]:
+      locations = read_locations(options["file"])
+    else:
+      locations = recent_locations(options["recent"])
+
+    if not locations:
+      self.stdout.write("No locations to warm")
+      return
+
+    pacer = Pacer(options["rate"])
+    started = time.perf_counter()
+    timings = []
+    failed = 0
+
+    with ThreadPoolExecutor(max_workers=max(1, options["workers"])) as pool:
+      for location, status, seconds in pool.map(lambda location: warm(location, pacer), locations):
+        timings.append(seconds)
+        if status != "ok":
+          failed += 1
+        self.stdout.write(f"{location}: {status} in {seconds * 1000:.0f} ms")
+
+    elapsed = time.perf_counter() - started
+    summary = (f"Warmed {len(locations) - failed}/{len(locations)} locations in {elapsed:.1f} s "
+               f"({len(locations) / elapsed:.1f}/s, median {statistics.median(timings) * 1000:.0f} ms, "
+               f"max {max(timings) * 1000:.0f} ms)")
+
+    self.stdout.write(self.style.SUCCESS(summary) if not failed else self.style.WARNING(summary))
@@ -0,0 +1,56 @@
+"""
+Runs a stand-in for api.weather.gov and Nominatim (see stubs.py) for load and benchmark runs.
+
+Usage:
+  python manage.py weather_stub_server --port 8001
+  python manage.py weather_stub_server --fixtures fixtures.json --latency 0.2 --error-rate 0.05
+  python manage.py weather_stub_server --fixtures fixtures.json --record   # capture real answers
+
+Then point the app at it, e.g.:
+  WEATHER_API_URL=http://127.0.0.1:8001 WEATHER_NOMINATIM_DOMAIN=127.0.0.1:8001 \
+  WEATHER_NOMINATIM_SCHEME=http python manage.py runserver
+"""
+
+from django.core.management.base import BaseCommand
+from ...stubs import StubUpstream, make_server
+
+
+class Command(BaseCommand):
+  """
+  python manage.py weather_stub_server
+  """
+
+  help = "Serves /points, forecastHourly and Nominatim /search from fixtures or made up answers."
+
+  def add_arguments(self, parser):
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8001)
+    parser.add_argument("--fixtures", help="JSON file of recorded answers")
+    parser.add_argument("--record", action="store_true",
+                        help="fetch paths without a fixture from the real APIs and save them")
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds added to every answer")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="share of answers that are a 503")
+    parser.add_argument("--periods", type=int, default=156, help="hours in made up forecasts")
+
+  def handle(self, *args, **options):
+    base_url = f"http://{options['host']}:{options['port']}"
+    upstream = StubUpstream(
+      base_url,
+      fixtures_path=options["fixtures"],
+      record=options["record"],
+      latency=options["latency"],
+      error_rate=options["error_rate"],
+      periods=options["periods"],
+    )
+    server = make_server(upstream, options["host"], options["port"])
+
+    self.stdout.write(self.style.SUCCESS(
+      f"Serving api.weather.gov and Nominatim stand-ins on {base_url} ({len(upstream.fixtures)} fixtures)"))
+
+    try:
+      server.serve_forever()
+    except KeyboardInterrupt:
+      pass
+    finally:
+      server.server_close()
+      self.stdout.write(", ".join(f"{name} {count}" for name, count in upstream.counters.items()))
@@ -0,0 +1,29 @@
+# Generated by Django 5.0.2 on 2026-10-18 12:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('weather_app', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Gridpoint',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('latitude', models.FloatField()),
+                ('longitude', models.FloatField()),
+                ('grid_id', models.CharField(max_length=3)),
+                ('grid_x', models.IntegerField()),
+                ('grid_y', models.IntegerField()),
+                ('forecast_hourly_url', models.URLField()),
+                ('updated', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('latitude', 'longitude'), name='unique_gridpoint_coordinate')],
+            },
+        ),
+    ]
@@ -0,0 +1,44 @@
+# Generated by Django 5.0.2 on 2026-10-18 12:30
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('weather_app', '0002_gridpoint'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='location',
+            name='name',
+            field=models.CharField(max_length=100),
+        ),
+        migrations.AddField(
+            model_name='location',
+            name='query',
+            field=models.CharField(max_length=100, null=True, unique=True),
+        ),
+        migrations.AddField(
+            model_name='location',
+            name='address',
+            field=models.CharField(blank=True, max_length=255),
+        ),
+        migrations.AddField(
+            model_name='location',
+            name='latitude',
+            field=models.FloatField(null=True),
+        ),
+        migrations.AddField(
+            model_name='location',
+            name='longitude',
+            field=models.FloatField(null=True),
+        ),
+        migrations.AddField(
+            model_name='location',
+            name='last_used',
+            field=models.DateTimeField(default=django.utils.timezone.now),
+        ),
+    ]
@@ -0,0 +1,43 @@
+# Generated by Django 5.0.2 on 2026-10-18 13:00
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('weather_app', '0003_location_geocode'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='weather',
+            name='temperature_description',
+            field=models.CharField(blank=True, max_length=100),
+        ),
+        migrations.AlterField(
+            model_name='weather',
+            name='image',
+            field=models.ImageField(blank=True, upload_to='weather_images'),
+        ),
+        migrations.AddField(
+            model_name='weather',
+            name='precipitation',
+            field=models.IntegerField(null=True),
+        ),
+        migrations.AddField(
+            model_name='weather',
+            name='utc_offset',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='weather',
+            name='fetched_at',
+            field=models.DateTimeField(default=django.utils.timezone.now),
+        ),
+        migrations.AddConstraint(
+            model_name='weather',
+            constraint=models.UniqueConstraint(fields=('location', 'date'), name='unique_weather_location_date'),
+        ),
+    ]
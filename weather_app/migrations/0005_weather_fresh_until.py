@@ -0,0 +1,18 @@
+# Generated by Django 5.0.2 on 2026-10-18 15:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('weather_app', '0004_weather_forecast_store'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='weather',
+            name='fresh_until',
+            field=models.DateTimeField(null=True),
+        ),
+    ]
@@ -1,13 +1,22 @@
-from datetime import date, datetime
+from array import array
+from datetime import date, datetime, timedelta, timezone as dt_timezone
 import random
-import requests
-import requests_cache
 from django.core import validators
-from django.db import models
+from django.db import connection, models
 from django.urls import reverse
-from geopy.geocoders import Nominatim
+from django.utils import timezone
+from asgiref.sync import sync_to_async
+from geopy.location import Location as GeoLocation
 from django_resized import ResizedImageField
-from .utils import calculate_heat_index, calculate_windchill
+from .utils import calculate_feels_like, calculate_heat_index, calculate_windchill, get_xth_hour_weather
+from .client import get_client, get_async_client
+from .geocoding import normalize_query
+from .gazetteer import gazetteer
+from .forecast import Forecast
+from .periods import parse_periods
+from .decoders import parse_start_time, parse_wind_speed
+from . import forecast_cache, geocoding, gridcells, inventory_index, ratelimit, revalidation, singleflight
+from .forecast_cache import Loaded
 
 # https://docs.djangoproject.com/en/5.0/howto/initial-data/#:~:text=You%20can%20load%20data%20by,and%20reloaded%20into%20the%20database to populate the list of generic clothes
 # Must be loaded manually using python manage.py loaddata fixture_generic_clothes.json
@@ -103,14 +112,45 @@ class GenericClothes(models.Model):
     return wind_chill - tolerance_offset + working_offset
 
   
+  @classmethod
+  def _calculate_comforts(cls, temperatures, humidities, wind_speeds,
+                          tolerance_offset, working_offset):
+    """
+    _calculate_comfort for every hour of a forecast, in one pass (see utils.calculate_feels_like).
+
+    Params:
+    * Temperatures, humidities and wind speeds, one per hour (lists, arrays or Forecast columns)
+
+    Returns an array with the comfort of every hour, equal to _calculate_comfort hour by hour.
+    """
+
+    if working_offset < 0:
+      raise ValueError("Working offset must be greater than or equal to 0.")
+
+    feels_like = calculate_feels_like(temperatures, humidities, wind_speeds)
+    return array('d', [value - tolerance_offset + working_offset for value in feels_like])
+
+  
+  @classmethod
+  def get_comfort_curve(cls, weather_data, tolerance_offset, working_offset):
+    """
+    Returns the comfort of every hour of a forecast (see Weather.get_weather_forecast), e.g. to chart it.
+    """
+
+    return cls._calculate_comforts(weather_data["temperature"], weather_data["humidity"],
+                                   weather_data["wind"], tolerance_offset, working_offset)
+
+  
   @classmethod 
-  def get_clothes_in_temp_reroll(cls, comfort, type):
+  def get_clothes_in_temp_reroll(cls, comfort, type, weighted=False, seed=None):
     """
     Function that, given a comfort level, returns a random 
     article of clothing of a specified type (Hat, Shirt, etc)
     and its waterproofness
 
     Comfort should be in range -460 (absolute zero) and 6100 (melting point of tungsten)
+    * weighted picks more waterproof clothes more often, otherwise every article is as likely
+    * seed makes the pick reproducible
     """
 
     context = {}
@@ -121,20 +161,32 @@ class GenericClothes(models.Model):
     if type not in ["HAT", "SHR", "PNT", "SHO", "MIS"]:
       raise ValueError("Type must be one of the following: HAT, SHR, PNT, SHO, MIS.")
 
-    clothes = cls.objects.filter(clothing_type=type, comfort_low__lte=comfort, comfort_high__gte=comfort)
+    # picks from the inventory index, in constant time and without queries
+    rng = random if seed is None else random.Random(seed)
+    random_clothe = cls._inventory().pick(type, comfort, weighted, rng)
 
-    if len(clothes) == 0:
+    if random_clothe is None:
         return None
 
-    random_clothe = clothes[random.randint(0, len(clothes) - 1)]
-
     context["image"] = random_clothe.image.url
     context["name"] = random_clothe.name
     
     return (context, random_clothe.waterproof_rating)
     
   @classmethod
-  def _get_clothes_in_temp(cls, comfort):
+  def _inventory(cls):
+    """
+    Returns the clothes as an inventory_index.InventoryIndex. Inside a transaction it is built from 
+    a single query, since the shared index only holds committed rows.
+    """
+    if connection.in_atomic_block:
+      return inventory_index.InventoryIndex(list(cls.objects.all()))
+
+    return inventory_index.current(cls)
+
+  
+  @classmethod
+  def _get_clothes_in_temp(cls, comfort, inventory=None):
     """
     Function that, given a comfort value, iterates through the current clothes in the database.
     Returns:
@@ -142,6 +194,7 @@ class GenericClothes(models.Model):
     * The average waterproofing of the clothes.
 
     Comfort should be in range -460 (absolute zero) and 6100 (melting point of tungsten)
+    inventory is read from _inventory if not given.
     """
 
     # Define defaults in the case of errors
@@ -154,28 +207,21 @@ class GenericClothes(models.Model):
           "Comfort must be in range -460 (absolute zero) and 6100 (melting point of tungsten)."
       )
 
-    # comfort_low <= comfort <= comfort_high
-    clothes = cls.objects.filter(comfort_low__lte=comfort,
-                                 comfort_high__gte=comfort)
+    if inventory is None:
+      inventory = cls._inventory()
 
-    # build the outfit, little bit of metaprogramming / syntactic sugar
+    # the best HAT, SHR, PNT and SHO with comfort_low <= comfort <= comfort_high
     try:
-      outfit = [
-          clothes.filter(clothing_type=query).order_by('-waterproof_rating')[0]
-          for query in ["HAT", "SHR", "PNT", "SHO"]
-      ]
-
-      waterproof_average = sum([outfit.waterproof_rating
-                                for outfit in outfit]) / 4
+      outfit, waterproof_average = inventory.outfit(comfort)
 
-    except Exception as e:  # [0] throws error when filter returns nothing
+    except Exception as e:  # outfit throws an error when nothing covers the comfort
       print(f"Error in getting clothes, {e}")
 
     return (outfit, waterproof_average)
 
   
   @classmethod
-  def _get_clothes_in_prec(cls, precipitation_chance, average_waterproof):
+  def _get_clothes_in_prec(cls, precipitation_chance, average_waterproof, inventory=None):
     """
     Simple function that determines if waterproofing layers are needed based on the precipitation chance.
 
@@ -188,8 +234,25 @@ class GenericClothes(models.Model):
     if average_waterproof > precipitation_chance:
       return []
 
-    outfit = cls.objects.filter(clothing_type="MIS")
-    return list(outfit)
+    if inventory is None:
+      inventory = cls._inventory()
+
+    return inventory.of_type("MIS")
+
+  
+  @staticmethod
+  def _recommendation(comfort, outfit, waterproofness, precipitation_clothes, colors):
+    """
+    Formats a recommendation, see get_outfit_recommendation.
+    """
+
+    return {
+      'comfort': comfort,
+      'waterproofness': waterproofness,
+      'outfit': [{"image": clothes.image.url, "name": clothes.name} for clothes in outfit],
+      'precipitation_outfit': [{"image": clothes.image.url, "name": clothes.name} for clothes in precipitation_clothes],
+      'colors': colors,
+    }
 
   
   @classmethod
@@ -215,8 +278,6 @@ class GenericClothes(models.Model):
     }
     """
 
-    context = {}
-
     comfort = cls._calculate_comfort(temperature, humidity, wind,
                                      tolerance_offset, working_offset)
     outfit, waterproofness = cls._get_clothes_in_temp(comfort)
@@ -224,13 +285,34 @@ class GenericClothes(models.Model):
                                                      waterproofness)
     colors = cls._get_color_palette()
 
-    context['comfort'] = comfort
-    context['waterproofness'] = waterproofness
-    context['outfit'] = [{"image": clothes.image.url, "name": clothes.name} for clothes in outfit]
-    context['precipitation_outfit'] = [{"image": clothes.image.url, "name": clothes.name} for clothes in precipitation_clothes]
-    context['colors'] = colors
+    return cls._recommendation(comfort, outfit, waterproofness, precipitation_clothes, colors)
+
+  
+  @classmethod
+  def get_outfit_recommendations(cls, weather_data, hours, tolerance_offset, working_offset):
+    """
+    get_outfit_recommendation for several hours of one forecast, e.g. hours=[0, 24, 48].
+    The inventory is read once for all of them (not at all once the inventory index is built), 
+    so the number of queries doesn't grow with the number of hours.
+
+    Returns a list with a get_outfit_recommendation dict per hour, in the order of hours.
+    """
+
+    inventory = cls._inventory()
+    colors = cls._get_color_palette()
+
+    weather = [get_xth_hour_weather(hour, weather_data) for hour in hours]
+    temperatures, humidities, winds, _ = zip(*weather) if weather else ((), (), (), ())
+    comforts = cls._calculate_comforts(temperatures, humidities, winds, tolerance_offset, working_offset)
+
+    recommendations = []
+    for (_, _, _, precipitation), comfort in zip(weather, comforts):
+      outfit, waterproofness = cls._get_clothes_in_temp(comfort, inventory)
+      precipitation_clothes = cls._get_clothes_in_prec(precipitation, waterproofness, inventory)
+      recommendations.append(
+        cls._recommendation(comfort, outfit, waterproofness, precipitation_clothes, list(colors)))
 
-    return context
+    return recommendations
 
   
   @classmethod
@@ -270,27 +352,319 @@ class GenericClothes(models.Model):
 
 class Location(models.Model):
   """
-  I don't actually think this is used.
+  A location the user searched for, along with where Nominatim placed it.
+  Acts as the persistent tier of the geocoding cache (the in-memory tier is geocoding.geocode_cache).
   """
   
-  name = models.CharField(max_length=30)
+  name = models.CharField(max_length=100)  # what the user typed
+  query = models.CharField(max_length=100, unique=True, null=True)  # see geocoding.normalize_query
+  address = models.CharField(max_length=255, blank=True)
+  latitude = models.FloatField(null=True)
+  longitude = models.FloatField(null=True)
+  last_used = models.DateTimeField(default=timezone.now)
 
   def __str__(self):
     return self.name
 
+  @classmethod
+  def geocode(cls, location_input):
+    """
+    Returns the geopy Location for what the user typed, or None if it can't be found.
+    Checks, in order, the in-memory cache, the offline gazetteer (ZIP codes and major cities), 
+    the Location table and then Nominatim, so a location only ever reaches Nominatim once.
+    Nominatim calls are rate limited (see ratelimit.py), raises ratelimit.RateLimitTimeout
+    when too many lookups are queued.
+    """
+
+    query = normalize_query(location_input)[:100]
+
+    location = cls._known(query)
+    if location is not geocoding.geocode_cache.MISSING:
+      return location
+
+    saved = cls.objects.filter(query=query).first()
+
+    if saved:
+      cls.objects.filter(pk=saved.pk).update(last_used=timezone.now())
+      return cls._remember(query, saved)
+
+    location = cls._nominatim(query)
+
+    # not found isn't saved, and only cached for a while (see geocoding.remember)
+    if location:
+      cls.objects.update_or_create(query=query, defaults=cls._saved_defaults(location_input, location))
+
+    geocoding.remember(query, location)
+    return location
+
+  @classmethod
+  async def ageocode(cls, location_input):
+    """
+    Async version of geocode. The Location table is read and written with the async ORM, only the
+    Nominatim lookup (geopy's client is synchronous) runs in a worker thread. It isn't thread
+    sensitive, so a lookup waiting on the rate limit doesn't hold up every other sync_to_async call.
+    """
+
+    query = normalize_query(location_input)[:100]
+
+    location = cls._known(query)
+    if location is not geocoding.geocode_cache.MISSING:
+      return location
+
+    saved = await cls.objects.filter(query=query).afirst()
+
+    if saved:
+      await cls.objects.filter(pk=saved.pk).aupdate(last_used=timezone.now())
+      return cls._remember(query, saved)
+
+    location = await sync_to_async(cls._nominatim, thread_sensitive=False)(query)
+
+    if location:
+      await cls.objects.aupdate_or_create(query=query, defaults=cls._saved_defaults(location_input, location))
+
+    geocoding.remember(query, location)
+    return location
+
+  @staticmethod
+  def _known(query):
+    """
+    Returns the location for query from the in-memory cache or the offline gazetteer,
+    otherwise geocode_cache.MISSING.
+    """
+    location = geocoding.geocode_cache.get(query)
+    if location is not geocoding.geocode_cache.MISSING:
+      return location
+
+    known_place = gazetteer.lookup(query)
+
+    if known_place:
+      latitude, longitude, label = known_place
+      location = GeoLocation(label, (latitude, longitude), {})
+      geocoding.geocode_cache.set(query, location)
+      return location
+
+    return geocoding.geocode_cache.MISSING
+
+  @staticmethod
+  def _remember(query, saved):
+    """
+    Returns the location of a saved Location row, caching it in memory.
+    """
+    location = GeoLocation(saved.address, (saved.latitude, saved.longitude), {})
+    geocoding.geocode_cache.set(query, location)
+    return location
+
+  @staticmethod
+  def _nominatim(query):
+    """
+    Looks query up on Nominatim, about one request per second, see https://operations.osmfoundation.org/policies/nominatim/
+    """
+    ratelimit.nominatim_bucket.acquire()
+    return geocoding.nominatim.geocode(query)
+
+  @classmethod
+  def get_saved(cls, location_input, location):
+    """
+    Returns the Location row for a geocoded query, creating it for locations that never
+    reached Nominatim (e.g., gazetteer hits), so forecasts can be stored against it.
+    """
+    query = normalize_query(location_input)[:100]
+    saved, _ = cls.objects.get_or_create(query=query, defaults=cls._saved_defaults(location_input, location))
+    return saved
+
+  @classmethod
+  async def aget_saved(cls, location_input, location):
+    """
+    Async version of get_saved.
+    """
+    query = normalize_query(location_input)[:100]
+    saved, _ = await cls.objects.aget_or_create(query=query, defaults=cls._saved_defaults(location_input, location))
+    return saved
+
+  @staticmethod
+  def _saved_defaults(location_input, location):
+    return {
+      "name": str(location_input).strip()[:100],
+      "address": str(location.address)[:255],
+      "latitude": location.latitude,
+      "longitude": location.longitude,
+    }
+
+
+class Gridpoint(models.Model):
+  """
+  Remembers which api.weather.gov forecast belongs to a coordinate, so the /points lookup
+  only happens the first time a coordinate is seen. 
+  The forecast grid basically never changes, so rows are kept until the forecast url stops working.
+  A coordinate close enough to one already seen shares its forecast, see gridcells.py.
+  """
+
+  latitude = models.FloatField()
+  longitude = models.FloatField()
+  grid_id = models.CharField(max_length=3)  # forecast office, e.g. PUB
+  grid_x = models.IntegerField()
+  grid_y = models.IntegerField()
+  forecast_hourly_url = models.URLField(max_length=200)
+  updated = models.DateTimeField(auto_now=True)
+
+  class Meta:
+    # the unique constraint doubles as the index for the lookup
+    constraints = [
+      models.UniqueConstraint(fields=["latitude", "longitude"], name="unique_gridpoint_coordinate")
+    ]
+
+  def __str__(self):
+    return f"{self.grid_id} {self.grid_x},{self.grid_y}"
+
+  @staticmethod
+  def _round(latitude, longitude):
+    """
+    api.weather.gov only accepts 4 decimals (about 11 meters), so coordinates are stored the same
+    way, or snapped to fewer decimals (see gridcells.py).
+    """
+    return gridcells.snap(latitude, longitude)
+
+  @classmethod
+  def _nearby(cls, latitude, longitude):
+    """
+    Returns the stored (latitude, longitude, forecast url) around a coordinate: the rows in the
+    bounding box of the match radius (a range query on the coordinate index), or the exact
+    coordinate when the radius is 0.
+    """
+    if not gridcells.grid_match_radius:
+      return cls.objects.filter(latitude=latitude, longitude=longitude).values_list(
+        "latitude", "longitude", "forecast_hourly_url")
+
+    min_latitude, max_latitude, min_longitude, max_longitude = gridcells.bounding_box(latitude, longitude)
+    return cls.objects.filter(
+      latitude__range=(min_latitude, max_latitude),
+      longitude__range=(min_longitude, max_longitude),
+    ).values_list("latitude", "longitude", "forecast_hourly_url")
+
+  @classmethod
+  def get_forecast_url(cls, latitude, longitude):
+    """
+    Returns the forecastHourly url for a coordinate, or None if api.weather.gov does not cover it.
+    Only calls /points/{latitude},{longitude} when the coordinate has not been seen before.
+    """
+
+    latitude, longitude = cls._round(latitude, longitude)
+
+    forecast_url = cls.get_stored_url(latitude, longitude)
+
+    if forecast_url:
+      return forecast_url
+
+    client = get_client()
+    location_data = client.get(client.points_url(latitude, longitude)).json()
+    return cls._remember(latitude, longitude, location_data)
+
+  @classmethod
+  async def aget_forecast_url(cls, latitude, longitude):
+    """
+    Async version of get_forecast_url.
+    """
+
+    latitude, longitude = cls._round(latitude, longitude)
+
+    forecast_url = await cls.aget_stored_url(latitude, longitude)
+
+    if forecast_url:
+      return forecast_url
+
+    client = get_async_client()
+    location_response = await client.get(client.points_url(latitude, longitude))
+    return await sync_to_async(cls._remember)(latitude, longitude, location_response.json())
+
+  @classmethod
+  def get_stored_url(cls, latitude, longitude):
+    """
+    Returns the stored forecastHourly url for a coordinate (or the closest one within the match
+    radius) without calling /points, or None.
+    """
+    latitude, longitude = cls._round(latitude, longitude)
+    return gridcells.nearest(latitude, longitude, cls._nearby(latitude, longitude))
+
+  @classmethod
+  async def aget_stored_url(cls, latitude, longitude):
+    """
+    Async version of get_stored_url.
+    """
+    latitude, longitude = cls._round(latitude, longitude)
+    return gridcells.nearest(latitude, longitude, [row async for row in cls._nearby(latitude, longitude)])
+
+  @classmethod
+  def _remember(cls, latitude, longitude, location_data):
+    """
+    Stores the forecast url from a /points response and returns it.
+    """
+
+    # api.weather.gov returns a status for invalid locations (e.g., outside of the US)
+    if 'status' in location_data:
+      return None
+
+    properties = location_data['properties']
+    cls.objects.update_or_create(
+      latitude=latitude,
+      longitude=longitude,
+      defaults={
+        "grid_id": properties.get("gridId", ""),
+        "grid_x": properties.get("gridX", 0),
+        "grid_y": properties.get("gridY", 0),
+        "forecast_hourly_url": properties["forecastHourly"],
+      })
+
+    return properties["forecastHourly"]
+
+  @classmethod
+  def forget(cls, latitude, longitude):
+    """
+    Drops the stored forecast url of a coordinate (e.g., when api.weather.gov moved the grid),
+    for every coordinate that shares it.
+    """
+    forecast_url = cls.get_stored_url(latitude, longitude)
+    cls.objects.filter(forecast_hourly_url=forecast_url).delete()
+
+  @classmethod
+  async def aforget(cls, latitude, longitude):
+    """
+    Async version of forget.
+    """
+    forecast_url = await cls.aget_stored_url(latitude, longitude)
+    await cls.objects.filter(forecast_hourly_url=forecast_url).adelete()
+
 
 class Weather(models.Model):
   """
-  This might have a lot of unecessary fields.
+  One forecast hour for a location, so forecasts survive restarts and are shared by every worker.
+  Rows are upserted each time a location's forecast is fetched, hours that have passed are kept.
   """
 
   location = models.ForeignKey(Location, on_delete=models.CASCADE)
   temperature = models.FloatField()
   humidity = models.IntegerField()  # Convert to percentage later
   wind_speed = models.FloatField()
-  temperature_description = models.CharField(max_length=100)
-  image = models.ImageField(upload_to='weather_images')
-  date = models.DateTimeField()
+  precipitation = models.IntegerField(null=True)  # chance of precipitation in percent
+  temperature_description = models.CharField(max_length=100, blank=True)
+  image = models.ImageField(upload_to='weather_images', blank=True)
+  date = models.DateTimeField()  # start of the hour
+  utc_offset = models.IntegerField(default=0)  # minutes, to show the hour in the location's time zone
+  fetched_at = models.DateTimeField(default=timezone.now)
+  # served until then, from api.weather.gov's max-age when it sent one (see _freshness)
+  fresh_until = models.DateTimeField(null=True)
+
+  class Meta:
+    # the unique constraint doubles as the index for reading a location's upcoming hours
+    constraints = [
+      models.UniqueConstraint(fields=["location", "date"], name="unique_weather_location_date")
+    ]
+
+  # the columns _format_rows needs, in order
+  FORECAST_COLUMNS = ("date", "utc_offset", "temperature", "precipitation", "humidity", "wind_speed")
+
+  # updated in place when an hour is fetched again
+  UPSERT_FIELDS = ["temperature", "humidity", "wind_speed", "precipitation", "temperature_description",
+                   "utc_offset", "fetched_at", "fresh_until"]
 
   def __str__(self):
     """
@@ -301,57 +675,293 @@ class Weather(models.Model):
   def _get_weather(latitude, longitude):
     """
     Leverages api.weather.gov, a free weather API providing forecasting services. URL: https://www.weather.gov/documentation/services-web-api
-    Gets the 3 letter station closest to the user's location (location_data), and then calls that station to get the local forecast hourly (weather_data). 
+    Gets the 3 letter station closest to the user's location (stored in Gridpoint after the first lookup), and then calls that station to get the local forecast hourly (weather_data). 
 
-    Example return of the function:
+    Returns the periods formatted as a Forecast (see _pack), from a response like (only the
+    fields we use are kept, see periods.py):
 
     "periods": [
     {
-      "number": 1,
-      "name": "",
       "startTime": "2024-02-24T18:00:00-07:00",
-      "endTime": "2024-02-24T19:00:00-07:00",
-      "isDaytime": false,
       "temperature": 54,
-      "temperatureUnit": "F",
-      "temperatureTrend": null,
       "probabilityOfPrecipitation": {
-        "unitCode": "wmoUnit:percent",
         "value": 0
       },
-      "dewpoint": {
-        "unitCode": "wmoUnit:degC",
-        "value": -11.666666666666666
-      },
       "relativeHumidity": {
-        "unitCode": "wmoUnit:percent",
         "value": 18
       },
       "windSpeed": "10 mph",
-      "windDirection": "WNW",
-      "icon": "https://api.weather.gov/icons/land/night/bkn,0?size=small",
-      "shortForecast": "Mostly Cloudy",
-      "detailedForecast": ""
+      "shortForecast": "Mostly Cloudy"
     },
     """
-    requests_cache.install_cache(
-        'weather_cache', expire_after=3600)  # Cache expires after 1 hour
-    base_url = f"https://api.weather.gov/points/{latitude},{longitude}"
-    location_response = requests.get(base_url, timeout=20) # added 20 seconds timeout
-    location_data = location_response.json()
+    return Weather._get_weather_with_url(latitude, longitude)[0]
+
+  def _get_weather_with_url(latitude, longitude):
+    """
+    Same as _get_weather, returns (weather_data, forecast url) so the caller doesn't look the
+    gridpoint up again (e.g. for Weather._freshness). The url is None for an invalid location.
+    """
+    # /points is only called the first time a coordinate is seen, see Gridpoint
+    forecast_url = Gridpoint.get_forecast_url(latitude, longitude)
 
     # If we don't get an invalid location
-    if 'status' not in location_data:
-      weather_response = requests.get(location_data['properties']['forecastHourly'], timeout=20)
-      # If the api doesn't randomly break continue
-      # This occurs when a location is valid but the server just fails for some reason
-      if weather_response.status_code == 500:
-        return None
-      weather_data = weather_response.json()
-      return weather_data["properties"][
-          "periods"]  # the actual weather forecast
+    if forecast_url:
+      # Served from the stale-while-revalidate cache when possible, see forecast_cache.py
+      return forecast_cache.forecast_cache.get(
+        forecast_url, lambda: Weather._load_periods(latitude, longitude, forecast_url)), forecast_url
     
-    return None
+    return None, None
+
+  def _load_periods(latitude, longitude, forecast_url):
+    """
+    Loads the forecast periods from api.weather.gov (as forecast_cache.Loaded), or None if they couldn't be loaded.
+    """
+    # Concurrent requests for the same gridpoint share one call, see singleflight.py
+    status_code, weather_data = singleflight.forecast_flight.do(
+      forecast_url, Weather._fetch_forecast, forecast_url,
+      recheck=lambda: Weather._recheck_forecast(forecast_url),
+      store=lambda result: Weather._share_forecast(forecast_url, result))
+
+    # The forecast moved (the grid changed), look the coordinate up again next time
+    if status_code == 404:
+      Gridpoint.forget(latitude, longitude)
+      return None
+
+    # If the api doesn't randomly break continue
+    # This occurs when a location is valid but the server just fails for some reason
+    if status_code == 500:
+      return None
+    return weather_data  # the actual weather forecast
+
+  def _recheck_forecast(forecast_url):
+    """
+    Returns what _fetch_forecast would, if another worker process loaded the forecast into the
+    shared forecast cache while this one waited for it (file or django backend, see FileLockSingleFlight).
+    Otherwise None, and the forecast is fetched.
+    """
+    fresh = forecast_cache.forecast_cache.fresh(forecast_url)
+    return None if fresh is None else (200, Loaded(*fresh))
+
+  def _share_forecast(forecast_url, result):
+    """
+    Stores what _fetch_forecast returned in the forecast cache while FileLockSingleFlight still holds
+    the lock, so a worker process waiting on it finds the forecast with _recheck_forecast.
+    """
+    status_code, weather_data = result
+
+    if status_code not in (404, 500) and weather_data is not None and weather_data.value is not None:
+      forecast_cache.forecast_cache.set(forecast_url, weather_data)
+
+  async def _aload_periods(latitude, longitude, forecast_url):
+    """
+    Async version of _load_periods.
+    """
+    status_code, weather_data = await singleflight.async_forecast_flight.do(
+      forecast_url, Weather._afetch_forecast, forecast_url)
+
+    if status_code == 404:
+      await Gridpoint.aforget(latitude, longitude)
+      return None
+
+    if status_code == 500:
+      return None
+    return weather_data
+
+  def _fetch_forecast(forecast_url):
+    """
+    Calls forecastHourly, returns the status code and the periods (None for 404 and 500).
+    Only the fields the app uses are pulled out of the body, see periods.py.
+    A forecast seen before is revalidated, see revalidation.py.
+    """
+    weather_response = get_client().get(forecast_url, headers=revalidation.conditional_headers(forecast_url))
+    return Weather._read_forecast(forecast_url, weather_response)
+
+  async def _afetch_forecast(forecast_url):
+    """
+    Async version of _fetch_forecast.
+    """
+    weather_response = await get_async_client().get(
+      forecast_url, headers=revalidation.conditional_headers(forecast_url))
+    return Weather._read_forecast(forecast_url, weather_response)
+
+  def _read_forecast(forecast_url, weather_response):
+    """
+    Returns the status code and the periods of a forecastHourly response (requests or httpx),
+    wrapped in forecast_cache.Loaded with how long api.weather.gov says they stay fresh.
+    """
+    status_code = weather_response.status_code
+
+    if status_code in (404, 500):
+      return status_code, None
+
+    max_age = revalidation.freshness_lifetime(weather_response.headers)
+
+    # Not modified, the body is empty and the periods parsed last time are still current
+    if status_code == 304:
+      return status_code, Loaded(revalidation.not_modified(forecast_url), max_age)
+
+    periods = Weather._pack(parse_periods(weather_response.content))
+    revalidation.remember(forecast_url, weather_response.headers, periods)
+    return status_code, Loaded(periods, max_age)
+
+  def _pack(periods):
+    """
+    Formats the periods once, when they are fetched, so the forecast cache keeps (and shared
+    cache backends store) the compact Forecast instead of the periods, see forecast.py.
+    A body that isn't a list of periods is kept as is.
+    """
+    if not isinstance(periods, list):
+      return periods
+    return Weather._format_response(periods, None)
+
+  async def _aget_weather(latitude, longitude):
+    """
+    Async version of _get_weather for the ASGI views, same return value.
+    """
+    return (await Weather._aget_weather_with_url(latitude, longitude))[0]
+
+  async def _aget_weather_with_url(latitude, longitude):
+    """
+    Async version of _get_weather_with_url.
+    """
+    forecast_url = await Gridpoint.aget_forecast_url(latitude, longitude)
+
+    if forecast_url:
+      return await forecast_cache.forecast_cache.aget(
+        forecast_url, lambda: Weather._aload_periods(latitude, longitude, forecast_url)), forecast_url
+
+    return None, None
+
+  def _stored_rows(saved_location):
+    """
+    Returns the stored hours from the current hour on, if they are still fresh.
+    Otherwise the queryset is empty.
+    """
+    start_of_hour = timezone.now().replace(minute=0, second=0, microsecond=0)
+
+    return Weather.objects.filter(
+      location=saved_location,
+      date__gte=start_of_hour,
+      fresh_until__gt=timezone.now(),
+    ).order_by("date").values_list(*Weather.FORECAST_COLUMNS)
+
+  def _freshness(forecast_url):
+    """
+    Returns (fetched_at, fresh_until) of the forecast in the forecast cache: when it was fetched
+    from api.weather.gov and until when it is fresh (its max-age, or the cache's soft TTL).
+    A stale forecast that is served while it refreshes isn't stored as if it were new, and
+    stored hours expire with the forecast they came from.
+    """
+    freshness = forecast_url and forecast_cache.forecast_cache.freshness(forecast_url)
+
+    if freshness is None:
+      now = timezone.now()
+      return now, now + timedelta(seconds=forecast_cache.forecast_cache.soft_ttl)
+
+    return tuple(datetime.fromtimestamp(stamp, tz=dt_timezone.utc) for stamp in freshness)
+
+  def _to_rows(saved_location, weather_data, fetched_at, fresh_until):
+    """
+    Converts api.weather.gov periods (or a Forecast packed from them) into unsaved Weather rows.
+    """
+    if isinstance(weather_data, Forecast):
+      return Weather._forecast_rows(saved_location, weather_data, fetched_at, fresh_until)
+
+    rows = []
+
+    for period in weather_data:
+      start = parse_start_time(period["startTime"])
+      rows.append(Weather(
+        location=saved_location,
+        date=start,
+        utc_offset=int(start.utcoffset().total_seconds() // 60),
+        temperature=period["temperature"],
+        precipitation=period["probabilityOfPrecipitation"]["value"],
+        humidity=period["relativeHumidity"]["value"],
+        wind_speed=parse_wind_speed(period["windSpeed"]),
+        temperature_description=period.get("shortForecast", "")[:100],
+        fetched_at=fetched_at,
+        fresh_until=fresh_until,
+      ))
+
+    return rows
+
+  def _forecast_rows(saved_location, forecast, fetched_at, fresh_until):
+    """
+    Same as _to_rows, for a Forecast. The UTC offset of each hour is the difference between
+    its local and UTC hour (api.weather.gov locations have whole hour offsets).
+    """
+    rows = []
+
+    for index, start in enumerate(forecast.starts):
+      utc_minutes = start // 60 % 1440
+      utc_offset = (forecast.hours[index] * 60 - utc_minutes + 720) % 1440 - 720
+      rows.append(Weather(
+        location=saved_location,
+        date=datetime.fromtimestamp(start, tz=dt_timezone.utc),
+        utc_offset=utc_offset,
+        temperature=forecast.temperature[index],
+        precipitation=forecast.precipitation[index],
+        humidity=forecast.humidity[index],
+        wind_speed=forecast.wind[index],
+        fetched_at=fetched_at,
+        fresh_until=fresh_until,
+      ))
+
+    return rows
+
+  def _store_periods(saved_location, weather_data, fetched_at, fresh_until):
+    """
+    Upserts the periods into the table in one query. A forecast that can't be stored is
+    still shown, it just isn't shared.
+    """
+    # already stored when it was fetched, it is stored again once the refresh lands
+    if fresh_until <= timezone.now():
+      return
+
+    try:
+      Weather.objects.bulk_create(
+        Weather._to_rows(saved_location, weather_data, fetched_at, fresh_until),
+        update_conflicts=True,
+        unique_fields=["location", "date"],
+        update_fields=Weather.UPSERT_FIELDS,
+      )
+    except Exception as e:
+      print(f"Error storing forecast, {e}")
+
+  async def _astore_periods(saved_location, weather_data, fetched_at, fresh_until):
+    """
+    Async version of _store_periods.
+    """
+    if fresh_until <= timezone.now():
+      return
+
+    try:
+      await Weather.objects.abulk_create(
+        Weather._to_rows(saved_location, weather_data, fetched_at, fresh_until),
+        update_conflicts=True,
+        unique_fields=["location", "date"],
+        update_fields=Weather.UPSERT_FIELDS,
+      )
+    except Exception as e:
+      print(f"Error storing forecast, {e}")
+
+  def _format_rows(rows, location):
+    """
+    Same as _format_response, for rows of FORECAST_COLUMNS read from the table.
+    """
+
+    forecast = Forecast(location)
+
+    for start, utc_offset, temperature, precipitation, humidity, wind_speed in rows:
+      forecast.starts.append(int(start.timestamp()))
+      forecast.hours.append((start + timedelta(minutes=utc_offset)).hour)
+      forecast.temperature.append(round(temperature))
+      forecast.precipitation.append(precipitation or 0)
+      forecast.humidity.append(humidity or 0)
+      forecast.wind.append(int(wind_speed))
+
+    return forecast
 
   def _format_response(weather_data, location):
     """
@@ -386,14 +996,16 @@ class Weather(models.Model):
         "detailedForecast": ""
       },
 
-    And converts it to:
+    Or a Forecast already formatted from it (see _pack), and converts it to a Forecast for
+    location (see forecast.py), which reads like:
 
     result = {
       "hours": [1-24],
       "temperature": [],
       "precipitation": [],
       "humidity": [],
-      "wind": []
+      "wind": [],
+      "location": ForecastLocation
     }
 
     """
@@ -401,51 +1013,80 @@ class Weather(models.Model):
     if weather_data is None:
       return {}
 
-    result = {
-      "hours": [],
-      "temperature": [], 
-      "precipitation": [],
-      "humidity": [],
-      "wind": [],
-      "location": location
-    }
+    if isinstance(weather_data, Forecast):
+      return weather_data.located(location)
+
+    forecast = Forecast(location)
 
     for period in weather_data:
-      result["hours"].append(datetime.fromisoformat(period["startTime"]).hour)
-      result["temperature"].append(period["temperature"])
-      result["precipitation"].append(period["probabilityOfPrecipitation"]["value"])
-      result["humidity"].append(period["relativeHumidity"]["value"])
-      result["wind"].append(int(period["windSpeed"].split(" ")[0]))
+      # "2024-02-24T18:00:00-07:00" is already in the location's time zone, see decoders.py
+      start = parse_start_time(period["startTime"])
+      forecast.starts.append(int(start.timestamp()))
+      forecast.hours.append(start.hour)
+      forecast.temperature.append(round(period["temperature"]))
+      forecast.precipitation.append(period["probabilityOfPrecipitation"]["value"] or 0)
+      forecast.humidity.append(period["relativeHumidity"]["value"] or 0)
+      forecast.wind.append(parse_wind_speed(period["windSpeed"]))
 
-    return result
+    return forecast
 
   @staticmethod  # similar to static methods
   def get_weather_forecast(location):
     """
     Gets the hourly forecast for the next 24 hours based on the user's location, or defaults to UCCS main campus if none provided.
+    Recently fetched forecasts are read back from the table instead of calling api.weather.gov.
     """
 
     #Maps API is Nomination OpenSource
     #https://nominatim.org
 
-    # Instantiate a new Nominatim client
-    app = Nominatim(user_agent="Weather App")
-
     location_input = "80918" if not location else location  # 80918 is UCCS main campus
     result = None
     
-    # Get location raw data from the user
-    location = app.geocode(location_input)
+    # Get location raw data from the user (cached, see Location.geocode)
+    location = Location.geocode(location_input)
     if location:
+      saved_location = Location.get_saved(location_input, location)
+
+      rows = list(Weather._stored_rows(saved_location))
+      if rows:
+        return Weather._format_rows(rows, location)
+
       latitude = location.latitude
       longitude = location.longitude
-      weather_data = Weather._get_weather(latitude, longitude)
+      weather_data, forecast_url = Weather._get_weather_with_url(latitude, longitude)
       if weather_data:
+        fetched_at, fresh_until = Weather._freshness(forecast_url)
+        Weather._store_periods(saved_location, weather_data, fetched_at, fresh_until)
         result = Weather._format_response(weather_data, location)
         return result
 
     return None
 
+  @staticmethod
+  async def aget_weather_forecast(location):
+    """
+    Async version of get_weather_forecast, used by the async views so a worker isn't blocked 
+    while waiting on Nominatim and api.weather.gov.
+    """
+
+    location_input = "80918" if not location else location  # 80918 is UCCS main campus
+
+    location = await Location.ageocode(location_input)
+    if location:
+      saved_location = await Location.aget_saved(location_input, location)
+
+      rows = [row async for row in Weather._stored_rows(saved_location)]
+      if rows:
+        return Weather._format_rows(rows, location)
+
+      weather_data, forecast_url = await Weather._aget_weather_with_url(location.latitude, location.longitude)
+      if weather_data:
+        await Weather._astore_periods(saved_location, weather_data, *Weather._freshness(forecast_url))
+        return Weather._format_response(weather_data, location)
+
+    return None
+
 class AppUser(models.Model):
   username = models.CharField(max_length=30, unique=True)
   # inventory = models.ManyToManyField(GenericClothes, related_name='users')
@@ -0,0 +1,141 @@
+"""
+Client-side rate limiting for Nominatim, whose usage policy
+(https://operations.osmfoundation.org/policies/nominatim/) allows about one request per second.
+
+Geocoding cache misses take a token from a token bucket before calling Nominatim. A caller
+that finds the bucket empty reserves the next token and waits for it, so bursts queue up in
+order instead of getting us throttled or banned. If the wait would be longer than max_wait
+(the queue is saturated), RateLimitTimeout is raised right away instead.
+
+TokenBucket is per process. FileTokenBucket keeps the bucket in a file locked with flock, so
+every worker process on the host shares one budget.
+"""
+
+import fcntl
+import struct
+import threading
+import time
+from pathlib import Path
+
+# tokens, updated (time.time) in the bucket file
+FILE_STATE = struct.Struct("<dd")
+
+
+class RateLimitTimeout(Exception):
+  """
+  Raised when a call would have to wait longer than max_wait for a token.
+  """
+
+
+class TokenBucket:
+  """
+  Thread-safe token bucket refilled with rate tokens per second, holding up to capacity.
+  Tokens go negative while callers are queued, each one waits for the token it reserved.
+  """
+
+  def __init__(self, rate=1.0, capacity=1, max_wait=5, clock=time.monotonic, sleep=time.sleep):
+    self.rate = rate
+    self.capacity = capacity
+    self.max_wait = max_wait
+    self.clock = clock
+    self.sleep = sleep
+    self._tokens = capacity
+    self._updated = clock()
+    self._lock = threading.Lock()
+    self.counters = {"acquired": 0, "waited": 0, "rejected": 0}
+
+  def _reserve(self, tokens, updated, now):
+    """
+    Takes a token from a bucket of tokens last refilled at updated, returns the new token
+    count and how long to wait for it. Raises RateLimitTimeout if that is longer than max_wait.
+    """
+    tokens = min(self.capacity, tokens + (now - updated) * self.rate)
+    wait = 0.0 if tokens >= 1 else (1 - tokens) / self.rate
+
+    if wait > self.max_wait:
+      self.counters["rejected"] += 1
+      raise RateLimitTimeout(
+        f"Too many location lookups right now, please try again in {wait:.0f} seconds.")
+
+    self.counters["acquired"] += 1
+    if wait:
+      self.counters["waited"] += 1
+    return tokens - 1, wait
+
+  def _take(self):
+    """
+    Reserves a token, returns how long to wait for it.
+    """
+    with self._lock:
+      now = self.clock()
+      self._tokens, wait = self._reserve(self._tokens, self._updated, now)
+      self._updated = now
+      return wait
+
+  def acquire(self):
+    """
+    Waits for a token (up to max_wait), raises RateLimitTimeout if the queue is longer than that.
+    Returns the seconds waited.
+    """
+    wait = self._take()
+    if wait:
+      self.sleep(wait)
+    return wait
+
+  def stats(self):
+    """
+    Returns the counters, e.g. {"acquired": 10, "waited": 4, "rejected": 1}
+    """
+    with self._lock:
+      return dict(self.counters)
+
+
+class FileTokenBucket(TokenBucket):
+  """
+  TokenBucket shared by the processes on a host. Its state lives in a small file that is
+  locked (flock) while a token is reserved, the waiting happens outside the lock.
+  """
+
+  def __init__(self, path, rate=1.0, capacity=1, max_wait=5, sleep=time.sleep):
+    super().__init__(rate=rate, capacity=capacity, max_wait=max_wait, clock=time.time, sleep=sleep)
+    self.path = Path(path)
+    self.path.parent.mkdir(parents=True, exist_ok=True)
+
+  def _take(self):
+    with open(self.path, "a+b") as bucket_file:
+      fcntl.flock(bucket_file, fcntl.LOCK_EX)
+      try:
+        bucket_file.seek(0)
+        state = bucket_file.read(FILE_STATE.size)
+        now = self.clock()
+        tokens, updated = FILE_STATE.unpack(state) if len(state) == FILE_STATE.size else (self.capacity, now)
+
+        with self._lock:
+          tokens, wait = self._reserve(tokens, updated, now)
+
+        bucket_file.seek(0)
+        bucket_file.truncate()
+        bucket_file.write(FILE_STATE.pack(tokens, now))
+        bucket_file.flush()
+        return wait
+      finally:
+        fcntl.flock(bucket_file, fcntl.LOCK_UN)
+
+
+# taken before every Nominatim call, see Location.geocode
+nominatim_bucket = TokenBucket()
+
+
+def configure(rate=1.0, capacity=1, max_wait=5, lock_file=None):
+  """
+  Replaces the Nominatim bucket, shared across processes through lock_file if given.
+  Called from WeatherAppConfig.ready.
+  """
+  global nominatim_bucket
+
+  if lock_file:
+    nominatim_bucket = FileTokenBucket(lock_file, rate=rate, capacity=capacity, max_wait=max_wait)
+  else:
+    nominatim_bucket = TokenBucket(rate=rate, capacity=capacity, max_wait=max_wait)
+
+  return nominatim_bucket
@@ -0,0 +1,290 @@
+"""
+Keeps api.weather.gov calls predictable while it is slow or failing (see client.py):
+
+* Transient failures (connection errors, timeouts, 429 and 5xx answers) are retried with full
+jitter exponential backoff (https://aws.amazon.com/blogs/architecture/exponential-backoff-and-jitter/).
+No retry starts once the call's deadline would pass, so a brownout costs a bounded time per request.
+* Optionally, a call that hasn't answered after hedge_after seconds gets a second, parallel
+attempt and whichever answers first wins (https://research.google/pubs/the-tail-at-scale/).
+* A circuit breaker opens after failure_threshold failed calls in a row. While open, calls fail
+right away with CircuitOpenError (the forecast cache then serves what it has) instead of tying
+up a worker, and after reset_timeout seconds a single trial call decides whether to close it.
+
+Only GETs go through here, so retrying and hedging is safe.
+"""
+
+import asyncio
+import random
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+import httpx
+import requests
+
+# worth another attempt, anything else (e.g. 404) is an answer
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+TRANSIENT_ERRORS = (requests.ConnectionError, requests.Timeout, httpx.TransportError)
+
+
+class CircuitOpenError(Exception):
+  """
+  Raised instead of calling api.weather.gov while the circuit breaker is open.
+  """
+
+
+class CircuitBreaker:
+  """
+  Thread-safe circuit breaker: closed -> open after failure_threshold failures in a row,
+  open -> half open after reset_timeout seconds, half open -> closed (or open again) after one trial call.
+  """
+
+  CLOSED, OPEN, HALF_OPEN = "closed", "open", "half open"
+
+  def __init__(self, failure_threshold=5, reset_timeout=30, clock=time.monotonic):
+    self.failure_threshold = failure_threshold
+    self.reset_timeout = reset_timeout
+    self.clock = clock
+    self.state = self.CLOSED
+    self.failures = 0
+    self._opened_at = None
+    self._lock = threading.Lock()
+
+  def allow(self):
+    """
+    Returns whether a call may go out. In half open state only the trial call may.
+    """
+    with self._lock:
+      if self.state == self.CLOSED:
+        return True
+
+      if self.state == self.OPEN and self.clock() - self._opened_at >= self.reset_timeout:
+        self.state = self.HALF_OPEN
+        return True
+
+      return False
+
+  def record_success(self):
+    with self._lock:
+      self.state = self.CLOSED
+      self.failures = 0
+
+  def record_failure(self):
+    with self._lock:
+      self.failures += 1
+      if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+        self.state = self.OPEN
+        self._opened_at = self.clock()
+
+  def record_abandoned(self):
+    """
+    A call ended without an outcome (e.g. it was cancelled). If it was the trial call, the breaker
+    opens again so another trial goes out after reset_timeout, instead of staying half open for good.
+    """
+    with self._lock:
+      if self.state == self.HALF_OPEN:
+        self.state = self.OPEN
+        self._opened_at = self.clock()
+
+
+class Resilience:
+  """
+  Wraps a send() callable (returning a requests or httpx response) with retries, hedging and
+  a circuit breaker. attempts=1, hedge_after=None and breaker=None turn each of them off.
+  """
+
+  _executor = None
+  _executor_lock = threading.Lock()
+
+  def __init__(self, attempts=3, backoff=0.2, max_backoff=2.0, deadline=20, hedge_after=None,
+               breaker=None, clock=time.monotonic, sleep=time.sleep):
+    self.attempts = attempts
+    self.backoff = backoff
+    self.max_backoff = max_backoff
+    self.deadline = deadline
+    self.hedge_after = hedge_after
+    self.breaker = breaker
+    self.clock = clock
+    self.sleep = sleep
+    self.counters = {"calls": 0, "retries": 0, "hedges": 0, "short_circuits": 0}
+    self._lock = threading.Lock()
+
+  def _count(self, counter):
+    with self._lock:
+      self.counters[counter] += 1
+
+  def _delay(self, attempt, response):
+    """
+    Seconds to wait before the next attempt: Retry-After when upstream sent one, otherwise a
+    random time up to the exponential backoff.
+    """
+    retry_after = response is not None and response.headers.get("Retry-After")
+
+    if retry_after and retry_after.isdigit():
+      return min(float(retry_after), self.max_backoff)
+
+    return random.uniform(0, min(self.max_backoff, self.backoff * 2 ** attempt))
+
+  def _start(self):
+    if self.breaker is not None and not self.breaker.allow():
+      self._count("short_circuits")
+      raise CircuitOpenError("api.weather.gov is failing, not calling it for now.")
+    self._count("calls")
+    return self.clock()
+
+  def _finish(self, response, error):
+    """
+    Records the outcome of the call with the breaker, then returns the response or raises.
+    """
+    failed = response is None or response.status_code in RETRY_STATUSES
+
+    if self.breaker is not None:
+      if failed:
+        self.breaker.record_failure()
+      else:
+        self.breaker.record_success()
+
+    if response is None:
+      raise error
+    return response
+
+  def _abandon(self):
+    if self.breaker is not None:
+      self.breaker.record_abandoned()
+
+  def _next_delay(self, attempt, started, response):
+    """
+    Returns how long to wait before retrying, or None if there is no attempt (or time) left.
+    """
+    if attempt + 1 >= self.attempts:
+      return None
+
+    delay = self._delay(attempt, response)
+    if self.deadline is not None and self.clock() + delay - started >= self.deadline:
+      return None
+
+    self._count("retries")
+    return delay
+
+  def call(self, send):
+    """
+    Calls send() until it answers, returning the last response (even a 5xx) or raising the
+    last error. Only transient errors are retried.
+    """
+    started = self._start()
+
+    try:
+      for attempt in range(self.attempts):
+        response, error = None, None
+        try:
+          response = self._hedged(send)
+        except Exception as e:
+          error = e
+          if not isinstance(e, TRANSIENT_ERRORS):
+            break
+
+        if response is not None and response.status_code not in RETRY_STATUSES:
+          break
+
+        delay = self._next_delay(attempt, started, response)
+        if delay is None:
+          break
+        self.sleep(delay)
+    except BaseException:
+      self._abandon()
+      raise
+
+    return self._finish(response, error)
+
+  async def acall(self, send):
+    """
+    Async version of call, send is a coroutine function.
+    """
+    started = self._start()
+
+    try:
+      for attempt in range(self.attempts):
+        response, error = None, None
+        try:
+          response = await self._ahedged(send)
+        except Exception as e:
+          error = e
+          if not isinstance(e, TRANSIENT_ERRORS):
+            break
+
+        if response is not None and response.status_code not in RETRY_STATUSES:
+          break
+
+        delay = self._next_delay(attempt, started, response)
+        if delay is None:
+          break
+        await asyncio.sleep(delay)
+    except BaseException:
+      # cancelled (CancelledError is a BaseException) or interrupted, _finish is never reached
+      self._abandon()
+      raise
+
+    return self._finish(response, error)
+
+  @classmethod
+  def _pool(cls):
+    """
+    Threads for hedged calls, shared by every client.
+    """
+    if cls._executor is None:
+      with cls._executor_lock:
+        if cls._executor is None:
+          cls._executor = ThreadPoolExecutor(max_workers=32, thread_name_prefix="hedge")
+    return cls._executor
+
+  def _hedged(self, send):
+    """
+    Calls send(), and again in parallel if the first call takes longer than hedge_after.
+    The first successful answer wins, the slower call is left to finish on its own.
+    """
+    if self.hedge_after is None:
+      return send()
+
+    first = self._pool().submit(send)
+    done, _ = wait([first], timeout=self.hedge_after)
+    if done:
+      return first.result()
+
+    self._count("hedges")
+    pending = {first, self._pool().submit(send)}
+    error = None
+
+    while pending:
+      done, pending = wait(pending, return_when=FIRST_COMPLETED)
+      for future in done:
+        if future.exception() is None:
+          return future.result()
+        error = future.exception()
+
+    raise error
+
+  async def _ahedged(self, send):
+    """
+    Async version of _hedged, the slower call is cancelled.
+    """
+    if self.hedge_after is None:
+      return await send()
+
+    first = asyncio.ensure_future(send())
+    done, _ = await asyncio.wait({first}, timeout=self.hedge_after)
+    if done:
+      return first.result()
+
+    self._count("hedges")
+    pending = {first, asyncio.ensure_future(send())}
+    error = None
+
+    while pending:
+      done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+      for task in done:
+        if task.exception() is None:
+          for other in pending:
+            other.cancel()
+          return task.result()
+        error = task.exception()
+
+    raise error
@@ -0,0 +1,97 @@
+"""
+HTTP caching rules for the forecast fetch (https://www.rfc-editor.org/rfc/rfc9111).
+
+* api.weather.gov says how long a forecast stays fresh (Cache-Control max-age / s-maxage, or
+Expires), which is used as the forecast's soft TTL instead of a fixed one.
+* The ETag / Last-Modified of each forecast is remembered, so a refresh asks
+"changed since?" (If-None-Match / If-Modified-Since). A 304 answer has no body, the periods
+parsed last time are reused and only their TTL is renewed.
+"""
+
+import re
+from email.utils import parsedate_to_datetime
+from typing import NamedTuple
+from .cache_backends import LocMemBackend
+
+# s-maxage is for shared caches like ours and wins over max-age
+MAX_AGE = re.compile(r"(?:^|,)\s*(s-maxage|max-age)\s*=\s*\"?(\d+)\"?", re.IGNORECASE)
+NO_CACHE = re.compile(r"(?:^|,)\s*(no-cache|no-store)\b", re.IGNORECASE)
+
+
+class Validated(NamedTuple):
+  """
+  What is needed to revalidate a forecast, and the periods to reuse when it hasn't changed.
+  """
+  etag: str
+  last_modified: str
+  value: object
+
+
+def _http_date(text):
+  try:
+    return parsedate_to_datetime(text)
+  except (TypeError, ValueError):
+    return None
+
+
+def freshness_lifetime(headers):
+  """
+  Returns for how many seconds a response is fresh, or None if the headers don't say.
+  """
+  cache_control = headers.get("Cache-Control") or ""
+
+  if NO_CACHE.search(cache_control):
+    return 0
+
+  max_ages = dict((name.lower(), int(seconds)) for name, seconds in MAX_AGE.findall(cache_control))
+  if max_ages:
+    return max_ages.get("s-maxage", max_ages.get("max-age"))
+
+  expires = _http_date(headers.get("Expires"))
+  if expires is None:
+    return None
+
+  date = _http_date(headers.get("Date"))
+  if date is None:
+    return None
+
+  return max(0, (expires - date).total_seconds())
+
+
+# forecast url -> Validated
+validators = LocMemBackend(maxsize=1024)
+
+
+def conditional_headers(url):
+  """
+  Returns the If-None-Match / If-Modified-Since headers for url, empty if it was never seen.
+  """
+  validated = validators.get(url, None)
+  headers = {}
+
+  if validated is not None:
+    if validated.etag:
+      headers["If-None-Match"] = validated.etag
+    if validated.last_modified:
+      headers["If-Modified-Since"] = validated.last_modified
+
+  return headers
+
+
+def remember(url, headers, value):
+  """
+  Keeps the validators of a 200 response along with its parsed value.
+  """
+  etag = headers.get("ETag")
+  last_modified = headers.get("Last-Modified")
+
+  if etag or last_modified:
+    validators.set(url, Validated(etag, last_modified, value))
+
+
+def not_modified(url):
+  """
+  Returns the value to reuse for a 304 response, or None if it has been forgotten since.
+  """
+  validated = validators.get(url, None)
+  return None if validated is None else validated.value
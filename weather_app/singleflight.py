@@ -0,0 +1,209 @@
+"""
+Single-flight request coalescing (the idea comes from Go's golang.org/x/sync/singleflight).
+
+When a popular forecast expires, every request for it would otherwise call api.weather.gov at
+the same time. Here concurrent callers with the same key (the gridpoint's forecast url) share
+one in-flight call and all get its result.
+"""
+
+import asyncio
+import fcntl
+import hashlib
+import threading
+import time
+from pathlib import Path
+
+
+class _Call:
+  """
+  One in-flight call, waited on by the callers that joined it.
+  """
+
+  def __init__(self):
+    self.done = threading.Event()
+    self.result = None
+    self.error = None
+
+
+class SingleFlight:
+  """
+  Coalesces concurrent calls with the same key within a process.
+  * executed: calls that actually ran
+  * coalesced: callers that got the result of someone else's call instead
+  """
+
+  def __init__(self):
+    self._calls = {}
+    self._lock = threading.Lock()
+    self.executed = 0
+    self.coalesced = 0
+
+  def do(self, key, fn, *args, recheck=None, store=None, **kwargs):
+    """
+    Runs fn(*args, **kwargs) unless a call for key is already in flight, in which case this waits
+    for it and returns (or raises) the same thing.
+    recheck and store are only used by FileLockSingleFlight, within a process waiting callers share the result.
+    """
+
+    with self._lock:
+      call = self._calls.get(key)
+      leader = call is None
+
+      if leader:
+        call = self._calls[key] = _Call()
+        self.executed += 1
+      else:
+        self.coalesced += 1
+
+    if not leader:
+      call.done.wait()
+      if call.error is not None:
+        raise call.error
+      return call.result
+
+    try:
+      call.result = self._run(key, fn, recheck, store, *args, **kwargs)
+      return call.result
+    except Exception as e:
+      call.error = e
+      raise
+    finally:
+      with self._lock:
+        del self._calls[key]
+      call.done.set()
+
+  def _run(self, key, fn, recheck, store, *args, **kwargs):
+    """
+    Runs the leader's call, overridden by FileLockSingleFlight.
+    """
+    return fn(*args, **kwargs)
+
+  def stats(self):
+    """
+    Returns the counters, e.g. {"executed": 1, "coalesced": 9, "in_flight": 0}
+    """
+    with self._lock:
+      return {"executed": self.executed, "coalesced": self.coalesced, "in_flight": len(self._calls)}
+
+
+class FileLockSingleFlight(SingleFlight):
+  """
+  Also coalesces across worker processes (e.g. gunicorn workers) using a lock file per key.
+
+  Within a process calls are coalesced like SingleFlight. Across processes, the process holding
+  the lock calls recheck first, which should look in a cache shared by the processes. If recheck
+  returns something other than None, that is returned instead of calling fn. Otherwise fn runs and
+  store(result) writes it to the shared cache, both before the lock is released, so the next
+  process to take the lock always finds it (even one that missed the cache just before).
+  """
+
+  def __init__(self, directory, timeout=30):
+    super().__init__()
+    self.directory = Path(directory)
+    self.directory.mkdir(parents=True, exist_ok=True)
+    self.timeout = timeout
+
+  def _run(self, key, fn, recheck, store, *args, **kwargs):
+    """
+    Runs fn and store while holding the lock file for key, unless recheck finds the result.
+    """
+
+    lock_path = self.directory / f"{hashlib.sha1(str(key).encode()).hexdigest()}.lock"
+
+    with open(lock_path, "a") as lock_file:
+      if not self._try_lock(lock_file):
+        self._wait_for_lock(lock_file)
+
+      try:
+        if recheck is not None:
+          result = recheck()
+          if result is not None:
+            with self._lock:
+              self.coalesced += 1
+            return result
+
+        result = fn(*args, **kwargs)
+        if store is not None:
+          store(result)
+        return result
+      finally:
+        fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+  @staticmethod
+  def _try_lock(lock_file):
+    """
+    Takes the lock without waiting, returns False if another process has it.
+    """
+    try:
+      fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+      return True
+    except BlockingIOError:
+      return False
+
+  def _wait_for_lock(self, lock_file):
+    """
+    Polls for the lock until timeout, then gives up waiting and raises TimeoutError.
+    """
+    deadline = time.monotonic() + self.timeout
+
+    while not self._try_lock(lock_file):
+      if time.monotonic() > deadline:
+        raise TimeoutError(f"Gave up waiting for {lock_file.name} after {self.timeout} seconds")
+      time.sleep(0.05)
+
+
+class AsyncSingleFlight:
+  """
+  SingleFlight for coroutines, callers on the same event loop share one task.
+  """
+
+  def __init__(self):
+    self._calls = {}
+    self.executed = 0
+    self.coalesced = 0
+
+  async def do(self, key, fn, *args, **kwargs):
+    """
+    Awaits fn(*args, **kwargs) unless a call for key is already in flight on this loop.
+    """
+    call_key = (asyncio.get_running_loop(), key)
+    task = self._calls.get(call_key)
+
+    if task is not None:
+      self.coalesced += 1
+      return await asyncio.shield(task)
+
+    self.executed += 1
+    task = self._calls[call_key] = asyncio.ensure_future(fn(*args, **kwargs))
+
+    try:
+      # shield so a cancelled leader doesn't cancel the call for the others
+      return await asyncio.shield(task)
+    finally:
+      if self._calls.get(call_key) is task:
+        del self._calls[call_key]
+
+  def stats(self):
+    """
+    Returns the counters, see SingleFlight.stats.
+    """
+    return {"executed": self.executed, "coalesced": self.coalesced, "in_flight": len(self._calls)}
+
+
+# keyed by forecast url, see Weather._get_weather
+forecast_flight = SingleFlight()
+async_forecast_flight = AsyncSingleFlight()
+
+
+def configure(lock_directory=None, timeout=30):
+  """
+  Picks the in-process or the cross-process variant, called from WeatherAppConfig.ready.
+  """
+  global forecast_flight
+
+  if lock_directory:
+    forecast_flight = FileLockSingleFlight(lock_directory, timeout=timeout)
+  else:
+    forecast_flight = SingleFlight()
+
+  return forecast_flight
@@ -0,0 +1,202 @@
+"""
+Stand-in for api.weather.gov and Nominatim, so load tests and benchmarks of the full stack
+(views, caches, clients) need no network. Served by `python manage.py weather_stub_server`.
+
+* /points/{latitude},{longitude}, forecastHourly and Nominatim's /search answer like the real
+APIs. Answers come from recorded fixtures when there is one for the path, and are made up
+otherwise (every coordinate gets a 2.5 km grid cell, every query a place in the US).
+* In record mode, paths without a fixture are fetched from the real APIs and saved as fixtures,
+with the api.weather.gov urls in them pointed at the stub.
+* latency and error_rate slow down and fail (503) a share of the answers.
+
+Fixtures are a JSON file of path -> {"status": 200, "headers": {...}, "body": ...}.
+"""
+
+import hashlib
+import json
+import random
+import re
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from urllib.parse import parse_qs, urlsplit
+import requests
+
+WEATHER_API_URL = "https://api.weather.gov"
+NOMINATIM_URL = "https://nominatim.openstreetmap.org"
+
+POINTS = re.compile(r"^/points/(-?\d+(?:\.\d+)?),(-?\d+(?:\.\d+)?)$")
+FORECAST = re.compile(r"^/gridpoints/\w+/-?\d+,-?\d+/forecast/hourly$")
+
+WIND_SPEEDS = ["10 mph", "5 to 10 mph", "Calm", "15 km/h", "12 kt"]
+
+# degrees, about a 2.5 km forecast grid cell
+GRID_CELL = 0.0225
+
+
+def forecast_body(periods, start=None):
+  """
+  Builds a forecastHourly body with the given number of periods, from start (an aware datetime).
+  """
+  start = start or datetime(2024, 2, 24, 18, tzinfo=timezone(timedelta(hours=-7)))
+
+  return json.dumps({"properties": {"periods": [
+    {
+      "number": number + 1,
+      "name": "",
+      "startTime": (start + timedelta(hours=number)).isoformat(),
+      "endTime": (start + timedelta(hours=number + 1)).isoformat(),
+      "isDaytime": 6 <= (start.hour + number) % 24 < 18,
+      "temperature": 30 + number % 40,
+      "temperatureUnit": "F",
+      "temperatureTrend": None,
+      "probabilityOfPrecipitation": {"unitCode": "wmoUnit:percent", "value": number % 100},
+      "dewpoint": {"unitCode": "wmoUnit:degC", "value": -11.666666666666666},
+      "relativeHumidity": {"unitCode": "wmoUnit:percent", "value": 20 + number % 60},
+      "windSpeed": WIND_SPEEDS[number % len(WIND_SPEEDS)],
+      "windDirection": "WNW",
+      "icon": "https://api.weather.gov/icons/land/night/bkn,0?size=small",
+      "shortForecast": "Mostly Cloudy",
+      "detailedForecast": "",
+    }
+    for number in range(periods)
+  ]}}, indent=4).encode()
+
+
+class StubUpstream:
+  """
+  Answers requests for api.weather.gov and Nominatim paths, see the module docstring.
+  """
+
+  def __init__(self, base_url, fixtures_path=None, record=False, latency=0.0, error_rate=0.0, periods=156):
+    self.base_url = base_url.rstrip("/")
+    self.fixtures_path = Path(fixtures_path) if fixtures_path else None
+    self.record = record
+    self.latency = latency
+    self.error_rate = error_rate
+    self.periods = periods
+    self.fixtures = {}
+    self.counters = {"fixtures": 0, "made_up": 0, "recorded": 0, "errors": 0}
+    self._lock = threading.Lock()
+
+    if self.fixtures_path and self.fixtures_path.exists():
+      self.fixtures = json.loads(self.fixtures_path.read_text(encoding="utf-8"))
+
+  def _count(self, counter):
+    with self._lock:
+      self.counters[counter] += 1
+
+  def answer(self, path):
+    """
+    Returns (status, body bytes, headers) for a path with its query string.
+    """
+    if self.latency:
+      time.sleep(self.latency)
+
+    if self.error_rate and random.random() < self.error_rate:
+      self._count("errors")
+      return 503, json.dumps({"status": 503, "title": "Service Unavailable"}).encode(), {}
+
+    fixture = self.fixtures.get(path)
+
+    if fixture is None and self.record:
+      fixture = self._record(path)
+
+    if fixture is not None:
+      self._count("fixtures")
+      body = fixture["body"]
+      body = body.encode() if isinstance(body, str) else json.dumps(body).encode()
+      return fixture["status"], body, fixture.get("headers", {})
+
+    self._count("made_up")
+    return self._make_up(path)
+
+  def _make_up(self, path):
+    """
+    Makes up an answer in the real APIs' shape.
+    """
+    parts = urlsplit(path)
+    points = POINTS.match(parts.path)
+
+    if points:
+      latitude, longitude = float(points.group(1)), float(points.group(2))
+      grid_x, grid_y = int(longitude // GRID_CELL), int(latitude // GRID_CELL)
+      return 200, json.dumps({"properties": {
+        "gridId": "STB",
+        "gridX": grid_x,
+        "gridY": grid_y,
+        "forecastHourly": f"{self.base_url}/gridpoints/STB/{grid_x},{grid_y}/forecast/hourly",
+      }}).encode(), {}
+
+    if FORECAST.match(parts.path):
+      mountain = timezone(timedelta(hours=-7))
+      start = datetime.now(mountain).replace(minute=0, second=0, microsecond=0)
+      return 200, forecast_body(self.periods, start), {"Cache-Control": "public, max-age=900"}
+
+    if parts.path == "/search":
+      query = parse_qs(parts.query).get("q", [""])[0]
+      # somewhere in the contiguous US, the same place for the same query
+      digest = hashlib.sha1(query.casefold().encode()).digest()
+      latitude = 30 + digest[0] / 255 * 15
+      longitude = -120 + digest[1] / 255 * 40
+      return 200, json.dumps([{
+        "lat": f"{latitude:.7f}",
+        "lon": f"{longitude:.7f}",
+        "display_name": f"{query.title()}, United States",
+      }]).encode(), {}
+
+    return 404, json.dumps({"status": 404, "title": "Not Found"}).encode(), {}
+
+  def _record(self, path):
+    """
+    Fetches path from the real API, saves it as a fixture and returns it.
+    """
+    upstream = NOMINATIM_URL if path.startswith("/search") else WEATHER_API_URL
+    response = requests.get(upstream + path, headers={"User-Agent": "Weather App"}, timeout=20)
+
+    headers = {name: response.headers[name] for name in ("Cache-Control", "ETag", "Last-Modified", "Expires")
+               if name in response.headers}
+    fixture = {
+      "status": response.status_code,
+      "headers": headers,
+      # the forecast urls in /points answers have to lead back to the stub
+      "body": response.text.replace(WEATHER_API_URL, self.base_url),
+    }
+
+    with self._lock:
+      self.fixtures[path] = fixture
+      self.counters["recorded"] += 1
+      if self.fixtures_path:
+        self.fixtures_path.write_text(json.dumps(self.fixtures, indent=2), encoding="utf-8")
+
+    return fixture
+
+
+def make_server(upstream, host="127.0.0.1", port=8001):
+  """
+  Returns a threaded HTTP server answering from upstream (a StubUpstream), not started yet.
+  """
+
+  class Handler(BaseHTTPRequestHandler):
+    # keep-alive, like the real APIs, so the clients' connection pools are exercised
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+      status, body, headers = upstream.answer(self.path)
+      self.send_response(status)
+      self.send_header("Content-Type", "application/json")
+      self.send_header("Content-Length", str(len(body)))
+      for name, value in headers.items():
+        self.send_header(name, value)
+      self.end_headers()
+      self.wfile.write(body)
+
+    def log_message(self, format, *args):
+      # one line per request would slow down a load test
+      pass
+
+  server = ThreadingHTTPServer((host, port), Handler)
+  server.daemon_threads = True
+  return server
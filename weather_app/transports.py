@@ -0,0 +1,106 @@
+"""
+Transports (requests adapters) that can be mounted on the ForecastClient in place of
+the network. See https://requests.readthedocs.io/en/latest/user/advanced/#transport-adapters
+"""
+
+import io
+import json
+import threading
+import httpx
+from requests import Response
+from requests.adapters import BaseAdapter
+from urllib3 import HTTPResponse
+
+
+class LocalTransport(BaseAdapter):
+  """
+  Answers requests from a dictionary of url -> reply instead of the network.
+
+  A reply can be:
+  * a dict / list, returned as a 200 JSON response
+  * a (status_code, body) or (status_code, body, headers) tuple
+  * an exception instance, which is raised (e.g. ConnectTimeout)
+  * a callable taking the request (PreparedRequest, or httpx.Request from as_httpx) and returning one of the above
+
+  Every url requested is recorded in calls, in order. as_httpx() serves the same routes
+  to the async client.
+  """
+
+  def __init__(self, routes=None):
+    super().__init__()
+    self.routes = dict(routes or {})
+    self.calls = []
+    self._lock = threading.Lock()
+
+  def _reply(self, url, request):
+    """
+    Records the call and returns (status_code, body, headers) for url, raising exception replies.
+    """
+    with self._lock:
+      self.calls.append(url)
+
+    reply = self.routes.get(url)
+
+    if callable(reply):
+      reply = reply(request)
+
+    if isinstance(reply, Exception):
+      raise reply
+
+    if reply is None:
+      reply = (404, {"status": 404, "title": "Not Found"})
+
+    if not isinstance(reply, tuple):
+      reply = (200, reply)
+
+    return reply if len(reply) == 3 else (*reply, {})
+
+  def send(self, request, stream=False, timeout=None, verify=True, cert=None,
+           proxies=None):
+    """
+    Builds the response for request.url from the routes.
+    """
+    status_code, body, headers = self._reply(request.url, request)
+    return build_response(request, status_code, body, headers)
+
+  def as_httpx(self):
+    """
+    Returns an httpx transport answering from the same routes (and recording into the same calls).
+    """
+
+    def handler(request):
+      status_code, body, headers = self._reply(str(request.url), request)
+      if isinstance(body, (bytes, str)):
+        return httpx.Response(status_code, content=body, headers=headers)
+      return httpx.Response(status_code, json=body, headers=headers)
+
+    return httpx.MockTransport(handler)
+
+  def close(self):
+    """
+    Nothing to close, no sockets are opened.
+    """
+
+
+def build_response(request, status_code, body, headers=None):
+  """
+  Builds a requests Response holding body (bytes, str or anything JSON serializable).
+  """
+  headers = dict(headers or {})
+
+  if isinstance(body, str):
+    body = body.encode("utf-8")
+  elif not isinstance(body, bytes):
+    body = json.dumps(body).encode("utf-8")
+    headers.setdefault("Content-Type", "application/geo+json")
+
+  response = Response()
+  response.status_code = status_code
+  response.url = request.url
+  response.request = request
+  response.headers.update(headers)
+  response.encoding = "utf-8"
+  # the body is read lazily from raw, like a real response
+  response.raw = HTTPResponse(body=io.BytesIO(body), headers=headers, status=status_code,
+                              preload_content=False, request_url=request.url)
+  return response
@@ -20,19 +20,25 @@ from django.conf.urls.static import static
 from django.contrib import admin
 from django.urls import path, include
 from .views import WeatherView, TemperatureView, GenericClothesListView, RegisterUser, recommendation_reroll
+from .views import AsyncWeatherView, AsyncTemperatureView
 from . import views
 
+# The async views only help when served by ASGI (django_project/asgi.py), see WEATHER_ASYNC_VIEWS
+ASYNC_VIEWS = getattr(settings, 'WEATHER_ASYNC_VIEWS', False)
+HomeView = AsyncWeatherView if ASYNC_VIEWS else WeatherView
+RecommendationView = AsyncTemperatureView if ASYNC_VIEWS else TemperatureView
+
 urlpatterns = [
     path('admin/', admin.site.urls),
     # The home page url assumes location is passed in the request
-    path('', WeatherView.as_view(), name='home'),
-    path('recommendation/', TemperatureView.as_view(), name='recommendation'),
+    path('', HomeView.as_view(), name='home'),
+    path('recommendation/', RecommendationView.as_view(), name='recommendation'),
     path('inventory/', GenericClothesListView.as_view(), name='inventory'),
     path('inventory/add_item', views.add_item, name='add_item'),
     path('inventory/delete_item/<int:id>', views.delete_item, name='delete_item'),
     path('recommendation/reroll/', recommendation_reroll, name='reroll'),
     #user auth paths
-    path('accounts/profile/', WeatherView.as_view(), name='profile'),
+    path('accounts/profile/', HomeView.as_view(), name='profile'),
     path('accounts/', include('django.contrib.auth.urls')),
     path('accounts/register/', RegisterUser.as_view(), name = 'register')
 ] + static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
@@ -1,7 +1,26 @@
 """
 Utility functions for calculating generic weather information.
+
+The calculate_*s functions take whole forecast columns (lists, arrays, Forecast columns) and return an
+array of floats, one pass per column. Each value is exactly what the scalar function returns for that hour.
 """
 
+from array import array
+
+def _heat_index(temperature, humidity):
+  """
+  The heat index polynomial, shared by calculate_heat_index and the column functions.
+  """
+  return -42.379 + 2.04901523 * temperature + 10.14333127 * humidity - 0.22475541 * temperature * humidity - 0.00683783 * temperature * temperature - 0.05481717 * humidity * humidity + 0.00122874 * temperature * temperature * humidity + 0.00085282 * temperature * humidity * humidity - 0.00000199 * temperature * temperature * humidity * humidity
+
+
+def _windchill(temperature, power):
+  """
+  The wind chill formula, power is the wind speed to the 0.16 (see calculate_windchill).
+  """
+  return 35.74 + 0.6215 * temperature - 35.75 * power + 0.4275 * temperature * power
+
+
 def calculate_heat_index(temperature, humidity):
   """
   Calculates the heat index.
@@ -13,7 +32,7 @@ def calculate_heat_index(temperature, humidity):
   if humidity < 0:
     raise ValueError("Humidity must be greater than or equal to 0.")
   
-  return -42.379 + 2.04901523 * temperature + 10.14333127 * humidity - 0.22475541 * temperature * humidity - 0.00683783 * temperature * temperature - 0.05481717 * humidity * humidity + 0.00122874 * temperature * temperature * humidity + 0.00085282 * temperature * humidity * humidity - 0.00000199 * temperature * temperature * humidity * humidity
+  return _heat_index(temperature, humidity)
 
 
 def calculate_windchill(temperature, wind_speed):
@@ -27,8 +46,68 @@ def calculate_windchill(temperature, wind_speed):
   if wind_speed < 0:
     raise ValueError("Wind speed must be greater than or equal to 0.")
   
-  return 35.74 + 0.6215 * temperature - 35.75 * (
-    wind_speed**0.16) + 0.4275 * temperature * (wind_speed**0.16)
+  return _windchill(temperature, wind_speed**0.16)
+
+
+def _check_lengths(*columns):
+  if len({len(column) for column in columns}) > 1:
+    raise ValueError("Every column must have a value per hour.")
+
+
+def calculate_heat_indexes(temperatures, humidities):
+  """
+  calculate_heat_index for every hour.
+  * Every humidity must be >= 0
+  """
+
+  _check_lengths(temperatures, humidities)
+
+  if any(humidity < 0 for humidity in humidities):
+    raise ValueError("Humidity must be greater than or equal to 0.")
+
+  return array('d', [_heat_index(temperature, humidity) for temperature, humidity in zip(temperatures, humidities)])
+
+
+def calculate_windchills(temperatures, wind_speeds):
+  """
+  calculate_windchill for every hour.
+  * Every wind speed must be >= 0
+  """
+
+  _check_lengths(temperatures, wind_speeds)
+
+  if any(wind_speed < 0 for wind_speed in wind_speeds):
+    raise ValueError("Wind speed must be greater than or equal to 0.")
+
+  # a forecast only has a handful of distinct wind speeds
+  powers = {wind_speed: wind_speed**0.16 for wind_speed in set(wind_speeds)}
+
+  return array('d', [
+    _windchill(temperature, powers[wind_speed]) for temperature, wind_speed in zip(temperatures, wind_speeds)
+  ])
+
+
+def calculate_feels_like(temperatures, humidities, wind_speeds):
+  """
+  The heat index for the hours above 75F and the wind chill for the others, for every hour 
+  (the feels-like temperature GenericClothes._calculate_comfort starts from).
+  * Like the scalar functions, only the humidity of the hot hours and the wind speed of the others are checked
+  """
+
+  _check_lengths(temperatures, humidities, wind_speeds)
+
+  if any(humidity < 0 for temperature, humidity in zip(temperatures, humidities) if temperature > 75):
+    raise ValueError("Humidity must be greater than or equal to 0.")
+
+  if any(wind_speed < 0 for temperature, wind_speed in zip(temperatures, wind_speeds) if temperature <= 75):
+    raise ValueError("Wind speed must be greater than or equal to 0.")
+
+  powers = {wind_speed: wind_speed**0.16 for wind_speed in set(wind_speeds) if wind_speed >= 0}
+
+  return array('d', [
+    _heat_index(temperature, humidity) if temperature > 75 else _windchill(temperature, powers[wind_speed])
+    for temperature, humidity, wind_speed in zip(temperatures, humidities, wind_speeds)
+  ])
 
 
 def get_xth_hour_weather(hour, weather_data):
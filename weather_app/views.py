@@ -7,6 +7,8 @@ for documentation.
 # import boto3
 # from datetime import datetime
 from itertools import zip_longest
+from asgiref.sync import sync_to_async
+from geopy.exc import GeocoderTimedOut, GeocoderUnavailable
 from rest_framework import status
 #from dotenv import load_dotenv
 from django.contrib.auth.forms import UserCreationForm
@@ -20,7 +22,9 @@ from django.http import JsonResponse
 from .models import Weather, GenericClothes, AppUser
 from .forms import CreateUserForm, AddForm
 from .decorators import allowed_users
-from .utils import get_xth_hour_weather
+from .forecast import Forecast
+from .ratelimit import RateLimitTimeout
+from .resilience import CircuitOpenError, TRANSIENT_ERRORS
 
 # Load environment variables from .env file
 # load_dotenv()
@@ -48,6 +52,45 @@ def recommendation_reroll(request):
 
   return JsonResponse({"error": "Missing parameters"}, status=status.HTTP_400_BAD_REQUEST)
 
+def _recommendation_context(weather_data, tolerance_offset, working_offset, color_selected):
+  """
+  Builds the recommendation page context from a forecast (shared by TemperatureView and AsyncTemperatureView).
+  """
+
+  context = {}
+
+  # All of this is formatting the weather data to be calculated in the comfort, 
+  # which then gets the outfits, which then is rendered.
+  # Really no business logic is here, except getting the data in the proper form.
+  
+  current_recommendation, next_recommendation, final_recommendation = GenericClothes.get_outfit_recommendations(
+    weather_data, [0, 24, 48], tolerance_offset, working_offset)
+
+  context["waterproofing_current"] = current_recommendation['waterproofness']
+  context["waterproofing_six_hours"] = next_recommendation['waterproofness']
+  context["waterproofing_twelve_hours"] = final_recommendation['waterproofness']
+
+  context["comfort_current"] = round(current_recommendation['comfort'], 2)
+  context["comfort_six_hours"] = round(next_recommendation['comfort'], 2)
+  context["comfort_twelve_hours"] = round(final_recommendation['comfort'], 2)
+
+  context["outfit"] = list(zip(current_recommendation['outfit'], next_recommendation['outfit'], final_recommendation['outfit']))
+
+  context["rain_outfit"] = list(
+    zip_longest(
+      current_recommendation['precipitation_outfit'], 
+      next_recommendation['precipitation_outfit'], 
+      final_recommendation['precipitation_outfit'], 
+      fillvalue="Missing..."
+    )
+  )
+
+  if color_selected:
+    context["colors_current"] = current_recommendation['colors']
+
+  return context
+
+
 class TemperatureView(View):
   """
   Class to manage the connection to the temperature recommendation service.
@@ -81,49 +124,54 @@ class TemperatureView(View):
             template_name='weather_app/recommendation.html',
             context={'error': 'Please enter a valid location'}
           )
-          
-        # All of this is formatting the weather data to be calculated in the comfort, 
-        # which then gets the outfits, which then is rendered.
-        # Really no business logic is here, except getting the data in the proper form.
-        
-        current_recommendation = GenericClothes.get_outfit_recommendation(*get_xth_hour_weather(0, weather_data), 
-                                                           tolerance_offset, 
-                                                           working_offset)
-        
-        next_recommendation = GenericClothes.get_outfit_recommendation(*get_xth_hour_weather(24, weather_data), 
-                                                        tolerance_offset, 
-                                                        working_offset)
+
+        context = _recommendation_context(weather_data, tolerance_offset, working_offset, color_selected)
+
+      except Exception as e:
+        context["error"] = f"Error, please try again. Error message: {e}"
+
+    return render(request, 'weather_app/recommendation.html', context)
+
+
+class AsyncTemperatureView(View):
+  """
+  TemperatureView for ASGI, the forecast is awaited instead of blocking a worker thread.
+  """
+
+  async def get(self, request):
+    """
+    Same as TemperatureView.get. The outfit queries and the template still run in a thread since the ORM is synchronous.
+    """
+    
+    tolerance_offset = request.GET.get('tolerance_offset')
+    working_offset = request.GET.get('working_offset')
+    location = request.GET.get('location')
+    color_selected = request.GET.get('checkbox_colors')
+
+    context = {}
+
+    if tolerance_offset and working_offset:
+      try:
+
+        tolerance_offset = int(tolerance_offset)
+        working_offset = int(working_offset)
         
-        final_recommendation = GenericClothes.get_outfit_recommendation(*get_xth_hour_weather(48, weather_data), 
-                                                         tolerance_offset, 
-                                                         working_offset)
-
-        context["waterproofing_current"] = current_recommendation['waterproofness']
-        context["waterproofing_six_hours"] = next_recommendation['waterproofness']
-        context["waterproofing_twelve_hours"] = final_recommendation['waterproofness']
-
-        context["comfort_current"] = round(current_recommendation['comfort'], 2)
-        context["comfort_six_hours"] = round(next_recommendation['comfort'], 2)
-        context["comfort_twelve_hours"] = round(final_recommendation['comfort'], 2)
-
-        context["outfit"] = list(zip(current_recommendation['outfit'], next_recommendation['outfit'], final_recommendation['outfit']))
-
-        context["rain_outfit"] = list(
-          zip_longest(
-            current_recommendation['precipitation_outfit'], 
-            next_recommendation['precipitation_outfit'], 
-            final_recommendation['precipitation_outfit'], 
-            fillvalue="Missing..."
+        weather_data = await Weather.aget_weather_forecast(location)
+
+        if not weather_data:
+          return await sync_to_async(render)(
+            request, 
+            status=status.HTTP_400_BAD_REQUEST, 
+            template_name='weather_app/recommendation.html',
+            context={'error': 'Please enter a valid location'}
           )
-        )
 
-        if color_selected:
-          context["colors_current"] = current_recommendation['colors']
+        context = await sync_to_async(_recommendation_context)(weather_data, tolerance_offset, working_offset, color_selected)
 
       except Exception as e:
         context["error"] = f"Error, please try again. Error message: {e}"
 
-    return render(request, 'weather_app/recommendation.html', context)
+    return await sync_to_async(render)(request, 'weather_app/recommendation.html', context)
 
 
 class GenericClothesListView(View):
@@ -168,6 +216,37 @@ class GenericClothesListView(View):
 #       queryset = queryset.filter(your_field=filter_param)
 #     return queryset
 
+def _forecast_context(weather_data):
+  """
+  Builds the home page context from a forecast (shared by WeatherView and AsyncWeatherView).
+  """
+
+  # json_script can't serialize the Forecast's arrays
+  if isinstance(weather_data, Forecast):
+    weather_data = weather_data.as_lists()
+
+  # template is expecting dictionary with following values
+  return {
+      'temp_forecast': weather_data['temperature'],
+      'precipitation_forecast': weather_data['precipitation'],
+      'humidity_forecast': weather_data['humidity'],
+      'wind_forecast': weather_data['wind'],
+      'day_forecast': weather_data['hours'][:24],
+      'location' : weather_data['location'],
+  }
+
+# the forecast can't be looked up for now, shown as an error (503) instead of failing the page
+UNAVAILABLE_ERRORS = (RateLimitTimeout, CircuitOpenError, GeocoderTimedOut, GeocoderUnavailable) + TRANSIENT_ERRORS
+
+def _unavailable_message(error):
+  """
+  Rate limit and circuit breaker errors say when to try again, connection errors and timeouts
+  (after the retries ran out) get a generic message.
+  """
+  if isinstance(error, (RateLimitTimeout, CircuitOpenError)):
+    return str(error)
+  return "The weather service isn't answering right now, please try again in a few minutes."
+
 # index home page
 class WeatherView(View):
 
@@ -177,23 +256,38 @@ class WeatherView(View):
     location = request.GET.get('location')
 
     # get weather data
-    weather_data = Weather.get_weather_forecast(location)
+    try:
+      weather_data = Weather.get_weather_forecast(location)
+    except UNAVAILABLE_ERRORS as e:
+      # too many new locations looked up at once (see ratelimit.py), or api.weather.gov is down (see resilience.py)
+      return render(request, status=status.HTTP_503_SERVICE_UNAVAILABLE, template_name='weather_app/index.html', context={'error_message': _unavailable_message(e)})
 
     if weather_data:
-      # template is expecting dictionary with following values
-      context = {
-          'temp_forecast': weather_data['temperature'],
-          'precipitation_forecast': weather_data['precipitation'],
-          'humidity_forecast': weather_data['humidity'],
-          'wind_forecast': weather_data['wind'],
-          'day_forecast': weather_data['hours'][:24],
-          'location' : weather_data['location'],
-      }
-
-      return render(request, 'weather_app/index.html', context)
+      return render(request, 'weather_app/index.html', _forecast_context(weather_data))
 
     return render(request, status=status.HTTP_206_PARTIAL_CONTENT, template_name='weather_app/index.html', context={'error_message': 'Please enter a valid location'})
 
+
+class AsyncWeatherView(View):
+  """
+  WeatherView for ASGI, the forecast is awaited instead of blocking a worker thread.
+  """
+
+  async def get(self, request):
+    
+    location = request.GET.get('location')
+
+    try:
+      weather_data = await Weather.aget_weather_forecast(location)
+    except UNAVAILABLE_ERRORS as e:
+      return await sync_to_async(render)(request, status=status.HTTP_503_SERVICE_UNAVAILABLE, template_name='weather_app/index.html', context={'error_message': _unavailable_message(e)})
+
+    # render runs in a thread, the template checks request.user which hits the database
+    if weather_data:
+      return await sync_to_async(render)(request, 'weather_app/index.html', _forecast_context(weather_data))
+
+    return await sync_to_async(render)(request, status=status.HTTP_206_PARTIAL_CONTENT, template_name='weather_app/index.html', context={'error_message': 'Please enter a valid location'})
+
 class RegisterUser(View):
   """
   register for an account